@@ -23,7 +23,7 @@ interface ChatbotProps {
   crop?: string;
 }
 
-const sendChatMessage = async (payload: { message: string; location: string }) => {
+const sendChatMessage = async (payload: { message: string; location: string; session_id: string }) => {
   const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
   const response = await fetch(`${API_BASE_URL}/api/chat`, {
     method: "POST",
@@ -36,10 +36,25 @@ const sendChatMessage = async (payload: { message: string; location: string }) =
   return response.json();
 };
 
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost)
+const newSessionId = (): string => {
+  if (typeof crypto !== "undefined" && typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID();
+  }
+  if (typeof crypto !== "undefined" && typeof crypto.getRandomValues === "function") {
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+};
+
 const Chatbot = ({ isOpen, onToggle, location, crop }: ChatbotProps) => {
   const { t } = useTranslation();
   const scrollAreaRef = useRef<HTMLDivElement>(null);
   const [isMaximized, setIsMaximized] = useState(false);
+  // Identifies this conversation so the server keeps its history separate from other users
+  // The initializer runs once, not on every render
+  const [sessionId] = useState(newSessionId);
   const [messages, setMessages] = useState<Message[]>([
     {
       id: 1,
@@ -83,7 +98,7 @@ const Chatbot = ({ isOpen, onToggle, location, crop }: ChatbotProps) => {
     if (!inputMessage.trim()) return;
     const userMessage: Message = { id: Date.now(), content: inputMessage, sender: "user", timestamp: new Date() };
     setMessages(prev => [...prev, userMessage]);
-    chatMutation.mutate({ message: inputMessage, location: location || "an unknown location" });
+    chatMutation.mutate({ message: inputMessage, location: location || "an unknown location", session_id: sessionId });
     setInputMessage("");
   };
 
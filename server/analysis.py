@@ -1,109 +1,162 @@
-import random
-from typing import Dict, Any, List
+import asyncio
+import json
+import os
+from typing import Dict, Any, List, Optional, Sequence
 
 # Import our existing logic modules
-from weather import fetch_weather
+from weather import fetch_weather_async
 from chatbot2 import query_openrouter
+from climatology import condition_slug, forecast as climatology_forecast
+from insights import MAX_INSIGHTS, evaluate
+from metrics import run_in_threadpool, span
+from yield_prediction import normalize_key
 
-def get_weather_analysis(location: str, crop: str) -> Dict[str, Any]:
-    """
-    Generates a weather analysis dashboard including current weather,
-    a simulated forecast, and AI-powered insights.
-    """
-    try:
-        # 1. Fetch REAL current weather data
-        current_weather_doc, current_weather_meta = fetch_weather(location)
-        current_weather = {
-            "temperature": float(current_weather_meta.get("temperature", 0)),
-            "humidity": float(current_weather_meta.get("humidity", 0)),
-            "rainfall": float(current_weather_meta.get("rainfall", 0)),
-            # Placeholder values for wind and condition
-            "windSpeed": random.randint(5, 15),
-            "condition": "Partly Cloudy",
-        }
-
-        # 2. Simulate a 7-day forecast based on current weather
-        # (A real application would use a dedicated forecast API)
-        forecast = []
-        for i in range(7):
-            day_temp = current_weather["temperature"] + random.uniform(-3, 3)
-            day_rain = max(0, current_weather["rainfall"] + random.uniform(-2, 5) if i > 0 else current_weather["rainfall"])
-            conditions = ["sunny", "partly-cloudy", "cloudy", "light-rain", "rain"]
-            day_condition = random.choice(conditions)
-            
-            day_name = "Today" if i == 0 else f"Day {i + 1}"
+# "on" rewrites the rule-based insights with the LLM unless a request says otherwise
+INSIGHTS_LLM = os.getenv("INSIGHTS_LLM", "off").lower() == "on"
+INSIGHT_TYPES = {"warning", "info", "success"}
+WEATHER_ERROR = "Could not fetch weather data."
 
-            forecast.append({
-                "day": day_name,
-                "temp": round(day_temp, 1),
-                "rain": round(day_rain, 1),
-                "condition": day_condition,
-            })
+def current_weather(meta: Dict[str, str]) -> Dict[str, Any]:
+    """The dashboard's currentWeather block from fetch_weather metadata."""
+    return {
+        "temperature": float(meta.get("temperature", 0)),
+        "humidity": float(meta.get("humidity", 0)),
+        "rainfall": float(meta.get("rainfall", 0)),
+        "windSpeed": int(meta.get("wind_speed", 0)),
+        "condition": meta.get("condition", "Unknown"),
+    }
 
-        # 3. Use the LLM to generate AI-powered insights
-        system_prompt = """You are a farming expert. Based on the provided weather data for a specific crop and location, generate exactly 3 brief, actionable insights. For each insight, you MUST provide a 'type' (warning, info, or success), a 'message', and a recommended 'action'. Format your response as a simple list of sentences, one insight per line, like this:
-        type: [type], message: [message], action: [action]
-        type: [type], message: [message], action: [action]
-        type: [type], message: [message], action: [action]"""
+def weather_metrics(current: Dict[str, Any], summary: Dict[str, float]) -> Dict[str, float]:
+    """Inputs of insights.evaluate() from the current reading and the forecast summary."""
+    return {
+        "temperature": current["temperature"],
+        "humidity": current["humidity"],
+        "rain_today": current["rainfall"],
+        "wind_speed": current["windSpeed"],
+        "week_rain_low": summary["week_rain_low"],
+        "week_rain_high": summary["week_rain_high"],
+    }
 
-        user_prompt = f"""Here is the weather data for {location}, where I am growing {crop}:
-        Current Weather: Temperature {current_weather['temperature']}°C, Humidity {current_weather['humidity']}%.
-        7-Day Forecast: Temperatures will range from {min([d['temp'] for d in forecast]):.1f}°C to {max([d['temp'] for d in forecast]):.1f}°C. Total expected rainfall over the next week is {sum([d['rain'] for d in forecast]):.1f}mm.
+def _parse_llm_insights(content: str, crops: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    """{crop: insights} from a JSON object reply; malformed entries are dropped."""
+    start, end = content.find("{"), content.rfind("}")
+    data = json.loads(content[start:end + 1])
+    parsed = {}
+    for crop in crops:
+        insights = []
+        for item in data.get(crop) or []:
+            if not isinstance(item, dict) or item.get("type") not in INSIGHT_TYPES:
+                continue
+            if isinstance(item.get("message"), str) and isinstance(item.get("action"), str):
+                insights.append({"type": item["type"], "message": item["message"], "action": item["action"]})
+        if insights:
+            parsed[crop] = insights[:MAX_INSIGHTS]
+    return parsed
 
-        Based on this, provide 3 actionable insights for my {crop} crop."""
+async def llm_insights(location: str, current: Dict[str, Any], summary: Dict[str, float],
+                       crops: List[str], baseline: List[List[Dict[str, str]]]) -> List[List[Dict[str, str]]]:
+    """
+    Asks the LLM, in one request for all crops, to refine the rule-based
+    insights as JSON. Crops the reply does not cover keep their baseline.
+    """
+    system_prompt = """You are a farming expert. For each crop, rewrite and improve the given weather insights for a farmer: keep the facts, be specific and practical, at most 3 insights per crop. Reply with only a JSON object mapping each crop name to a list of {"type": "warning" | "info" | "success", "message": "...", "action": "..."}."""
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
+    context = {"location": location, "current_weather": current}
+    if summary["week_rain"] is not None:
+        context["expected_rain_next_7_days_mm"] = {
+            "typical": round(summary["week_rain"], 1),
+            "dry_week": round(summary["week_rain_low"], 1),
+            "wet_week": round(summary["week_rain_high"], 1),
+        }
+    context["insights"] = dict(zip(crops, baseline))
+    user_prompt = json.dumps(context, ensure_ascii=False)
 
-        response = query_openrouter(messages)
-        raw_insights = response["choices"][0]["message"]["content"]
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    try:
+        response = await query_openrouter(messages)
+        refined = _parse_llm_insights(response["choices"][0]["message"]["content"], crops)
+    except Exception as e:
+        print(f"⚠️ LLM insights unavailable, using rule-based insights: {e}")
+        return baseline
+    return [refined.get(crop, insights) for crop, insights in zip(crops, baseline)]
 
-        # 4. Parse the LLM's text response into structured data
-        insights = []
-        for line in raw_insights.strip().split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                # Simple parsing logic for "type: ..., message: ..., action: ..."
-                parts = [p.strip() for p in line.split(',')]
-                insight_type = parts[0].split(':')[1].strip()
-                insight_message = parts[1].split(':')[1].strip()
-                insight_action = parts[2].split(':')[1].strip()
+async def _location_analyses(location: str, crops: List[str], use_llm: Optional[bool]) -> List[Dict[str, Any]]:
+    """Dashboards for several crops at one location: one weather fetch, one rules pass, at most one LLM call."""
+    # 1. Fetch REAL current weather data
+    current_weather_doc, current_weather_meta = await fetch_weather_async(location)
+    current = current_weather(current_weather_meta)
 
-                if insight_type in ["warning", "info", "success"]:
-                    insights.append({
-                        "type": insight_type,
-                        "message": insight_message,
-                        "action": insight_action
-                    })
-            except IndexError:
-                # If parsing fails, skip this line
-                print(f"Could not parse insight line: {line}")
+    # 2. Climatological outlook (district rainfall normals, no randomness); off the event
+    #    loop because the first call builds the profile table if the preload did not
+    with span("forecast"):
+        forecast, summary = await run_in_threadpool(
+            climatology_forecast,
+            location, current["temperature"], current["humidity"], current["rainfall"],
+            condition_slug(current_weather_meta.get("condition_main", ""), current["condition"]),
+        )
 
-        # Ensure we always have at least one placeholder insight if parsing fails
-        if not insights:
-            insights.append({
-                "type": "info",
-                "message": "Weather conditions are stable.",
-                "action": "Continue with your current farming schedule."
-            })
+    # 3. Insights from the crop/weather rules for all crops at once
+    with span("insights_rules"):
+        insights = evaluate(weather_metrics(current, summary), crops)
+    if INSIGHTS_LLM if use_llm is None else use_llm:
+        with span("insights_llm"):
+            insights = await llm_insights(location, current, summary, crops, insights)
 
-        # 5. Assemble the final response object
-        return {
-            "currentWeather": current_weather,
-            "forecast": forecast,
-            "insights": insights[:3] # Ensure we only return 3 insights
-        }
+    # 4. Assemble the response objects
+    return [
+        {"currentWeather": current, "forecast": forecast, "insights": crop_insights[:MAX_INSIGHTS]}
+        for crop_insights in insights
+    ]
 
+async def get_weather_analysis(location: str, crop: str, use_llm: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Generates a weather analysis dashboard: current weather, a 7-day outlook
+    from rainfall climatology and rule-based insights, reworded by the LLM
+    when `use_llm` (default: INSIGHTS_LLM) is set.
+    """
+    try:
+        return (await _location_analyses(location, [crop], use_llm))[0]
     except Exception as e:
         print(f"Error getting weather analysis: {e}")
         # Return a default error structure
         return {
             "currentWeather": {"temperature": 0, "humidity": 0, "rainfall": 0, "windSpeed": 0, "condition": "Error"},
             "forecast": [],
-            "insights": [{"type": "warning", "message": "Could not fetch weather data.", "action": "Please try again later."}]
-        }
\ No newline at end of file
+            "insights": [{"type": "warning", "message": WEATHER_ERROR, "action": "Please try again later."}]
+        }
+
+def _unique(values: Sequence[str]) -> List[str]:
+    """Drops blanks and repeats (ignoring case and spacing), keeping the first spelling."""
+    seen = {}
+    for value in values:
+        key = normalize_key(value)
+        if key and key not in seen:
+            seen[key] = value.strip()
+    return list(seen.values())
+
+async def get_weather_analyses(locations: Sequence[str], crops: Sequence[str],
+                               use_llm: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Dashboards for every (location, crop) pair. Each distinct location is
+    fetched once, all locations concurrently, and all crops at a location
+    share one rules pass (or one LLM request). A location that fails yields
+    an `error` for its pairs instead of failing the batch.
+    """
+    locations, crops = _unique(locations), _unique(crops)
+    results = await asyncio.gather(
+        *(_location_analyses(location, crops, use_llm) for location in locations),
+        return_exceptions=True,
+    )
+    items = []
+    for location, result in zip(locations, results):
+        if isinstance(result, Exception):
+            print(f"Error getting weather analysis for {location}: {result}")
+            items.extend({"location": location, "crop": crop, "analysis": None, "error": WEATHER_ERROR}
+                         for crop in crops)
+        else:
+            items.extend({"location": location, "crop": crop, "analysis": analysis, "error": None}
+                         for crop, analysis in zip(crops, result))
+    return items
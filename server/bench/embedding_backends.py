@@ -0,0 +1,163 @@
+"""
+Benchmark of the embedding backends (torch vs onnx vs onnx-int8).
+
+Each backend runs in its own subprocess so that load time and resident memory
+are measured in isolation. Reported per backend:
+  - model load time and RSS growth
+  - single-query latency (p50/p95), as seen by query_db
+  - batch throughput (documents/s), as seen by build_db
+  - parity: 1 - cosine similarity against the vectors stored in farming_db
+    (or against the torch backend when the collection is empty)
+
+Usage (from server/):
+    python bench/embedding_backends.py [--backends torch onnx onnx-int8] [--docs 512] [--out report.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from embedding_backends import PARITY_TOLERANCE, cosine_parity, get_backend  # noqa: E402
+
+QUERIES = [
+    "how to control late blight in potato",
+    "best fertilizer for rice in kharif season",
+    "organic control for early blight in tomato",
+    "which crops suit sandy loam soil in Punjab",
+    "symptoms of powdery mildew on wheat",
+    "irrigation schedule for sugarcane",
+    "Farming conditions, soil, and suitable crops for Maharashtra",
+    "what is Trichoderma seed treatment",
+]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return float("nan")
+
+
+def run_child(backend_name, docs_path, vectors_path, repeats):
+    with open(docs_path, encoding="utf-8") as f:
+        docs = json.load(f)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    backend = get_backend(backend_name)
+    backend.encode(QUERIES[0])  # first call pays lazy session/graph setup
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            t0 = time.perf_counter()
+            backend.encode(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    vectors = backend.encode(docs, batch_size=64)
+    batch_s = time.perf_counter() - t0
+    np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+
+    print(json.dumps({
+        "backend": backend_name,
+        "load_seconds": round(load_s, 3),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "docs_per_second": round(len(docs) / batch_s, 1),
+    }))
+
+
+def reference_documents(limit):
+    """Documents plus their stored vectors from farming_db, or CSV documents without vectors."""
+    try:
+        import chromadb
+
+        client = chromadb.PersistentClient(path=os.path.join(SERVER_DIR, "farming_db"))
+        collection = client.get_or_create_collection(name="farming_kb")
+        got = collection.get(limit=limit, include=["documents", "embeddings"])
+        if got["ids"]:
+            return got["documents"], np.asarray(got["embeddings"], dtype=np.float32)
+    except Exception as e:
+        print(f"⚠️ Could not read farming_db ({e}); comparing against the torch backend")
+
+    import pandas as pd
+
+    docs = []
+    for name in ["using1.csv", "usingnew.csv"]:
+        df = pd.read_csv(os.path.join(SERVER_DIR, name))
+        docs += df.astype(str).agg(" | ".join, axis=1).tolist()
+    return docs[:limit], None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--docs", type=int, default=512, help="Documents used for throughput and parity")
+    parser.add_argument("--repeats", type=int, default=25, help="Passes over the query set")
+    parser.add_argument("--out", help="Write the report as JSON to this path")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--docs-path", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.docs_path, args.vectors_path, args.repeats)
+        return
+
+    os.chdir(SERVER_DIR)
+    docs, stored = reference_documents(args.docs)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        docs_path = os.path.join(tmp, "docs.json")
+        with open(docs_path, "w", encoding="utf-8") as f:
+            json.dump(docs, f)
+
+        vectors = {}
+        for name in args.backends:
+            vectors_path = os.path.join(tmp, f"{name}.npy")
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", name,
+                 "--docs-path", docs_path, "--vectors-path", vectors_path,
+                 "--repeats", str(args.repeats)],
+                check=True, capture_output=True, text=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            vectors[name] = np.load(vectors_path)
+
+    reference = stored if stored is not None else vectors.get("torch")
+    for result in results:
+        if reference is None:
+            continue
+        drift = cosine_parity(reference, vectors[result["backend"]])
+        result["parity_max"] = float(drift.max())
+        result["parity_mean"] = float(drift.mean())
+        result["parity_ok"] = bool(drift.max() <= PARITY_TOLERANCE[result["backend"]] + 1e-6)
+
+    header = f"{'backend':<10} {'load s':>7} {'RSS MB':>7} {'p50 ms':>7} {'p95 ms':>7} {'docs/s':>8} {'parity max':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        parity = f"{r['parity_max']:.2e}" if "parity_max" in r else "n/a"
+        print(f"{r['backend']:<10} {r['load_seconds']:>7} {r['rss_mb']:>7} {r['query_p50_ms']:>7} "
+              f"{r['query_p95_ms']:>7} {r['docs_per_second']:>8} {parity:>11}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"documents": len(docs), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
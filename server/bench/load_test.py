@@ -0,0 +1,324 @@
+"""
+Offline load test of the API server against local upstream stand-ins.
+
+Starts bench/upstream_stubs.py and the API server (uvicorn main:app) as
+subprocesses, with OpenRouter and OpenWeatherMap pointed at the stubs and
+retrieval served from a fixture knowledge base, then drives each scenario
+at a fixed concurrency:
+    chat                    POST /api/chat
+    crop-recommendations    POST /api/crop-recommendations
+    weather-analysis        POST /api/weather-analysis
+
+The fixture KB is built once from using1.csv and usingnew.csv (documents as
+build_db.py makes them, embedded with EMBEDDING_BACKEND) into a numpy vector
+index and a BM25 index under --fixture-dir; it is rebuilt when a CSV
+changes. No Chroma database or API key is needed.
+
+Reported per scenario: latency p50/p95/p99 (ms), throughput (requests/s),
+status counts, the server's RSS (start/peak/end, MB) and the upstream calls
+the stubs answered. Save runs with --out and compare the JSON files.
+
+Usage (from server/):
+    python bench/load_test.py [--scenarios chat weather-analysis] [--concurrency 16] [--requests 400]
+                              [--latency-ms 300] [--rate-429 0.05] [--server-env SEMANTIC_CACHE=off]
+                              [--out run.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from data_store import CACHE_DIR, source_stamps  # noqa: E402
+
+KB_FILES = ["using1.csv", "usingnew.csv"]
+FIXTURE_DIR = os.path.join(SERVER_DIR, CACHE_DIR, "bench_kb")
+FIXTURE_VERSION = 2
+
+SCENARIOS = {
+    "chat": "/api/chat",
+    "crop-recommendations": "/api/crop-recommendations",
+    "weather-analysis": "/api/weather-analysis",
+}
+QUESTIONS = [
+    "how to control late blight in potato",
+    "best fertilizer for rice in kharif season",
+    "which crops suit sandy loam soil",
+    "symptoms of powdery mildew on wheat",
+    "irrigation schedule for sugarcane",
+    "what is Trichoderma seed treatment",
+]
+CROPS = ["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Chickpea"]
+
+
+# --- fixture knowledge base -------------------------------------------------
+
+def build_fixture(fixture_dir: str = FIXTURE_DIR) -> str:
+    """Builds (or reuses) the fixture index; returns its directory."""
+    from embedding_backends import backend_name
+
+    paths = [os.path.join(SERVER_DIR, name) for name in KB_FILES]
+    stamps = dict(source_stamps(paths, FIXTURE_VERSION), backend=backend_name())
+    stamp_path = os.path.join(fixture_dir, "source.json")
+    try:
+        with open(stamp_path, encoding="utf-8") as f:
+            if json.load(f) == stamps:
+                return fixture_dir
+    except (OSError, ValueError):
+        pass
+
+    from bm25_index import rebuild_index
+    from build_db import build_documents, read_kb_csv
+    from embedding_backends import get_backend
+    from vector_index import export_index
+
+    start = time.perf_counter()
+    ids, docs, metas = [], [], []
+    for path in paths:
+        for chunk in read_kb_csv(path):
+            d, i, m = build_documents(chunk, path)
+            docs += d
+            ids += i
+            metas += m
+    embeddings = get_backend().encode(docs, batch_size=64)
+    export_index(ids, docs, metas, embeddings, os.path.join(fixture_dir, "index"))
+    rebuild_index(ids, docs, metas, os.path.join(fixture_dir, "bm25"))
+    with open(stamp_path, "w", encoding="utf-8") as f:
+        json.dump(stamps, f)
+    print(f"📦 Fixture KB: {len(ids)} documents in {fixture_dir} ({time.perf_counter() - start:.1f}s)")
+    return fixture_dir
+
+
+# --- request payloads -------------------------------------------------------
+
+def sample_districts(count: int, seed: int = 0):
+    """(district, state) pairs from the rainfall normals."""
+    import pandas as pd
+
+    normals = pd.read_csv(os.path.join(SERVER_DIR, "District_Rainfall_Normal_0.csv"),
+                          usecols=["STATE/UT", "DISTRICT"])
+    rows = normals.sample(min(count, len(normals)), random_state=seed)
+    return [(d.title(), s.title()) for s, d in zip(rows["STATE/UT"], rows["DISTRICT"])]
+
+
+def payloads(scenario: str, districts, seed: int = 0):
+    """Endless request bodies for a scenario, cycling deterministically over districts/questions/crops."""
+    rng = random.Random(seed)
+    while True:
+        district, state = rng.choice(districts)
+        if scenario == "chat":
+            yield {"message": rng.choice(QUESTIONS), "location": f"{district}, {state}"}
+        elif scenario == "crop-recommendations":
+            yield {"district": district, "state": state}
+        else:
+            yield {"location": f"{district}, {state}", "crop": rng.choice(CROPS)}
+
+
+# --- processes --------------------------------------------------------------
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not start within {timeout:.0f}s")
+
+
+def start_processes(args, fixture_dir):
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stubs = subprocess.Popen(
+        [sys.executable, os.path.join(SERVER_DIR, "bench", "upstream_stubs.py"), "--port", str(args.stub_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--rate-429", str(args.rate_429), "--error-rate", str(args.error_rate)],
+        cwd=SERVER_DIR,
+    )
+    env = dict(
+        os.environ,
+        OPENROUTER_API_KEY="bench",
+        WEATHER_API_KEY="bench",
+        OPENROUTER_API_URL=f"{stub_url}/api/v1/chat/completions",
+        WEATHER_API_URL=f"{stub_url}/data/2.5/weather",
+        WARMUP="off",
+        VECTOR_BACKEND="numpy",
+    )
+    if fixture_dir:
+        env.update(VECTOR_INDEX_DIR=os.path.join(fixture_dir, "index"), BM25_DIR=os.path.join(fixture_dir, "bm25"))
+    env.update(item.split("=", 1) for item in args.server_env)
+    # The server logs every upstream request; keep that out of the report
+    with open(args.server_log, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+             "--log-level", "warning"],
+            cwd=SERVER_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    try:
+        wait_ready(f"{stub_url}/stats", stubs)
+        wait_ready(f"http://127.0.0.1:{args.port}/", server)
+    except Exception:
+        stop(stubs, server)
+        raise
+    return stubs, server
+
+
+def stop(*processes) -> None:
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- load -------------------------------------------------------------------
+
+async def run_scenario(scenario, base_url, stub_url, server_pid, districts, concurrency, total, warmup):
+    path = SCENARIOS[scenario]
+    bodies = payloads(scenario, districts)
+    timeout = httpx.Timeout(120.0)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        # Warm-up requests load models and fill caches; they are not measured
+        for _ in range(warmup):
+            try:
+                await client.post(path, json=next(bodies))
+            except httpx.HTTPError:
+                pass
+        upstream_before = (await client.get(f"{stub_url}/stats")).json()
+
+        latencies, statuses = [], Counter()
+        rss = {"start": rss_mb(server_pid), "peak": rss_mb(server_pid)}
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                body = next(bodies)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        async def sample_rss():
+            while True:
+                rss["peak"] = max(rss["peak"], rss_mb(server_pid))
+                await asyncio.sleep(0.1)
+
+        sampler = asyncio.create_task(sample_rss())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        rss["end"] = rss_mb(server_pid)
+
+        upstream_after = (await client.get(f"{stub_url}/stats")).json()
+        upstream = {k: v - upstream_before.get(k, 0) for k, v in upstream_after.items()
+                    if v != upstream_before.get(k, 0)}
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (float("nan"),) * 3
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "statuses": dict(statuses),
+        "rss_mb": {k: round(v, 1) for k, v in rss.items()},
+        "upstream_calls": upstream,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario")
+    parser.add_argument("--districts", type=int, default=50, help="Distinct districts the requests cycle over")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--stub-port", type=int, default=8801)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Upstream stub latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fixture-dir", default=FIXTURE_DIR)
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server, e.g. SEMANTIC_CACHE=off WEATHER_CACHE_TTL=0")
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "load_test_server.log"))
+    parser.add_argument("--out", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    scenarios = list(args.scenarios)
+    fixture_dir = None
+    try:
+        fixture_dir = build_fixture(args.fixture_dir)
+    except Exception as e:
+        print(f"⚠️ Could not build the fixture KB ({e}); skipping the chat scenario")
+        scenarios = [s for s in scenarios if s != "chat"]
+
+    districts = sample_districts(args.districts)
+    stubs, server = start_processes(args, fixture_dir)
+    print(f"Server output: {args.server_log}")
+    results = []
+    try:
+        for scenario in scenarios:
+            result = asyncio.run(run_scenario(
+                scenario, f"http://127.0.0.1:{args.port}", f"http://127.0.0.1:{args.stub_port}",
+                server.pid, districts, args.concurrency, args.requests, args.warmup,
+            ))
+            results.append(result)
+            print(f"{scenario:<22} p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                  f"p99 {result['p99_ms']:>8.1f} ms  {result['throughput_rps']:>7.1f} req/s  "
+                  f"RSS peak {result['rss_mb']['peak']:.0f} MB  {result['statuses']}")
+    finally:
+        stop(server, stubs)
+
+    if args.out:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
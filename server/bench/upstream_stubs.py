@@ -0,0 +1,141 @@
+"""
+Local stand-ins for the OpenRouter and OpenWeatherMap APIs, for load tests
+that must not spend quota.
+
+    POST /api/v1/chat/completions   OpenRouter-style completion, JSON or SSE
+                                    stream (when the payload sets "stream")
+    GET  /data/2.5/weather?q=...    OpenWeatherMap-style current weather,
+                                    deterministic per location
+    GET  /stats                     request counts by route and status
+
+Every upstream response waits `latency` ms (+/- `jitter`) and is answered
+with 429 (Retry-After: 1) at `rate_429` or 500 at `error_rate`. Locations
+containing "nowhere" get a 404, like an unknown city. Replies to the
+dashboard's JSON insight prompt are valid JSON for the requested crops.
+
+Usage (from server/):
+    python bench/upstream_stubs.py [--port 8801] [--latency-ms 300] [--rate-429 0.05]
+Point the server at it with
+    OPENROUTER_API_URL=http://127.0.0.1:8801/api/v1/chat/completions
+    WEATHER_API_URL=http://127.0.0.1:8801/data/2.5/weather
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_REPLY = (
+    "For your location, sow after the first good rains, use certified seed treated with Trichoderma, "
+    "apply nitrogen in two splits and scout weekly for leaf blight; irrigate at critical stages if rain fails."
+)
+SKIES = [("Clear", "clear sky"), ("Clouds", "scattered clouds"), ("Clouds", "overcast clouds"),
+         ("Rain", "light rain"), ("Rain", "moderate rain")]
+
+
+def _weather(location: str) -> dict:
+    seed = int.from_bytes(hashlib.sha256(location.lower().encode("utf-8")).digest()[:4], "big")
+    rng = random.Random(seed)
+    main, description = rng.choice(SKIES)
+    return {
+        "name": location,
+        "main": {"temp": round(rng.uniform(12, 40), 1), "humidity": rng.randint(30, 95)},
+        "wind": {"speed": round(rng.uniform(0.5, 12), 1)},
+        "weather": [{"main": main, "description": description}],
+        "rain": {"1h": round(rng.uniform(0.2, 6), 1)} if main == "Rain" else {},
+    }
+
+
+def _completion(messages: list) -> str:
+    """Canned reply; the dashboard's insight prompt gets JSON for each crop it asks about."""
+    prompt = messages[-1]["content"] if messages else ""
+    if "JSON" in (messages[0].get("content", "") if messages else ""):
+        try:
+            crops = list(json.loads(prompt)["insights"])
+        except (ValueError, KeyError, TypeError):
+            crops = []
+        return json.dumps({crop: [{"type": "info", "message": f"Conditions for {crop} are being monitored.",
+                                   "action": "Check the field twice this week."}] for crop in crops})
+    return CHAT_REPLY
+
+
+def create_app(latency_ms: float = 300.0, jitter_ms: float = 50.0, rate_429: float = 0.0,
+               error_rate: float = 0.0, seed: Optional[int] = 0) -> FastAPI:
+    app = FastAPI(title="Upstream stubs")
+    rng = random.Random(seed)
+    counts: Counter = Counter()
+
+    async def delay_or_fail(route: str) -> Optional[JSONResponse]:
+        await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+        roll = rng.random()
+        if roll < rate_429:
+            counts[f"{route} 429"] += 1
+            return JSONResponse({"error": {"message": "Rate limit exceeded"}}, status_code=429,
+                                headers={"Retry-After": "1"})
+        if roll < rate_429 + error_rate:
+            counts[f"{route} 500"] += 1
+            return JSONResponse({"error": {"message": "Upstream error"}}, status_code=500)
+        return None
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        failure = await delay_or_fail("openrouter")
+        if failure is not None:
+            return failure
+        payload = await request.json()
+        reply = _completion(payload.get("messages", []))
+        counts["openrouter 200"] += 1
+        if not payload.get("stream"):
+            return {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+
+        async def events():
+            yield ": OPENROUTER PROCESSING\n\n"
+            for word in reply.split(" "):
+                chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.002)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/data/2.5/weather")
+    async def current_weather(q: str):
+        failure = await delay_or_fail("weather")
+        if failure is not None:
+            return failure
+        if "nowhere" in q.lower():
+            counts["weather 404"] += 1
+            return JSONResponse({"cod": "404", "message": "city not found"}, status_code=404)
+        counts["weather 200"] += 1
+        return _weather(q)
+
+    @app.get("/stats")
+    async def stats():
+        return dict(counts)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.rate_429, args.error_rate, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
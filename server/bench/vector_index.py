@@ -0,0 +1,156 @@
+"""
+Benchmark of the retrieval backends (chroma vs numpy vs hnsw) on farming_db.
+
+The collection is exported to a temporary index directory. Queries are stored
+document vectors with small Gaussian noise added (no embedding model needed),
+each paired with the state of its source document as the query location.
+Reported per backend:
+  - query latency (p50/p95) at the given k
+  - recall@k against an exact brute-force scan (filtered modes are compared
+    with the exact scan over the same filtered rows)
+  - off-state rate: share of results that belong to a different state than
+    the query location (what the location pre-filter removes)
+
+When chromadb or the collection is unavailable the CSV knowledge base is
+used with random vectors, and the chroma rows are skipped.
+
+Usage (from server/):
+    python bench/vector_index.py [--queries 200] [--k 5] [--noise 0.05] [--out report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from vector_index import VectorIndex, export_index, filter_value  # noqa: E402
+
+
+def load_corpus():
+    """(collection or None, ids, documents, metadatas, embeddings)."""
+    try:
+        import chromadb
+
+        client = chromadb.PersistentClient(path=os.path.join(SERVER_DIR, "farming_db"))
+        collection = client.get_or_create_collection(name="farming_kb")
+        got = collection.get(include=["documents", "metadatas", "embeddings"])
+        if got["ids"]:
+            return collection, got["ids"], got["documents"], got["metadatas"], \
+                np.asarray(got["embeddings"], dtype=np.float32)
+    except Exception as e:
+        print(f"⚠️ Could not read farming_db ({e}); using the CSVs with random vectors")
+
+    import pandas as pd
+    from build_db import CSV_FILES, build_documents
+
+    ids, docs, metas = [], [], []
+    for name in CSV_FILES:
+        d, i, m = build_documents(pd.read_csv(os.path.join(SERVER_DIR, name)), name)
+        docs += d
+        ids += i
+        metas += m
+    rng = np.random.default_rng(0)
+    return None, ids, docs, metas, rng.standard_normal((len(ids), 384)).astype(np.float32)
+
+
+def make_queries(embeddings, metadatas, count, noise, seed=0):
+    """Noisy copies of stored vectors from documents that have a state, with that state as location."""
+    rng = np.random.default_rng(seed)
+    with_state = [i for i, m in enumerate(metadatas) if filter_value(m, "state")]
+    rows = rng.choice(with_state, size=min(count, len(with_state)), replace=False)
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = unit[rows] + noise * rng.standard_normal((len(rows), unit.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    locations = [f"District, {metadatas[i].get('state') or metadatas[i].get('location')}" for i in rows]
+    return queries, locations
+
+
+def exact_top_k(index, query, k, rows=None):
+    matrix = np.asarray(index.embeddings) if rows is None else np.asarray(index.embeddings)[rows]
+    scores = matrix @ query
+    best = np.argsort(-scores)[:k]
+    best = best if rows is None else rows[best]
+    return {index.ids[i] for i in best}
+
+
+def run(name, search, index, queries, locations, k, filtered):
+    latencies, recalls, off_state = [], [], []
+    id_row = {doc_id: row for row, doc_id in enumerate(index.ids)}
+    for query, location in zip(queries, locations):
+        t0 = time.perf_counter()
+        ids = search(query, location)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        rows = index.candidates(location=location) if filtered else None
+        truth = exact_top_k(index, query, k, rows)
+        recalls.append(len(truth & set(ids)) / max(len(truth), 1))
+        wanted = index.states_in(location)
+        states = [filter_value(index.metadatas[id_row[i]], "state") for i in ids if i in id_row]
+        off_state.append(sum(1 for s in states if s and s not in wanted) / max(len(ids), 1))
+
+    return {
+        "backend": name,
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "off_state_rate": round(float(np.mean(off_state)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.05, help="Std-dev of the noise added to query vectors")
+    parser.add_argument("--out", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    os.chdir(SERVER_DIR)
+    collection, ids, docs, metas, embeddings = load_corpus()
+    queries, locations = make_queries(embeddings, metas, args.queries, args.noise)
+    k = args.k
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "index")
+        export_index(ids, docs, metas, embeddings, index_dir)
+        index = VectorIndex(index_dir)
+
+        if collection is not None:
+            results.append(run("chroma", lambda q, loc: collection.query(
+                query_embeddings=[q.tolist()], n_results=k)["ids"][0], index, queries, locations, k, False))
+        results.append(run("numpy", lambda q, loc: index.search(q, k)[0],
+                           index, queries, locations, k, False))
+        results.append(run("numpy+state", lambda q, loc: index.search(q, k, location=loc)[0],
+                           index, queries, locations, k, True))
+        hnsw_index = VectorIndex(index_dir, use_hnsw=True)
+        if hnsw_index.hnsw is None:
+            print("⚠️ Skipping the hnsw backend")
+        else:
+            results.append(run("hnsw", lambda q, loc: hnsw_index.search(q, k)[0],
+                               index, queries, locations, k, False))
+            results.append(run("hnsw+state", lambda q, loc: hnsw_index.search(q, k, location=loc)[0],
+                               index, queries, locations, k, True))
+
+    header = f"{'backend':<12} {'p50 ms':>7} {'p95 ms':>7} {'recall@' + str(k):>9} {'off-state':>10}"
+    print(f"{len(ids)} documents, {len(queries)} queries")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['backend']:<12} {r['query_p50_ms']:>7} {r['query_p95_ms']:>7} "
+              f"{r['recall_at_k']:>9} {r['off_state_rate']:>10}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"documents": len(ids), "queries": len(queries), "k": k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Sparse BM25 index over the knowledge-base documents (same ids as Chroma).
+
+Exact terms such as "Phytophthora infestans" or "Trichoderma" are often lost
+in sentence embeddings; BM25 matches them directly. The index is stored in
+BM25_DIR as raw term counts:
+    counts.npz     scipy CSR matrix (documents x terms), int32
+    records.json   vocabulary, ids, documents and metadatas in row order
+
+At load the counts are turned into one term x document CSR matrix of BM25
+weights (idf and length normalization folded in), so a query is a sum of a
+few matrix rows. build_db.py keeps it in step with the vector store: only
+added or changed documents are re-tokenized, and the weights are recomputed
+from the counts.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from vector_index import filter_value, normalize_value, replace_directory
+
+BM25_DIR = os.getenv("BM25_DIR", os.path.join("farming_db", "bm25"))
+K1 = 1.5
+B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or should the to what when "
+    "which with you your na".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _count_rows(documents: Iterable[str], vocab: Dict[str, int]):
+    """CSR counts for `documents`, adding unseen terms to `vocab` in place."""
+    indptr, indices, data = [0], [], []
+    for doc in documents:
+        terms, counts = np.unique(tokenize(doc), return_counts=True)
+        for term in terms:
+            if term not in vocab:
+                vocab[term] = len(vocab)
+        indices.extend(vocab[t] for t in terms)
+        data.extend(counts.tolist())
+        indptr.append(len(indices))
+    return indptr, indices, data
+
+
+class BM25Index:
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[dict],
+                 counts: sparse.csr_matrix, vocabulary: List[str]):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.counts = counts
+        self.vocabulary = vocabulary
+        self.term_ids = {term: i for i, term in enumerate(vocabulary)}
+        self.states = np.array([filter_value(m, "state") or "" for m in metadatas], dtype=object)
+        self.known_states = set(self.states) - {""}
+        self.weights = self._weights()
+        self.mtime = None
+
+    # --- construction -----------------------------------------------------
+
+    @classmethod
+    def build(cls, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        indptr, indices, data = _count_rows(documents, vocab)
+        counts = sparse.csr_matrix((np.asarray(data, dtype=np.int32), indices, indptr),
+                                   shape=(len(ids), len(vocab)))
+        return cls(list(ids), list(documents), list(metadatas), counts, list(vocab))
+
+    def updated(self, upserts: Dict[str, tuple], removed: Iterable[str] = ()) -> "BM25Index":
+        """
+        New index with `upserts` ({id: (document, metadata)}) added or replaced
+        and `removed` ids dropped. Unchanged rows keep their counts; only the
+        upserted documents are tokenized.
+        """
+        drop = set(removed) | set(upserts)
+        keep = np.array([i for i, doc_id in enumerate(self.ids) if doc_id not in drop], dtype=np.int64)
+        vocab = dict(self.term_ids)
+        new_ids = list(upserts)
+        indptr, indices, data = _count_rows((upserts[i][0] for i in new_ids), vocab)
+        added = sparse.csr_matrix((np.asarray(data, dtype=np.int32), indices, indptr),
+                                  shape=(len(new_ids), len(vocab)))
+        kept = self.counts[keep]
+        kept.resize((len(keep), len(vocab)))
+        counts = sparse.vstack([kept, added], format="csr")
+
+        # Drop terms no document uses any more
+        used = np.flatnonzero(counts.getnnz(axis=0))
+        vocabulary = list(vocab)
+        if len(used) < len(vocabulary):
+            counts = counts[:, used]
+            vocabulary = [vocabulary[i] for i in used]
+        return BM25Index(
+            [self.ids[i] for i in keep] + new_ids,
+            [self.documents[i] for i in keep] + [upserts[i][0] for i in new_ids],
+            [self.metadatas[i] for i in keep] + [upserts[i][1] for i in new_ids],
+            counts.tocsr(), vocabulary,
+        )
+
+    def _weights(self) -> sparse.csr_matrix:
+        """term x document BM25 weights: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))."""
+        n_docs = self.counts.shape[0]
+        if n_docs == 0:
+            return sparse.csr_matrix((len(self.vocabulary), 0), dtype=np.float32)
+        counts = self.counts.tocoo()
+        doc_len = np.asarray(self.counts.sum(axis=1)).ravel().astype(np.float32)
+        avgdl = max(float(doc_len.mean()), 1.0)
+        df = self.counts.getnnz(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        tf = counts.data.astype(np.float32)
+        norm = K1 * (1 - B + B * doc_len[counts.row] / avgdl)
+        data = idf[counts.col] * tf * (K1 + 1) / (tf + norm)
+        return sparse.csr_matrix((data, (counts.col, counts.row)), shape=(len(self.vocabulary), n_docs))
+
+    # --- persistence ------------------------------------------------------
+
+    def save(self, index_dir: str = BM25_DIR) -> None:
+        tmp_dir = index_dir.rstrip("/") + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        sparse.save_npz(os.path.join(tmp_dir, "counts.npz"), self.counts)
+        with open(os.path.join(tmp_dir, "records.json"), "w", encoding="utf-8") as f:
+            json.dump({"vocabulary": self.vocabulary, "ids": self.ids,
+                       "documents": self.documents, "metadatas": self.metadatas}, f)
+        replace_directory(tmp_dir, index_dir)
+
+    @classmethod
+    def load(cls, index_dir: str = BM25_DIR) -> "BM25Index":
+        counts = sparse.load_npz(os.path.join(index_dir, "counts.npz")).tocsr()
+        with open(os.path.join(index_dir, "records.json"), encoding="utf-8") as f:
+            records = json.load(f)
+        index = cls(records["ids"], records["documents"], records["metadatas"], counts, records["vocabulary"])
+        index.mtime = os.path.getmtime(os.path.join(index_dir, "counts.npz"))
+        return index
+
+    # --- queries ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        cols = [self.term_ids[t] for t in set(tokenize(query)) if t in self.term_ids]
+        if not cols:
+            return np.zeros(len(self), dtype=np.float32)
+        return np.asarray(self.weights[cols].sum(axis=0)).ravel()
+
+    def search(self, query: str, n_results: int = 10, location: Optional[str] = None):
+        """
+        Returns (ids, documents, metadatas, scores) of the best-matching
+        documents with a positive score. A location restricts results to its
+        state plus documents without a state, as the vector index does.
+        """
+        scores = self.scores(query)
+        if location:
+            parts = {normalize_value(p) for p in location.split(",")} | {normalize_value(location)}
+            states = parts & self.known_states
+            if states:
+                scores = np.where(np.isin(self.states, list(states)) | (self.states == ""), scores, 0)
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits):
+            return [], [], [], []
+        k = min(n_results, len(hits))
+        best = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        best = best[np.argsort(-scores[best])]
+        return ([self.ids[i] for i in best], [self.documents[i] for i in best],
+                [self.metadatas[i] for i in best], [float(scores[i]) for i in best])
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def get_index(index_dir: str = BM25_DIR) -> Optional[BM25Index]:
+    """Shared index (None until build_db.py has created one), reloaded when the files change."""
+    global _index
+    path = os.path.join(index_dir, "counts.npz")
+    if not os.path.exists(path):
+        return None
+    current = _index
+    if current is not None and current.mtime == os.path.getmtime(path):
+        return current
+    with _index_lock:
+        if _index is None or _index.mtime != os.path.getmtime(path):
+            _index = BM25Index.load(index_dir)
+        return _index
+
+
+def rebuild_index(ids, documents, metadatas, index_dir: str = BM25_DIR) -> BM25Index:
+    index = BM25Index.build(ids, documents, metadatas)
+    index.save(index_dir)
+    return index
+
+
+def update_index(upserts: Dict[str, tuple], removed: Iterable[str] = (),
+                 index_dir: str = BM25_DIR) -> Optional[BM25Index]:
+    """Applies a build_db.py sync diff; returns None when there is no index to update yet."""
+    removed = list(removed)
+    if not os.path.exists(os.path.join(index_dir, "counts.npz")):
+        return None
+    index = BM25Index.load(index_dir)
+    if upserts or removed:
+        index = index.updated(upserts, removed)
+        index.save(index_dir)
+    return index
@@ -1,65 +1,329 @@
+"""
+Builds the `farming_kb` Chroma collection from the CSV knowledge base.
+
+CSVs are streamed in chunks, documents are built with vectorized string
+operations, embedded in large batches and upserted in bulk. Progress is
+checkpointed after every chunk, so an interrupted build resumes where it
+stopped instead of starting over. When it finishes, ids already stored that
+the build did not write are deleted.
+
+With --sync, the knowledge base is updated incrementally instead: every
+document is hashed and compared with the manifest from the previous run,
+only added or changed documents are re-embedded, and ids whose rows
+disappeared are deleted.
+
+Both modes keep the BM25 keyword index (bm25_index.py) in step with the
+collection.
+
+Usage:
+    python build_db.py [--chunk-size 500] [--batch-size 64] [--no-weather] [--restart]
+    python build_db.py --sync [--no-weather]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
 import pandas as pd
-from vector_db import add_to_db
-from weather import fetch_weather
- 
+from bm25_index import rebuild_index, update_index
+from kb_manifest import document_hash, load_manifest, save_manifest
+from vector_db import delete_from_db, get_all_documents, refresh_vector_index, upsert_to_db
+
+CSV_FILES = ["using1.csv", "usingnew.csv"]
+CHECKPOINT_PATH = os.path.join("farming_db", "build_checkpoint.json")
 
-csv_files = ["using1.csv", "usingnew.csv"]
 
 def safe_meta(value):
     if pd.isna(value):
         return "NA"
     return str(value)
 
-for csv_file in csv_files:
+
+def _col(df, name):
+    """Column rendered as text (like an f-string would), or 'NA' when missing."""
+    if name in df.columns:
+        return df[name].astype(str)
+    return pd.Series("NA", index=df.index)
+
+
+def read_kb_csv(csv_file, chunk_size=500, rows_done=0):
+    """
+    Chunks of a knowledge-base CSV as build_documents expects them: column
+    names stripped and lower-cased, index = row number in the file.
+    """
+    reader = pd.read_csv(csv_file, chunksize=chunk_size,
+                         skiprows=range(1, rows_done + 1) if rows_done else None)
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip().str.lower()
+        chunk.index = pd.RangeIndex(rows_done, rows_done + len(chunk))
+        rows_done += len(chunk)
+        yield chunk
+
+
+def build_documents(df: pd.DataFrame, csv_file: str):
+    """Builds the documents, ids and metadata for a chunk of rows without iterating over them."""
+    # Ids are namespaced by source file: both CSVs number their rows from 1
+    prefix = os.path.splitext(os.path.basename(csv_file))[0] + "_"
+    if "id" in df.columns:
+        row_ids = prefix + df["id"].astype(str)
+    else:
+        row_ids = prefix + "row" + df.index.astype(str).to_series(index=df.index)
+
+    docs, ids, metadatas = [], [], []
+
+    if "disease" in df.columns:
+        doc1 = (
+            "Crop: " + _col(df, "crop") + " | Disease: " + _col(df, "disease") + " | "
+            + "Causal Agent: " + _col(df, "causal_agent") + " | Symptoms: " + _col(df, "symptoms_identification") + " | "
+            + "Organic Control: " + _col(df, "organic_control") + " | Chemical Control: " + _col(df, "chemical_control")
+        )
+        meta1 = df[["crop", "disease", "causal_agent"]]
+        meta1 = meta1.astype(str).where(meta1.notna(), "NA")
+        docs += doc1.tolist()
+        ids += (row_ids + "_1").tolist()
+        metadatas += meta1.to_dict("records")
+
+    doc2 = (
+        "State: " + _col(df, "state") + " | Soil_type: " + _col(df, "soil_type") + " | "
+        + "Irrigation: " + _col(df, "irrigation") + " | Season: " + _col(df, "season") + " | "
+        + "Crop: " + _col(df, "crop") + " | Soil_N_status: " + _col(df, "soil_n_status") + " | "
+        + "Soil_P_status: " + _col(df, "soil_p_status") + " | Soil_K_status: " + _col(df, "soil_k_status")
+    )
+    meta2 = df.astype(str).where(df.notna(), "NA")
+    docs += doc2.tolist()
+    ids += (row_ids + "_2").tolist()
+    metadatas += meta2.to_dict("records")
+
+    return docs, ids, metadatas
+
+
+def build_weather_documents(states, done):
+    """One weather document per state; states already fetched in this build are skipped."""
+    from weather import fetch_weather
+
+    docs, ids, metadatas = [], [], []
+    for location in states:
+        if location in done:
+            continue
+        done.add(location)
+        try:
+            weather_doc, weather_meta = fetch_weather(location)
+            docs.append(weather_doc)
+            ids.append(f"weather_{location}")
+            metadatas.append(weather_meta)
+        except Exception as e:
+            print(f"⚠️ Could not fetch weather for {location}: {e}")
+    return docs, ids, metadatas
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_checkpoint(path=CHECKPOINT_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}, "weather_done": []}
+
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def ingest_file(csv_file, checkpoint, chunk_size=500, batch_size=64, with_weather=True):
+    """Streams one CSV into the collection, resuming after the last completed chunk."""
+    digest = file_digest(csv_file)
+    state = checkpoint["files"].get(csv_file)
+    if state is None or state.get("sha256") != digest:
+        state = {"sha256": digest, "rows_done": 0, "complete": False}
+        checkpoint["files"][csv_file] = state
+    if state["complete"]:
+        print(f"⏭️  {csv_file} already ingested, skipping")
+        return
+
+    rows_done = state["rows_done"]
+    if rows_done:
+        print(f"↩️  Resuming {csv_file} after {rows_done} rows")
     print(f"📂 Processing {csv_file} ...")
-    df = pd.read_csv(csv_file)
-    df.columns = df.columns.str.strip().str.lower()
-
-    has_disease = "disease" in df.columns
-
-    for _, row in df.iterrows():
-        docs, ids, metadatas = [], [], []
-
-        
-        if has_disease:
-            doc1 = (
-                f"Crop: {row['crop']} | Disease: {row['disease']} | "
-                f"Causal Agent: {row['causal_agent']} | Symptoms: {row.get('symptoms_identification','NA')} | "
-                f"Organic Control: {row.get('organic_control','NA')} | Chemical Control: {row.get('chemical_control','NA')}"
-            )
-            meta_doc1 = {
-                "crop": safe_meta(row["crop"]),
-                "disease": safe_meta(row["disease"]),
-                "causal_agent": safe_meta(row["causal_agent"])
-            }
-            docs.append(doc1)
-            ids.append(str(row.get("id", f"{csv_file}_row")) + "_1")
-            metadatas.append(meta_doc1)
-
-        
-        doc2 = (
-            f"State: {row.get('state','NA')} | Soil_type: {row.get('soil_type','NA')} | "
-            f"Irrigation: {row.get('irrigation','NA')} | Season: {row.get('season','NA')} | "
-            f"Crop: {row.get('crop','NA')} | Soil_N_status: {row.get('soil_n_status','NA')} | "
-            f"Soil_P_status: {row.get('soil_p_status','NA')} | Soil_K_status: {row.get('soil_k_status','NA')}"
+
+    weather_done = set(checkpoint["weather_done"])
+    for chunk in read_kb_csv(csv_file, chunk_size=chunk_size, rows_done=rows_done):
+        docs, ids, metadatas = build_documents(chunk, csv_file)
+        if with_weather and "state" in chunk.columns:
+            states = chunk["state"].dropna().astype(str).unique()
+            w_docs, w_ids, w_metas = build_weather_documents(states, weather_done)
+            docs += w_docs
+            ids += w_ids
+            metadatas += w_metas
+
+        upsert_to_db(docs=docs, ids=ids, metadatas=metadatas, batch_size=batch_size)
+        hashes = checkpoint.setdefault("hashes", {})
+        for doc_id, doc, meta in zip(ids, docs, metadatas):
+            hashes[doc_id] = document_hash(doc, meta)
+
+        rows_done += len(chunk)
+        state["rows_done"] = rows_done
+        checkpoint["weather_done"] = sorted(weather_done)
+        save_checkpoint(checkpoint)
+        print(f"   … {rows_done} rows, {len(docs)} documents upserted")
+
+    state["complete"] = True
+    save_checkpoint(checkpoint)
+
+
+def collect_documents(chunk_size=500, with_weather=True):
+    """Builds every document in the knowledge base without embedding it: {id: (doc, metadata)}."""
+    current = {}
+    weather_done = set()
+    for csv_file in CSV_FILES:
+        for chunk in read_kb_csv(csv_file, chunk_size=chunk_size):
+            docs, ids, metadatas = build_documents(chunk, csv_file)
+            if with_weather and "state" in chunk.columns:
+                states = chunk["state"].dropna().astype(str).unique()
+                w_docs, w_ids, w_metas = build_weather_documents(states, weather_done)
+                docs += w_docs
+                ids += w_ids
+                metadatas += w_metas
+            for doc_id, doc, meta in zip(ids, docs, metadatas):
+                current[doc_id] = (doc, meta)
+    return current
+
+
+def refresh_keyword_index(upserts=None, removed=()):
+    """Applies a diff to the BM25 index, or rebuilds it from the collection (full build, first run)."""
+    if upserts is not None and update_index(upserts, removed) is not None:
+        return
+    ids, docs, metadatas = get_all_documents()
+    rebuild_index(ids, docs, metadatas)
+    print(f"✅ BM25 index rebuilt ({len(ids)} documents)")
+
+
+def diff_hashes(old_hashes, new_hashes):
+    """(added, changed, removed) ids between two {id: content hash} maps."""
+    added = [i for i in new_hashes if i not in old_hashes]
+    changed = [i for i in new_hashes if i in old_hashes and old_hashes[i] != new_hashes[i]]
+    removed = [i for i in old_hashes if i not in new_hashes]
+    return added, changed, removed
+
+
+def prune_stale(hashes, with_weather=True):
+    """
+    After a full build, deletes stored ids the build did not write (rows that
+    disappeared, ids from an older id scheme). Without weather, the stored
+    weather documents are kept and added to `hashes` so the manifest covers
+    them. Returns the deleted ids.
+    """
+    stored_ids, stored_docs, stored_metas = get_all_documents()
+    stale = []
+    for doc_id, doc, meta in zip(stored_ids, stored_docs, stored_metas):
+        if doc_id in hashes:
+            continue
+        if not with_weather and doc_id.startswith("weather_"):
+            hashes[doc_id] = document_hash(doc, meta)
+        else:
+            stale.append(doc_id)
+    if stale:
+        delete_from_db(stale)
+    return stale
+
+
+def sync(chunk_size=500, batch_size=64, with_weather=True):
+    """Re-embeds only added/changed documents, deletes vanished ids and returns a diff summary."""
+    start = time.perf_counter()
+    current = collect_documents(chunk_size=chunk_size, with_weather=with_weather)
+    new_hashes = {doc_id: document_hash(doc, meta) for doc_id, (doc, meta) in current.items()}
+
+    previous = load_manifest()
+    if previous is None:
+        # First sync: hash what is already stored so unchanged documents are not re-embedded
+        print("ℹ️  No manifest yet, hashing the existing collection")
+        old_ids, old_docs, old_metas = get_all_documents()
+        old_hashes = {i: document_hash(d, m) for i, d, m in zip(old_ids, old_docs, old_metas)}
+    else:
+        old_hashes = previous["documents"]
+
+    if not with_weather:
+        # Weather was not refetched, so its documents are neither changed nor removed
+        for doc_id, digest in old_hashes.items():
+            if doc_id.startswith("weather_"):
+                new_hashes.setdefault(doc_id, digest)
+
+    added, changed, removed = diff_hashes(old_hashes, new_hashes)
+
+    to_embed = added + changed
+    if to_embed:
+        upsert_to_db(
+            docs=[current[i][0] for i in to_embed],
+            ids=to_embed,
+            metadatas=[current[i][1] for i in to_embed],
+            batch_size=batch_size,
         )
-        meta_doc2 = {col: safe_meta(row.get(col)) for col in df.columns}
-        docs.append(doc2)
-        ids.append(str(row.get("id", f"{csv_file}_row")) + "_2")
-        metadatas.append(meta_doc2)
-
-        
-        location = row.get("state", None)
-        if location and location != "NA":
-            try:
-                weather_doc, weather_meta = fetch_weather(location)
-                docs.append(weather_doc)
-                ids.append(f"weather_{location}")
-                metadatas.append(weather_meta)
-            except Exception as e:
-                print(f"⚠️ Could not fetch weather for {location}: {e}")
-            
-        
-        add_to_db(docs=docs, ids=ids, metadatas=metadatas)
-
-print("✅ All CSV files + weather processed and stored in Chroma")
+    if removed:
+        delete_from_db(removed)
+    if to_embed or removed or previous is None:
+        save_manifest(new_hashes, previous=previous)
+        refresh_vector_index()
+    # Runs on every sync so the first one after an upgrade creates the index
+    refresh_keyword_index({i: current[i] for i in to_embed}, removed)
+
+    summary = {
+        "added": len(added),
+        "changed": len(changed),
+        "removed": len(removed),
+        "unchanged": len(new_hashes) - len(added) - len(changed),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    print(
+        f"✅ Sync complete: +{summary['added']} added, ~{summary['changed']} changed, "
+        f"-{summary['removed']} removed, {summary['unchanged']} unchanged in {summary['seconds']}s"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the farming knowledge base.")
+    parser.add_argument("--chunk-size", type=int, default=500, help="CSV rows per chunk")
+    parser.add_argument("--batch-size", type=int, default=64, help="Sentences per encode batch")
+    parser.add_argument("--no-weather", action="store_true", help="Skip weather documents")
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    parser.add_argument("--sync", action="store_true", help="Incremental update of changed rows only")
+    args = parser.parse_args()
+
+    if args.sync:
+        sync(chunk_size=args.chunk_size, batch_size=args.batch_size, with_weather=not args.no_weather)
+        return
+
+    checkpoint = {"files": {}, "weather_done": []} if args.restart else load_checkpoint()
+    start = time.perf_counter()
+    for csv_file in CSV_FILES:
+        ingest_file(csv_file, checkpoint, chunk_size=args.chunk_size,
+                    batch_size=args.batch_size, with_weather=not args.no_weather)
+
+    # The checkpoint's hashes cover every id this build wrote, including resumed runs
+    hashes = checkpoint.setdefault("hashes", {})
+    stale = prune_stale(hashes, with_weather=not args.no_weather)
+    if stale:
+        print(f"🗑️  Deleted {len(stale)} documents the build no longer produces")
+    # A finished build leaves no checkpoint; the next run is a fresh rebuild
+    save_manifest(hashes, previous=load_manifest())
+    refresh_vector_index()
+    refresh_keyword_index()
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    print(f"✅ All CSV files + weather processed and stored in Chroma in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 # chatbot2.py
 import os
+import json
+from typing import AsyncIterator, Optional, Tuple
 from dotenv import load_dotenv
-import requests
-import time
-from vector_db import query_db
+
+import http_client
+from conversation_store import create_store
+from hybrid_retrieval import retrieve_context
+from kb_manifest import kb_version
+from lazy import Lazy
+from metrics import run_in_threadpool, span
+from semantic_cache import create_cache
+from vector_db import embed_query, location_query
 
 # Load environment variables from .env file
 load_dotenv()
 
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Overridable so benchmarks can point at a local stand-in (bench/upstream_stubs.py)
+API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 # Securely get the API key from the environment
 API_KEY = os.getenv("OPENROUTER_API_KEY")
 
@@ -16,12 +25,19 @@ API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not API_KEY:
     raise ValueError("OpenRouter API key not found. Make sure it's set in your .env file.")
 
-# Note: In a production server, memory should be managed per-user (e.g., in a database or cache).
-# A simple global list like this is not suitable for concurrent users.
-memory = []
+# Conversation history per session: raw questions/replies only, token-bounded,
+# idle sessions expire (see conversation_store for the backends)
+conversations = Lazy(create_store, "conversation_store")
+
+# Near-duplicate standalone questions from the same location reuse an earlier
+# answer; dropped whenever build_db.py changes the knowledge base
+answer_cache = Lazy(lambda: create_cache(version_fn=kb_version), "semantic_answer_cache")
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "on").lower() != "off"
 
-def query_openrouter(messages, model="deepseek/deepseek-chat-v3-0324:free"):
-    """Sends a request to the OpenRouter API and returns the response."""
+DEFAULT_MODEL = "deepseek/deepseek-chat-v3-0324:free"
+ERROR_REPLY = "I'm sorry, I encountered an error trying to generate a response. Please try again."
+
+def _openrouter_request(messages, model, stream=False):
     headers = {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json",
@@ -32,35 +48,47 @@ def query_openrouter(messages, model="deepseek/deepseek-chat-v3-0324:free"):
         "max_tokens": 500,
         "temperature": 0.7,
     }
-    
-    retries = 3
-    for i in range(retries):
-        try:
-            response = requests.post(API_URL, headers=headers, json=payload)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            if response.status_code == 429:
-                wait_time = 2 ** i  
-                print(f"⚠️ Rate limit hit. Waiting {wait_time} sec before retry...")
-                time.sleep(wait_time)
-                continue
-            else:
-                print(f"❌ An error occurred: {e}")
-                raise
-    raise Exception("❌ Failed after multiple retries.")
-
-def get_bot_response(user_query: str, location: str) -> str:
-    """
-    Gets a response from the farming assistant RAG pipeline.
-    """
-    global memory
+    if stream:
+        payload["stream"] = True
+    return headers, payload
+
+async def query_openrouter(messages, model=DEFAULT_MODEL):
+    """Sends a request to the OpenRouter API over the shared connection pool and returns the response."""
+    headers, payload = _openrouter_request(messages, model)
+    # Rate limits (429) and gateway errors are retried with jittered backoff
+    with span("llm"):
+        response = await http_client.request("POST", API_URL, headers=headers, json=payload, retries=3)
+        return response.json()
+
+async def stream_openrouter(messages, model=DEFAULT_MODEL) -> AsyncIterator[str]:
+    """Yields completion text deltas as OpenRouter streams them (OpenAI-style SSE)."""
+    headers, payload = _openrouter_request(messages, model, stream=True)
+    async for line in http_client.stream_lines("POST", API_URL, headers=headers, json=payload, retries=3):
+        # Lines starting with ':' are keep-alive comments ("OPENROUTER PROCESSING")
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", "OpenRouter stream error"))
+        choices = chunk.get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
 
-    # 1. Retrieve context from the vector database
-    docs, metadata = query_db(user_query, location=location, n_results=2)
+def _history(session_id: Optional[str]):
+    """The session's earlier turns (blocking with the sqlite backend; call off the event loop)."""
+    return conversations.get().get(session_id) if session_id else []
+
+def _remember(session_id: Optional[str], question: str, reply: str) -> None:
+    if session_id:
+        conversations.get().append(session_id, question, reply)
+
+def _build_messages(user_query: str, location: str, docs, history):
     context = "\n".join(docs)
-    
-    # 2. Construct the prompts
+
     system_prompt = """You are a helpful farming assistant.
     Provide accurate, practical advice based on the knowledge base.
     Consider the user's location and specific needs.
@@ -75,24 +103,96 @@ def get_bot_response(user_query: str, location: str) -> str:
 
     Please provide a detailed, helpful answer:"""
 
-    # 3. Build the message history
     messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(memory) 
+    messages.extend(history)
     messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+async def _lookup_cached_reply(user_query: str, location: str, session_id: Optional[str]):
+    """
+    Embeds the query once (reused for retrieval) and checks the semantic cache.
+    Follow-up questions in a session with history are never answered from the cache.
+    Returns (embedding, history, cacheable, cached_reply).
+    """
+    embedding = await run_in_threadpool(embed_query, location_query(user_query, location))
+    history = await run_in_threadpool(_history, session_id)
+    cacheable = SEMANTIC_CACHE_ENABLED and not history
+    with span("semantic_cache"):
+        cached = answer_cache.get().get(embedding, location) if cacheable else None
+    return embedding, history, cacheable, cached
+
+async def get_bot_response(user_query: str, location: str, session_id: Optional[str] = None) -> str:
+    """
+    Gets a response from the farming assistant RAG pipeline.
+    Without a session_id the request is answered statelessly.
+    """
+    embedding, history, cacheable, cached = await _lookup_cached_reply(user_query, location, session_id)
+    if cached is not None:
+        await run_in_threadpool(_remember, session_id, user_query, cached)
+        return cached
+
+    # 1. Retrieve context: BM25 + vector hits fused by rank (CPU-bound, so off the event loop)
+    with span("retrieval"):
+        _, docs, metadata = await run_in_threadpool(
+            retrieve_context, user_query, location=location, n_results=2, query_embedding=embedding
+        )
 
-    # 4. Query the LLM
+    # 2. Construct the prompts and message history
+    messages = _build_messages(user_query, location, docs, history)
+
+    # 3. Query the LLM
     try:
-        response = query_openrouter(messages)
+        response = await query_openrouter(messages)
         assistant_reply = response["choices"][0]["message"]["content"]
     except Exception as e:
         print(f"Error querying LLM: {e}")
-        assistant_reply = "I'm sorry, I encountered an error trying to generate a response. Please try again."
-
-    # 5. Update and manage memory
-    memory.append({"role": "user", "content": user_prompt}) # Storing the full prompt for better context
-    memory.append({"role": "assistant", "content": assistant_reply})
-    if len(memory) > 10:  # Keep memory to the last 5 conversation turns (10 messages)
-        memory = memory[-10:]
-        
-    # 6. Return the final response
-    return assistant_reply
\ No newline at end of file
+        return ERROR_REPLY
+
+    # 4. Remember the raw question (not the expanded prompt) for this session
+    await run_in_threadpool(_remember, session_id, user_query, assistant_reply)
+    if cacheable:
+        answer_cache.get().put(embedding, location, assistant_reply)
+
+    # 5. Return the final response
+    return assistant_reply
+
+async def stream_bot_response(user_query: str, location: str,
+                              session_id: Optional[str] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streaming variant of get_bot_response. Yields (event, data) pairs:
+    "context" with the retrieved document ids first, then one "token" per
+    text delta, and finally "done" (or "error"). The completed reply is
+    written to the session's conversation memory.
+    """
+    embedding, history, cacheable, cached = await _lookup_cached_reply(user_query, location, session_id)
+    if cached is not None:
+        yield "context", {"ids": [], "cached": True}
+        yield "token", {"text": cached}
+        await run_in_threadpool(_remember, session_id, user_query, cached)
+        yield "done", {}
+        return
+
+    with span("retrieval"):
+        ids, docs, metadata = await run_in_threadpool(
+            retrieve_context, user_query, location=location, n_results=2, query_embedding=embedding
+        )
+    yield "context", {"ids": ids}
+
+    messages = _build_messages(user_query, location, docs, history)
+    parts = []
+    try:
+        with span("llm_stream"):
+            async for delta in stream_openrouter(messages):
+                parts.append(delta)
+                yield "token", {"text": delta}
+    except Exception as e:
+        print(f"Error streaming from LLM: {e}")
+        yield "error", {"message": ERROR_REPLY}
+        return
+
+    assistant_reply = "".join(parts)
+    if assistant_reply:
+        await run_in_threadpool(_remember, session_id, user_query, assistant_reply)
+    if cacheable and assistant_reply:
+        answer_cache.get().put(embedding, location, assistant_reply)
+    yield "done", {}
@@ -0,0 +1,116 @@
+"""
+Deterministic 7-day outlook from rainfall climatology.
+
+There is no forecast API in the project, so the outlook is the climatological
+baseline for the location rather than a simulation:
+  - rain: the district's monthly normal (District_Rainfall_Normal_0.csv)
+    spread evenly over the days of the month, with the dry/wet-year range from
+    its IMD subdivision's 1901-2017 history (see district_profiles.py)
+  - temperature: persistence of the current reading (the datasets have no
+    temperature normals)
+  - condition: today's observed sky, later days derived from the expected
+    rain and current humidity
+
+The location is resolved through the district profile table ("District,
+State", a district alone, or a state), falling back to the all-India average.
+"""
+
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from district_profiles import get_district_profiles
+
+FORECAST_DAYS = 7
+# Daily rain (mm) at which the outlook shows light rain / rain
+LIGHT_RAIN_MM = 1.0
+RAIN_MM = 8.0
+
+
+def condition_slug(main: str, description: str = "") -> str:
+    """OpenWeatherMap's weather.main/description as one of the forecast condition slugs."""
+    main, description = main.lower(), description.lower()
+    if main == "clear":
+        return "sunny"
+    if main == "clouds":
+        return "partly-cloudy" if description in ("few clouds", "scattered clouds") else "cloudy"
+    if main == "drizzle" or (main == "rain" and "light" in description):
+        return "light-rain"
+    if main in ("rain", "thunderstorm"):
+        return "rain"
+    return "cloudy"
+
+
+def _condition(rain: float, humidity: float) -> str:
+    if rain >= RAIN_MM:
+        return "rain"
+    if rain >= LIGHT_RAIN_MM:
+        return "light-rain"
+    if humidity >= 80:
+        return "cloudy"
+    return "partly-cloudy" if humidity >= 60 else "sunny"
+
+
+def resolve(location: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray], str]:
+    """
+    (monthly normals, dry ratios, wet ratios, source) for a location, each
+    (12,); source is "district", "state" or "india", or "none" without data.
+    """
+    profiles = get_district_profiles()
+    if profiles is None:
+        return None, None, None, "none"
+    parts = [p.strip() for p in location.split(",") if p.strip()]
+    row = None
+    if parts:
+        row = profiles.find(parts[0], parts[1] if len(parts) > 1 else None)
+    if row is not None:
+        source = "district" if profiles.district[row] else "state"
+        return profiles.monthly_rain[row], profiles.monthly_low[row], profiles.monthly_high[row], source
+    return (profiles.monthly_rain.mean(axis=0), profiles.monthly_low.mean(axis=0),
+            profiles.monthly_high.mean(axis=0), "india")
+
+
+def forecast(location: str, temperature: float, humidity: float, rain_today: float, condition: str,
+             today: Optional[date] = None, days: int = FORECAST_DAYS) -> Tuple[List[Dict], Dict]:
+    """
+    (forecast days, summary) from the current reading; `condition` is today's
+    condition slug. The summary holds the week's expected rain and its
+    dry/wet-year range, which insights.py evaluates; without district
+    profiles (source "none") they are None and the rain rules are skipped.
+    """
+    today = today or date.today()
+    dates = [today + timedelta(days=i) for i in range(days)]
+    months = np.array([d.month - 1 for d in dates])
+    month_days = np.array([calendar.monthrange(d.year, d.month)[1] for d in dates], dtype=np.float32)
+
+    normals, low, high, source = resolve(location)
+    if normals is None:
+        daily = np.zeros(days, dtype=np.float32)
+        daily_low = daily_high = daily
+    else:
+        daily = normals[months] / month_days
+        daily_low = daily * low[months]
+        daily_high = daily * high[months]
+    # Today's rain is observed, not climatological
+    daily = np.concatenate([[rain_today], daily[1:]])
+
+    days_out = []
+    for i, rain in enumerate(daily.tolist()):
+        days_out.append({
+            "day": "Today" if i == 0 else f"Day {i + 1}",
+            "temp": round(temperature, 1),
+            "rain": round(rain, 1),
+            "condition": condition if i == 0 else _condition(rain, humidity),
+        })
+    if normals is None:
+        summary = {"week_rain": None, "week_rain_low": None, "week_rain_high": None, "source": source}
+    else:
+        summary = {
+            "week_rain": float(daily.sum()),
+            "week_rain_low": rain_today + float(daily_low[1:].sum()),
+            "week_rain_high": rain_today + float(daily_high[1:].sum()),
+            "source": source,
+        }
+    return days_out, summary
@@ -0,0 +1,173 @@
+"""
+Per-session conversation memory for the chatbot.
+
+Each session keeps only the raw user questions and assistant replies (never
+the RAG prompt with retrieved context), trimmed to a token budget, oldest
+turns first. Idle sessions expire after a TTL and the least recently used
+sessions are evicted beyond `max_sessions`.
+
+Backends:
+    memory  in-process (default)
+    sqlite  a SQLite file shared by every worker process on the host
+
+Select with CONVERSATION_BACKEND=memory|sqlite and CONVERSATION_DB_PATH.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+Message = Dict[str, str]
+
+TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500"))
+MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+SESSION_TTL = float(os.getenv("CONVERSATION_TTL", "3600"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) without loading a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def trim_to_budget(messages: List[Message], budget: int) -> List[Message]:
+    """Drops the oldest user/assistant pairs until the history fits the budget."""
+    total = sum(estimate_tokens(m["content"]) for m in messages)
+    start = 0
+    while total > budget and start < len(messages):
+        drop = 2 if start + 1 < len(messages) else 1
+        total -= sum(estimate_tokens(m["content"]) for m in messages[start:start + drop])
+        start += drop
+    return messages[start:]
+
+
+class InMemoryConversationStore:
+    def __init__(self, token_budget: int = TOKEN_BUDGET, max_sessions: int = MAX_SESSIONS,
+                 ttl: float = SESSION_TTL):
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> List[Message]:
+        """The session's history; reading it counts as activity for the TTL and LRU order."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            messages, touched = entry
+            if now - touched > self.ttl:
+                del self._sessions[session_id]
+                return []
+            self._sessions[session_id] = (messages, now)
+            self._sessions.move_to_end(session_id)
+            return list(messages)
+
+    def append(self, session_id: str, question: str, reply: str) -> None:
+        now = time.time()
+        with self._lock:
+            messages, touched = self._sessions.get(session_id, ([], now))
+            if now - touched > self.ttl:
+                messages = []
+            messages = trim_to_budget(messages + [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": reply},
+            ], self.token_budget)
+            self._sessions[session_id] = (messages, now)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # Oldest-touched sessions sit at the front of the OrderedDict
+        while self._sessions:
+            session_id, (_, touched) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - touched > self.ttl:
+                del self._sessions[session_id]
+            else:
+                break
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteConversationStore:
+    """Same contract as the in-memory store, persisted in one SQLite file (WAL mode)."""
+
+    def __init__(self, path: str, token_budget: int = TOKEN_BUDGET,
+                 max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL):
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, touched REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)")
+        self._db.commit()
+
+    def get(self, session_id: str) -> List[Message]:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT messages, touched FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return []
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                return []
+            self._db.execute("UPDATE sessions SET touched = ? WHERE session_id = ?", (now, session_id))
+            return json.loads(row[0])
+
+    def append(self, session_id: str, question: str, reply: str) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            # BEGIN IMMEDIATE serializes read-modify-write across worker processes
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT messages, touched FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            messages = json.loads(row[0]) if row and now - row[1] <= self.ttl else []
+            messages = trim_to_budget(messages + [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": reply},
+            ], self.token_budget)
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, messages, touched) VALUES (?, ?, ?)",
+                (session_id, json.dumps(messages), now),
+            )
+            self._db.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+
+    def clear(self, session_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_store():
+    backend = os.getenv("CONVERSATION_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteConversationStore(os.getenv("CONVERSATION_DB_PATH", "conversations.db"))
+    if backend == "memory":
+        return InMemoryConversationStore()
+    raise ValueError(f"Unknown conversation backend: {backend}")
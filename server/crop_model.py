@@ -0,0 +1,124 @@
+"""
+Trained crop-recommendation model: artifact format, loading and inference.
+
+crop_recommendation.py trains the classifier and saves one joblib artifact:
+    {
+        "format": ARTIFACT_FORMAT,
+        "model": fitted classifier with predict_proba (XGBoost, multi:softprob),
+        "classes": crop labels in encoded order (LabelEncoder.classes_),
+        "features": ["temperature", "humidity"],
+        "metadata": {"version", "trained_at", "accuracy", "params", "data_sha256", ...},
+    }
+
+The server loads it once at startup; predictions take a (n, 2) array of
+(temperature, humidity) rows and return the top-k crops per row from one
+predict_proba call.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CROP_MODEL_PATH = os.getenv("CROP_MODEL_PATH", os.path.join("models", "crop_model.joblib"))
+ARTIFACT_FORMAT = 1
+FEATURES = ("temperature", "humidity")
+
+
+def data_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_model(model, classes: Sequence[str], path: str = CROP_MODEL_PATH,
+               metadata: Optional[dict] = None) -> dict:
+    """Writes the artifact atomically and returns its metadata."""
+    import joblib
+
+    metadata = dict(metadata or {})
+    metadata.setdefault("trained_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+    metadata.setdefault("version", time.strftime("%Y%m%d%H%M%S"))
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "model": model,
+        "classes": [str(c) for c in classes],
+        "features": list(FEATURES),
+        "metadata": metadata,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    joblib.dump(artifact, tmp, compress=3)
+    os.replace(tmp, path)
+    return metadata
+
+
+class CropModel:
+    def __init__(self, model, classes: Sequence[str], metadata: Optional[dict] = None):
+        self.model = model
+        self.classes = np.asarray(classes, dtype=object)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def load(cls, path: str = CROP_MODEL_PATH) -> "CropModel":
+        import joblib
+
+        artifact = joblib.load(path)
+        if artifact.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported crop model artifact format: {artifact.get('format')}")
+        if list(artifact["features"]) != list(FEATURES):
+            raise ValueError(f"Crop model expects features {artifact['features']}, not {list(FEATURES)}")
+        return cls(artifact["model"], artifact["classes"], artifact["metadata"])
+
+    @property
+    def version(self) -> str:
+        return str(self.metadata.get("version", "unknown"))
+
+    def predict_proba(self, samples) -> np.ndarray:
+        """(n, n_classes) probabilities for a (n, 2) array of (temperature, humidity)."""
+        X = np.asarray(samples, dtype=np.float32).reshape(-1, len(FEATURES))
+        return np.asarray(self.model.predict_proba(X))
+
+    def top_k(self, samples, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """(labels, probabilities), both (n, k) and sorted by probability per row."""
+        proba = self.predict_proba(samples)
+        k = max(1, min(k, proba.shape[1]))
+        best = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+        best_proba = np.take_along_axis(proba, best, axis=1)
+        order = np.argsort(-best_proba, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        return self.classes[best], np.take_along_axis(best_proba, order, axis=1)
+
+    def recommend(self, samples, k: int = 3) -> List[List[Dict[str, float]]]:
+        """top_k() as JSON-ready rows of {"crop", "probability"}."""
+        labels, proba = self.top_k(samples, k)
+        return [
+            [{"crop": crop, "probability": round(float(p), 4)} for crop, p in zip(row_labels, row_proba)]
+            for row_labels, row_proba in zip(labels.tolist(), proba.tolist())
+        ]
+
+
+_model: Optional[CropModel] = None
+_model_lock = threading.Lock()
+
+
+def load_crop_model(path: str = CROP_MODEL_PATH) -> Optional[CropModel]:
+    """Loads the artifact once; returns None if it has not been trained yet."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            if not os.path.exists(path):
+                print(f"⚠️ Crop model not found at {path}; run crop_recommendation.py to train it.")
+                return None
+            _model = CropModel.load(path)
+            print(f"✅ Crop model {_model.version} ready: {len(_model.classes)} crops")
+    return _model
+
+
+def get_crop_model() -> Optional[CropModel]:
+    return _model
@@ -2,6 +2,8 @@
 Real-Time Crop Recommendation (XGBoost)
 ---------------------------------------
 Takes temperature and humidity from API and predicts the best crop.
+Running this script trains the model and saves the artifact the API server
+loads at startup (see crop_model.py).
 
 Author: Your Name
 Date: 2025-09-13
@@ -10,10 +12,12 @@ Date: 2025-09-13
 import pandas as pd
 import numpy as np
 import warnings
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from xgboost import XGBClassifier
+from sklearn.metrics import accuracy_score
+
+from crop_model import CROP_MODEL_PATH, FEATURES, CropModel, data_digest, save_model
+from model_search import XGB_SPACE, successive_halving, xgb_estimator
 
 warnings.filterwarnings("ignore")
 
@@ -21,8 +25,8 @@ def train_crop_model(data_path="Crop_recommendation.csv"):
     # Load dataset
     df = pd.read_csv(data_path)
 
-    # Features: only temperature and humidity
-    X = df[['temperature', 'humidity']]
+    # Features: only temperature and humidity (float32 arrays, as served)
+    X = df[list(FEATURES)].to_numpy(dtype=np.float32)
     y = df['label']
 
     # Encode target
@@ -34,63 +38,42 @@ def train_crop_model(data_path="Crop_recommendation.csv"):
         X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
     )
 
-    # Hyperparameter grid
-    param_grid = {
-        "n_estimators": [100, 300, 500, 800],
-        "max_depth": [3, 4, 5, 6],
-        "learning_rate": [0.01, 0.05, 0.1],
-        "subsample": [0.8, 1.0],
-        "colsample_bytree": [0.8, 1.0],
-        "gamma": [0, 1],
-        "reg_alpha": [0, 0.1],
-        "reg_lambda": [1, 2],
-        "min_child_weight": [1, 3]
-    }
-
-    # Initialize model
-    xgb = XGBClassifier(
-        objective="multi:softmax",
-        num_class=len(np.unique(y_encoded)),
-        random_state=42,
-        use_label_encoder=False,
-        eval_metric="mlogloss"
-    )
-
-    # RandomizedSearchCV
-    random_search = RandomizedSearchCV(
-        estimator=xgb,
-        param_distributions=param_grid,
-        n_iter=15,
-        scoring="accuracy",
+    # Successive halving over n_estimators (100 -> 300 -> 800 trees) on the
+    # remaining grid; fold scores are cached, so reruns only fit new settings
+    search = successive_halving(
+        xgb_estimator(num_class=len(np.unique(y_encoded))),
+        XGB_SPACE,
+        X_train,
+        y_train,
+        n_candidates=27,
+        min_resource=100,
+        max_resource=800,
         cv=3,
-        verbose=1,
-        random_state=42,
-        n_jobs=-1
+        seed=42,
     )
-
-    # Fit model
-    random_search.fit(X_train, y_train)
+    print(f"Best CV accuracy: {search.best_score:.3f} ({search.fits} fits, {search.cached} cached)")
 
     # Evaluate
-    y_pred = random_search.predict(X_test)
+    y_pred = search.best_estimator.predict(X_test)
     acc = accuracy_score(y_test, y_pred)
     print(f"Model Accuracy: {acc:.3f}")
 
-    return random_search.best_estimator_, le
+    metadata = {
+        "accuracy": float(acc),
+        "params": search.best_params,
+        "data_sha256": data_digest(data_path),
+        "rows": int(len(df)),
+    }
+    return search.best_estimator, le, metadata
 
 def predict_crop(model, label_encoder, temperature, humidity):
-    # Prepare input
-    input_df = pd.DataFrame({'temperature': [temperature], 'humidity': [humidity]})
-    
-    # Predict
-    pred_encoded = model.predict(input_df)[0]
-    pred_label = label_encoder.inverse_transform([pred_encoded])[0]
-    
-    return pred_label
+    return CropModel(model, label_encoder.classes_).top_k([[temperature, humidity]], k=1)[0][0, 0]
 
 if __name__ == "__main__":
-    # Train model (one-time, can be saved to disk later)
-    model, le = train_crop_model()
+    # Train once and save the artifact for the API server
+    model, le, metadata = train_crop_model()
+    metadata = save_model(model, le.classes_, CROP_MODEL_PATH, metadata)
+    print(f"Saved crop model {metadata['version']} to {CROP_MODEL_PATH}")
 
     # Example: API gives these values
     api_temperature = 30
@@ -0,0 +1,179 @@
+"""
+Columnar binary cache for the CSV datasets.
+
+Each CSV is converted once into a directory of .npy column files plus a
+manifest: text columns become categorical codes with their categories stored
+in the manifest, floating point columns become float32 and integer columns the
+smallest of int32/int64 that fits. Later loads memory-map the column files
+instead of reparsing text. The cache is rebuilt only when the source file's
+mtime/size changes *and* its content hash differs.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.getenv("DATA_CACHE_DIR", ".data_cache")
+FORMAT_VERSION = 1
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(source: str, cache_dir: str) -> str:
+    source = os.path.abspath(source)
+    stem = os.path.splitext(os.path.basename(source))[0].replace(" ", "_")
+    tag = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{stem}-{tag}")
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _read_manifest(table_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(table_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(table_dir: str, manifest: dict) -> None:
+    tmp = os.path.join(table_dir, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(table_dir, "manifest.json"))
+
+
+def _encode_column(series: pd.Series):
+    """Returns (array, column spec) in the compact on-disk representation."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.bool_), {"kind": "bool"}
+    if pd.api.types.is_integer_dtype(series):
+        info = np.iinfo(np.int32)
+        fits = series.empty or (series.min() >= info.min and series.max() <= info.max)
+        return series.to_numpy(dtype=np.int32 if fits else np.int64), {"kind": "int"}
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float32), {"kind": "float"}
+
+    # Text: strip stray whitespace once, then store as categorical codes
+    values = series.astype("string").str.strip()
+    cat = pd.Categorical(values)
+    codes = cat.codes.astype(np.int32 if len(cat.categories) > 32767 else np.int16)
+    return codes, {"kind": "category", "categories": [str(c) for c in cat.categories]}
+
+
+def write_table(df: pd.DataFrame, table_dir: str, source: Optional[dict] = None) -> None:
+    """Writes a DataFrame in the columnar cache format (atomically replacing table_dir)."""
+    parent = os.path.dirname(os.path.abspath(table_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        columns = []
+        for i, name in enumerate(df.columns):
+            array, spec = _encode_column(df[name])
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), array, allow_pickle=False)
+            columns.append({"name": str(name), "file": f"{i}.npy", **spec})
+        _write_manifest(tmp_dir, {
+            "format_version": FORMAT_VERSION,
+            "rows": int(len(df)),
+            "columns": columns,
+            "source": source or {},
+        })
+        if os.path.exists(table_dir):
+            shutil.rmtree(table_dir)
+        os.replace(tmp_dir, table_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_table(table_dir: str, columns=None, mmap: bool = True) -> pd.DataFrame:
+    """Reads a table written by write_table, memory-mapping numeric columns."""
+    manifest = _read_manifest(table_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No columnar table at {table_dir}")
+
+    data = {}
+    for col in manifest["columns"]:
+        if columns is not None and col["name"] not in columns:
+            continue
+        array = np.load(os.path.join(table_dir, col["file"]),
+                        mmap_mode="r" if mmap else None, allow_pickle=False)
+        if col["kind"] == "category":
+            data[col["name"]] = pd.Categorical.from_codes(
+                np.asarray(array), categories=col["categories"], validate=False
+            )
+        else:
+            data[col["name"]] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def source_stamps(paths, version: int = 0) -> dict:
+    """mtime/size stamps of derived tables' inputs, for comparison with table_source()."""
+    stamps = {"version": version}
+    for path in paths:
+        stat = os.stat(path)
+        stamps[os.path.abspath(path)] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def table_source(table_dir: str) -> Optional[dict]:
+    """The `source` stamp a table was written with, or None if there is no table."""
+    manifest = _read_manifest(table_dir)
+    return None if manifest is None else manifest.get("source", {})
+
+
+def _is_fresh(manifest: Optional[dict], stat: os.stat_result) -> bool:
+    if manifest is None:
+        return False
+    src = manifest.get("source", {})
+    return src.get("mtime_ns") == stat.st_mtime_ns and src.get("size") == stat.st_size
+
+
+def load_table(path: str, columns=None, cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """
+    Loads a CSV through the columnar cache.
+
+    Column names are stripped of surrounding whitespace. The first call after
+    the source changes parses the CSV and rebuilds the cache; all other calls
+    memory-map the cached columns.
+    """
+    table_dir = _cache_path(path, cache_dir)
+    with _lock_for(table_dir):
+        stat = os.stat(path)
+        manifest = _read_manifest(table_dir)
+        if not _is_fresh(manifest, stat):
+            sha = _file_sha256(path)
+            source = {"path": os.path.abspath(path), "mtime_ns": stat.st_mtime_ns,
+                      "size": stat.st_size, "sha256": sha}
+            if manifest is not None and manifest.get("source", {}).get("sha256") == sha:
+                # Touched but unchanged: refresh the stamp, keep the columns
+                manifest["source"] = source
+                _write_manifest(table_dir, manifest)
+            else:
+                df = pd.read_csv(path)
+                df.columns = df.columns.str.strip()
+                write_table(df, table_dir, source=source)
+                print(f"📦 Cached {path} as columnar table ({len(df)} rows)")
+        return read_table(table_dir, columns=columns)
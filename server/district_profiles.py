@@ -0,0 +1,423 @@
+"""
+Per-district climate profiles and precomputed crop suitability.
+
+One row per district (plus one state-average row per state) combines:
+  - rainfall normals from District_Rainfall_Normal_0.csv (annual and by season)
+  - the subdivision's 1901-2017 history from Sub_Division_IMD_2017.csv, joined
+    through district_to_subdivision.csv: year-to-year variability and the
+    share of years with a monsoon deficit (JJAS below 80% of its mean)
+  - the state's soil types, irrigation share and practised crops from usingnew.csv
+  - monthly normals with the subdivision's dry- and wet-year ratio for each
+    month (20th and 80th percentile over the mean), the forecast baseline
+    of climatology.py
+
+Every crop in CROPS is scored against every row in one broadcast pass and
+the scores and reason codes are stored with the profiles in the columnar
+cache format (data_store). The server keeps the table in memory as arrays
+indexed by (district, state); a recommendation is a dictionary lookup plus
+formatting a handful of strings. The table is rebuilt when a source file
+changes.
+
+Usage (from server/):
+    python district_profiles.py build
+    python district_profiles.py show Ludhiana Punjab
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import CACHE_DIR, load_table, read_table, source_stamps, table_source, write_table
+from yield_prediction import normalize_key
+
+RAINFALL_NORMALS_PATH = os.getenv("RAINFALL_NORMALS_PATH", "District_Rainfall_Normal_0.csv")
+SUBDIVISION_HISTORY_PATH = os.getenv("SUBDIVISION_HISTORY_PATH", "Sub_Division_IMD_2017.csv")
+DISTRICT_SUBDIVISION_PATH = os.getenv("DISTRICT_SUBDIVISION_PATH", "district_to_subdivision.csv")
+SOIL_SEASON_PATH = os.getenv("SOIL_SEASON_PATH", "usingnew.csv")
+SOURCES = (RAINFALL_NORMALS_PATH, SUBDIVISION_HISTORY_PATH, DISTRICT_SUBDIVISION_PATH, SOIL_SEASON_PATH)
+PROFILES_DIR = os.path.join(CACHE_DIR, "district_profiles")
+# Seconds between checks of the source files' stamps
+REFRESH_CHECK_INTERVAL = 10.0
+# Bump when CROPS or the scoring changes so cached tables are rebuilt
+PROFILE_VERSION = 3
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+# Dry and wet years for the monthly rainfall ranges
+RAIN_QUANTILES = (0.2, 0.8)
+
+# The datasets spell some states and IMD subdivisions differently
+STATE_ALIASES = {
+    "orissa": "odisha",
+    "uttaranchal": "uttarakhand",
+    "chatisgarh": "chhattisgarh",
+    "himachal": "himachal pradesh",
+    "jammu and kashmir": "jammu & kashmir",
+    "andaman and nicobar islands": "andaman & nicobar islands",
+    "pondicherry": "puducherry",
+    "dadar nagar haveli": "dadra & nagar haveli",
+    "daman and dui": "daman & diu",
+}
+SUBDIVISION_ALIASES = {
+    "odisha": "orissa",
+    "haryana chandigarh & delhi": "haryana delhi & chandigarh",
+    "nagaland manipur mizoram tripura": "naga mani mizo tripura",
+    "marathwada": "matathwada",
+    "rayalaseema": "rayalseema",
+    "tamil nadu puducherry & karaikal": "tamil nadu",
+}
+# Subdivisions for states/UTs that have no IMD subdivision of their own
+STATE_SUBDIVISIONS = {
+    "chandigarh": "haryana delhi & chandigarh",
+    "dadra & nagar haveli": "gujarat region",
+    "daman & diu": "gujarat region",
+    "puducherry": "tamil nadu",
+    "sikkim": "sub himalayan west bengal & sikkim",
+}
+
+
+def canonical_state(name: Optional[str]) -> str:
+    key = normalize_key(name)
+    return STATE_ALIASES.get(key, key)
+
+
+def canonical_subdivision(name: Optional[str]) -> str:
+    key = normalize_key(name)
+    return SUBDIVISION_ALIASES.get(key, key)
+
+
+# Seasonal rainfall column each crop season is judged on, and how it is described
+SEASON_RAIN = {"kharif": "jjas", "rabi": "rabi", "zaid": "mam", "annual": "annual"}
+SEASON_LABELS = {
+    "kharif": "Monsoon (Jun-Sep)",
+    "rabi": "Winter (Oct-Feb)",
+    "zaid": "Pre-monsoon (Mar-May)",
+    "annual": "Annual",
+}
+SOILS = ("Black", "Clay loam", "Loam", "Sandy loam")
+
+
+class CropNeeds(NamedTuple):
+    name: str
+    season: str               # key of SEASON_RAIN
+    rain_min: float           # mm of seasonal water (rain + irrigation) needed
+    rain_max: float           # mm of seasonal rain tolerated before waterlogging
+    drought_tolerance: float  # 0 (none) .. 1 (shrugs off monsoon deficits)
+    irrigation_credit: float  # mm a fully irrigated district adds to seasonal rain
+    soils: Tuple[str, ...]    # preferred SOILS
+
+
+CROPS = (
+    CropNeeds("Rice", "kharif", 1000, 2500, 0.1, 600, ("Clay loam", "Loam")),
+    CropNeeds("Maize", "kharif", 500, 1100, 0.4, 300, ("Loam", "Sandy loam")),
+    CropNeeds("Cotton", "kharif", 500, 1100, 0.5, 300, ("Black", "Sandy loam")),
+    CropNeeds("Soybean", "kharif", 600, 1100, 0.3, 200, ("Black", "Loam")),
+    CropNeeds("Groundnut", "kharif", 450, 1000, 0.6, 250, ("Sandy loam", "Loam")),
+    CropNeeds("Pearl Millet", "kharif", 250, 700, 0.9, 100, ("Sandy loam", "Loam")),
+    CropNeeds("Jute", "kharif", 1200, 2500, 0.1, 300, ("Loam", "Clay loam")),
+    CropNeeds("Sugarcane", "annual", 1500, 2800, 0.2, 900, ("Loam", "Clay loam", "Black")),
+    CropNeeds("Wheat", "rabi", 150, 500, 0.3, 300, ("Loam", "Clay loam", "Sandy loam")),
+    CropNeeds("Mustard", "rabi", 60, 350, 0.7, 120, ("Loam", "Sandy loam")),
+    CropNeeds("Chickpea", "rabi", 50, 300, 0.8, 80, ("Black", "Loam", "Clay loam")),
+    CropNeeds("Potato", "rabi", 150, 500, 0.2, 350, ("Loam", "Sandy loam")),
+    CropNeeds("Tomato", "rabi", 150, 600, 0.3, 350, ("Sandy loam", "Loam")),
+)
+CROP_NAMES = [c.name for c in CROPS]
+
+# Score weights and favorability bands
+WEIGHTS = {"rain": 0.55, "drought": 0.15, "soil": 0.15, "practice": 0.15}
+FAVORABLE_MIN = 0.7
+UNFAVORABLE_MAX = 0.55
+MAX_FAVORABLE = 5
+MAX_UNFAVORABLE = 3
+
+# Reason codes, in np.select priority order
+REASON_TOO_DRY, REASON_TOO_WET, REASON_DROUGHT, REASON_SOIL, REASON_IRRIGATED, REASON_FITS = range(6)
+REASONS = {
+    REASON_TOO_DRY: "{season} rainfall of ~{rain:.0f} mm is below the {min:.0f} mm it needs",
+    REASON_TOO_WET: "{season} rainfall of ~{rain:.0f} mm exceeds the {max:.0f} mm it tolerates",
+    REASON_DROUGHT: "Monsoon fell short in {drought:.0%} of years since 1901",
+    REASON_SOIL: "Local {soil} soils are a poor match",
+    REASON_IRRIGATED: "Irrigation makes up for {season} rainfall of ~{rain:.0f} mm (it needs {min:.0f} mm)",
+    REASON_FITS: "{season} rainfall of ~{rain:.0f} mm is in line with its {min:.0f}-{max:.0f} mm need",
+}
+
+
+def _favorability(score: float) -> str:
+    if score >= 0.85:
+        return "Excellent"
+    if score >= FAVORABLE_MIN:
+        return "Good"
+    if score >= UNFAVORABLE_MAX:
+        return "Moderate"
+    return "Challenging"
+
+
+# --- offline build ----------------------------------------------------------
+
+def _subdivision_history() -> pd.DataFrame:
+    """Per-subdivision variability and monsoon-deficit frequency, vectorized over all years."""
+    history = load_table(SUBDIVISION_HISTORY_PATH, columns=["SUBDIVISION", "YEAR", "ANNUAL", "JJAS"])
+    history = pd.DataFrame({
+        "subdivision": history["SUBDIVISION"].astype(str).map(canonical_subdivision),
+        "annual": history["ANNUAL"].astype(np.float64),
+        "jjas": history["JJAS"].astype(np.float64),
+    })
+    grouped = history.groupby("subdivision")
+    stats = grouped.agg(annual_mean=("annual", "mean"), annual_std=("annual", "std"), jjas_mean=("jjas", "mean"))
+    jjas_mean = history["subdivision"].map(stats["jjas_mean"])
+    history["deficit"] = np.where(history["jjas"].notna(), history["jjas"] < 0.8 * jjas_mean, np.nan)
+    stats["drought_share"] = history.groupby("subdivision")["deficit"].mean()
+    stats["rain_cv"] = stats["annual_std"] / stats["annual_mean"]
+    return stats[["rain_cv", "drought_share"]]
+
+
+def _subdivision_months() -> pd.DataFrame:
+    """Per-subdivision `low:<month>` / `high:<month>` rainfall quantiles as a ratio of the monthly mean."""
+    history = load_table(SUBDIVISION_HISTORY_PATH, columns=["SUBDIVISION"] + MONTHS)
+    subdivision = history["SUBDIVISION"].astype(str).map(canonical_subdivision)
+    monthly = pd.DataFrame({m: history[m].astype(np.float64) for m in MONTHS})
+    grouped = monthly.groupby(subdivision.to_numpy())
+    mean = grouped.mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = grouped.quantile(RAIN_QUANTILES[0]).to_numpy() / mean
+        high = grouped.quantile(RAIN_QUANTILES[1]).to_numpy() / mean
+    # Months with (almost) no rain on record: the normal is the whole range
+    low = np.where(mean > 0, low, 1.0)
+    high = np.where(mean > 0, high, 1.0)
+    columns = {f"low:{m.lower()}": low[:, j] for j, m in enumerate(MONTHS)}
+    columns.update({f"high:{m.lower()}": high[:, j] for j, m in enumerate(MONTHS)})
+    return pd.DataFrame(columns, index=grouped.mean().index)
+
+
+def district_subdivisions(districts: pd.DataFrame) -> pd.Series:
+    """
+    Subdivision for each row of `districts` (canonical `state`, normalized
+    `district`): the explicit mapping first, then the subdivision mapped for
+    other districts of the same state, then STATE_SUBDIVISIONS, then a
+    subdivision named like the state.
+    """
+    mapping = load_table(DISTRICT_SUBDIVISION_PATH)
+    mapping = pd.DataFrame({
+        "state": mapping["STATE/UT"].astype(str).map(canonical_state),
+        "district": mapping["DISTRICT"].astype(str).map(normalize_key),
+        "subdivision": mapping["SUBDIVISION"].astype(str).map(canonical_subdivision),
+    })
+    by_district = mapping.drop_duplicates(["state", "district"]).set_index(["state", "district"])["subdivision"]
+    by_state = mapping.drop_duplicates("state").set_index("state")["subdivision"]
+
+    keys = pd.MultiIndex.from_frame(districts[["state", "district"]])
+    subdivision = pd.Series(by_district.reindex(keys).to_numpy(), index=districts.index)
+    subdivision = subdivision.fillna(districts["state"].map(by_state))
+    subdivision = subdivision.fillna(districts["state"].map(STATE_SUBDIVISIONS))
+    return subdivision.fillna(districts["state"])
+
+
+def _state_practice() -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame]:
+    """Soil-type shares, irrigated share and crop presence per state from usingnew.csv."""
+    rows = load_table(SOIL_SEASON_PATH, columns=["state", "soil_type", "irrigation", "crop"])
+    state = rows["state"].astype(str).map(canonical_state)
+    soil_share = pd.crosstab(state, rows["soil_type"].astype(str), normalize="index")
+    soil_share = soil_share.reindex(columns=list(SOILS), fill_value=0.0)
+    irrigated = (rows["irrigation"].astype(str) == "Irrigated").groupby(state).mean()
+    grown = pd.crosstab(state, rows["crop"].astype(str)).reindex(columns=CROP_NAMES, fill_value=0) > 0
+    return soil_share, irrigated, grown
+
+
+def _score(profiles: pd.DataFrame, soil_share: pd.DataFrame, grown: pd.DataFrame):
+    """(scores, reasons), both (rows x crops), for all profiles and crops at once."""
+    season_cols = [SEASON_RAIN[c.season] for c in CROPS]
+    rain = profiles[season_cols].to_numpy(np.float64)                      # (n, m)
+    rain_min = np.array([c.rain_min for c in CROPS])
+    rain_max = np.array([c.rain_max for c in CROPS])
+    tolerance = np.array([c.drought_tolerance for c in CROPS])
+    credit = np.array([c.irrigation_credit for c in CROPS])
+    irrigated = profiles["irrigated_share"].to_numpy(np.float64)[:, None]
+
+    water = rain + irrigated * credit
+    too_dry = water < rain_min
+    too_wet = rain > rain_max
+    rain_fit = np.where(too_dry, water / rain_min, np.where(too_wet, rain_max / np.maximum(rain, 1e-9), 1.0))
+
+    drought = profiles["drought_share"].to_numpy(np.float64)[:, None] * (1 - tolerance)
+
+    # Soil and local practice are only known for states in usingnew.csv; neutral elsewhere
+    states = profiles["state"]
+    known = states.isin(soil_share.index).to_numpy()[:, None]
+    soil_mask = np.array([[soil in c.soils for c in CROPS] for soil in SOILS], dtype=np.float64)  # (4, m)
+    soil_fit = soil_share.reindex(states, fill_value=0.0).to_numpy() @ soil_mask
+    soil_fit = np.where(known, soil_fit, 0.5)
+    practice = np.where(known, grown.reindex(states, fill_value=False).to_numpy(np.float64), 0.5)
+
+    scores = (WEIGHTS["rain"] * rain_fit + WEIGHTS["drought"] * (1 - drought)
+              + WEIGHTS["soil"] * soil_fit + WEIGHTS["practice"] * practice)
+
+    weak = scores < FAVORABLE_MIN
+    mismatch = rain_fit < 0.9  # small misses are not worth naming as the reason
+    reasons = np.select(
+        [mismatch & too_dry, mismatch & too_wet, weak & (drought > 0.15), weak & known & (soil_fit < 0.3), rain < rain_min],
+        [REASON_TOO_DRY, REASON_TOO_WET, REASON_DROUGHT, REASON_SOIL, REASON_IRRIGATED],
+        default=REASON_FITS,
+    )
+    return scores.astype(np.float32), reasons.astype(np.int8)
+
+
+def build_profiles(table_dir: str = PROFILES_DIR) -> pd.DataFrame:
+    """Builds the profile table from the source CSVs and writes it to `table_dir`."""
+    normals = load_table(RAINFALL_NORMALS_PATH)
+    districts = pd.DataFrame({
+        "state": normals["STATE/UT"].astype(str).map(canonical_state),
+        "district": normals["DISTRICT"].astype(str).map(normalize_key),
+        "annual": normals["ANNUAL"].astype(np.float64),
+        "jjas": normals["JJAS"].astype(np.float64),
+        "rabi": normals["OND"].astype(np.float64) + normals["JAN+FEB"].astype(np.float64),
+        "mam": normals["MAM"].astype(np.float64),
+        **{f"rain:{m.lower()}": normals[m].astype(np.float64) for m in MONTHS},
+    })
+    districts["subdivision"] = district_subdivisions(districts)
+    history = _subdivision_history().join(_subdivision_months())
+    districts = districts.join(history, on="subdivision")
+    # Subdivisions without history get the national figures
+    for col in history.columns:
+        districts[col] = districts[col].fillna(history[col].median())
+
+    # State-average rows answer requests for districts the normals do not list
+    numeric = ["annual", "jjas", "rabi", "mam"] + [c for c in districts.columns if c.startswith("rain:")]
+    numeric += list(history.columns)
+    states = districts.groupby("state", as_index=False)[numeric].mean()
+    states["district"] = ""
+    states["subdivision"] = ""
+    profiles = pd.concat([districts, states[districts.columns]], ignore_index=True)
+
+    soil_share, irrigated, grown = _state_practice()
+    profiles["irrigated_share"] = profiles["state"].map(irrigated).fillna(irrigated.mean())
+    dominant = soil_share.idxmax(axis=1)
+    profiles["soil"] = profiles["state"].map(dominant).fillna("")
+
+    scores, reasons = _score(profiles, soil_share, grown)
+    for j, name in enumerate(CROP_NAMES):
+        profiles[f"score:{name}"] = scores[:, j]
+        profiles[f"reason:{name}"] = reasons[:, j].astype(np.int32)
+
+    write_table(profiles, table_dir, source=source_stamps(SOURCES, PROFILE_VERSION))
+    return profiles
+
+
+# --- serving ----------------------------------------------------------------
+
+class DistrictProfiles:
+    def __init__(self, table: pd.DataFrame, stamps: Optional[dict] = None):
+        self.stamps = stamps
+        self.state = table["state"].astype(str).to_numpy()
+        self.district = table["district"].astype(str).to_numpy()
+        self.soil = table["soil"].astype(str).to_numpy()
+        self.drought_share = table["drought_share"].to_numpy(np.float32)
+        self.scores = np.column_stack([table[f"score:{n}"] for n in CROP_NAMES]).astype(np.float32)
+        self.reasons = np.column_stack([table[f"reason:{n}"] for n in CROP_NAMES]).astype(np.int8)
+        self.rain = np.column_stack([table[SEASON_RAIN[c.season]] for c in CROPS]).astype(np.float32)
+        # (rows, 12) monthly normals in mm and dry/wet-year ratios to them
+        self.monthly_rain = np.column_stack([table[f"rain:{m.lower()}"] for m in MONTHS]).astype(np.float32)
+        self.monthly_low = np.column_stack([table[f"low:{m.lower()}"] for m in MONTHS]).astype(np.float32)
+        self.monthly_high = np.column_stack([table[f"high:{m.lower()}"] for m in MONTHS]).astype(np.float32)
+        self.order = np.argsort(-self.scores, axis=1, kind="stable")
+
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.by_district: Dict[str, int] = {}
+        for row, (state, district) in enumerate(zip(self.state, self.district)):
+            self.rows.setdefault((district, state), row)
+            if district:
+                self.by_district.setdefault(district, row)
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    def find(self, district: Optional[str], state: Optional[str] = None) -> Optional[int]:
+        """Row for (district, state); falls back to the district alone, then to the state average."""
+        district_key = normalize_key(district)
+        state_key = canonical_state(state)
+        if state_key:
+            row = self.rows.get((district_key, state_key))
+            if row is not None:
+                return row
+        row = self.by_district.get(district_key)
+        if row is not None:
+            return row
+        return self.rows.get(("", state_key or canonical_state(district)))
+
+    def _entry(self, row: int, col: int) -> Dict[str, str]:
+        crop = CROPS[col]
+        reason = REASONS[int(self.reasons[row, col])].format(
+            season=SEASON_LABELS[crop.season], rain=float(self.rain[row, col]),
+            min=crop.rain_min, max=crop.rain_max,
+            drought=float(self.drought_share[row]), soil=self.soil[row].lower() or "local",
+        )
+        return {"name": crop.name, "reason": reason, "favorability": _favorability(float(self.scores[row, col]))}
+
+    def recommend(self, district: Optional[str], state: Optional[str] = None) -> Optional[Dict[str, List[dict]]]:
+        row = self.find(district, state)
+        if row is None:
+            return None
+        scores, order = self.scores[row], self.order[row]
+        favorable = [c for c in order[:MAX_FAVORABLE] if scores[c] >= FAVORABLE_MIN]
+        unfavorable = [c for c in order[::-1][:MAX_UNFAVORABLE] if scores[c] < UNFAVORABLE_MAX]
+        return {
+            "favorable": [self._entry(row, c) for c in favorable],
+            "unfavorable": [self._entry(row, c) for c in unfavorable],
+        }
+
+
+_profiles: Optional[DistrictProfiles] = None
+_profiles_lock = threading.Lock()
+_checked_at = 0.0
+
+
+def load_district_profiles(table_dir: str = PROFILES_DIR) -> Optional[DistrictProfiles]:
+    """Loads the table, rebuilding it first if a source file changed; None if sources are missing."""
+    global _profiles, _checked_at
+    with _profiles_lock:
+        _checked_at = time.monotonic()
+        try:
+            stamps = source_stamps(SOURCES, PROFILE_VERSION)
+        except FileNotFoundError as e:
+            print(f"⚠️ District profile source missing ({e.filename}); crop recommendations disabled.")
+            return _profiles
+        if _profiles is not None and _profiles.stamps == stamps:
+            return _profiles
+        if table_source(table_dir) != stamps:
+            start = time.perf_counter()
+            build_profiles(table_dir)
+            print(f"📦 Built district profiles in {time.perf_counter() - start:.2f}s")
+        _profiles = DistrictProfiles(read_table(table_dir), stamps)
+        print(f"✅ District profiles ready: {len(_profiles)} rows x {len(CROPS)} crops")
+        return _profiles
+
+
+def get_district_profiles() -> Optional[DistrictProfiles]:
+    """
+    The in-memory table, without touching the source files (loaded on the
+    first call only). The server picks up source changes by calling
+    load_district_profiles() every REFRESH_CHECK_INTERVAL seconds in the
+    background, so requests never wait for a stat or a rebuild.
+    """
+    if not _checked_at:
+        return load_district_profiles()
+    return _profiles
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    if sys.argv[1:2] == ["build"]:
+        table = build_profiles()
+        print(f"✅ Wrote {len(table)} district profiles to {PROFILES_DIR}")
+    elif sys.argv[1:2] == ["show"] and len(sys.argv) >= 3:
+        profiles = load_district_profiles()
+        state = sys.argv[3] if len(sys.argv) > 3 else None
+        print(json.dumps(profiles.recommend(sys.argv[2], state), indent=2))
+    else:
+        print(__doc__)
+        sys.exit(1)
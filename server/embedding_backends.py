@@ -0,0 +1,156 @@
+"""
+Sentence-embedding backends.
+
+`torch` runs the stock SentenceTransformer. `onnx` exports the same
+transformer to ONNX once (into ONNX_DIR) and runs it with onnxruntime on CPU,
+reproducing the SentenceTransformer pipeline (mean pooling over the attention
+mask followed by L2 normalization). `onnx-int8` additionally applies dynamic
+int8 weight quantization. The ONNX backends do not import torch at query time.
+
+Parity with the vectors already stored in farming_db, measured as
+1 - cosine similarity against the torch backend:
+    onnx       <= 1e-4
+    onnx-int8  <= 2e-2
+`python bench/embedding_backends.py` checks these bounds and compares latency
+and resident memory of the backends.
+"""
+
+import os
+from typing import List, Sequence, Union
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+ONNX_DIR = os.getenv("ONNX_DIR", os.path.join("models", "onnx"))
+MAX_SEQ_LENGTH = 256  # SentenceTransformer's max_seq_length for this model
+# The model's BERT tokenizer lower-cases its input (do_lower_case), so case does not change a
+# vector and the embedding cache may fold it; set False when switching to a cased model
+MODEL_UNCASED = True
+
+PARITY_TOLERANCE = {"torch": 0.0, "onnx": 1e-4, "onnx-int8": 2e-2}
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        kwargs.setdefault("show_progress_bar", False)
+        return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+
+def export_onnx(onnx_dir: str = ONNX_DIR, quantize: bool = False) -> str:
+    """Exports the transformer (and its tokenizer) to ONNX; returns the model path."""
+    fp32_path = os.path.join(onnx_dir, "model.onnx")
+    int8_path = os.path.join(onnx_dir, "model-int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_ID)
+        tokenizer.save_pretrained(onnx_dir)
+        model = AutoModel.from_pretrained(HF_MODEL_ID).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[n] for n in names),
+                fp32_path,
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={n: dynamic for n in names + ["last_hidden_state"]},
+                opset_version=14,
+                dynamo=False,
+            )
+        print(f"✅ Exported {HF_MODEL_ID} to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized model written to {int8_path}")
+    return target
+
+
+class OnnxBackend:
+    def __init__(self, onnx_dir: str = ONNX_DIR, quantize: bool = False):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        model_path = export_onnx(onnx_dir, quantize=quantize)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(onnx_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        threads = int(os.getenv("ORT_NUM_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization (as in the ST pipeline)
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        batch_size = max(1, batch_size)
+        out = np.concatenate([
+            self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+        ])
+        return out[0] if single else out
+
+
+def backend_name(name: str = None) -> str:
+    return (name or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+
+
+def get_backend(name: str = None):
+    """Creates the embedding backend selected by name or the EMBEDDING_BACKEND env var."""
+    name = backend_name(name)
+    if name == "torch":
+        return TorchBackend()
+    if name == "onnx":
+        return OnnxBackend(quantize=False)
+    if name == "onnx-int8":
+        return OnnxBackend(quantize=True)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def cosine_parity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise 1 - cosine similarity between two embedding matrices."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    num = (a * b).sum(axis=1)
+    den = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return 1.0 - num / np.clip(den, 1e-12, None)
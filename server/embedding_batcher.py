@@ -0,0 +1,98 @@
+"""
+Micro-batching scheduler for sentence embeddings.
+
+Request threads submit single queries; a background thread collects whatever
+arrives within `max_wait_ms` (up to `max_batch_size` texts), encodes them in
+one forward pass and hands each caller its own vector. Under concurrency this
+replaces many one-sentence `encode` calls that contend for the same torch
+threads with a few batched ones.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_batch: Callable[[List[str]], Sequence], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def reset(self) -> None:
+        """Forgets the worker thread and queue; call in a forked child, where the thread does not exist."""
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """Blocking single-text encode that is transparently batched with concurrent callers."""
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pending = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            # Identical concurrent queries are encoded once
+            unique = list(dict.fromkeys(t for t, _ in pending))
+            try:
+                vectors = np.asarray(self.encode_batch(unique), dtype=np.float32)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            index = {text: i for i, text in enumerate(unique)}
+            for text, future in pending:
+                future.set_result(vectors[index[text]])
+            self.batches += 1
+            self.items += len(pending)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "pending": self._queue.qsize(),
+        }
@@ -0,0 +1,152 @@
+"""
+Two-tier cache for query embeddings.
+
+Keys are the normalized query text (whitespace collapsed, and lower-cased
+when `lowercase` is set, which is only safe for an uncased model such as
+MiniLM) scoped by the model name. The first tier is a bounded in-memory LRU;
+the optional second tier is a SQLite file (WAL mode) that survives restarts.
+New vectors are written to it in batches, every `flush_every` puts or
+`flush_interval` seconds, so a crash loses at most that many cache entries.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+FLUSH_EVERY = 64
+FLUSH_INTERVAL = 5.0
+
+
+def normalize_query(text: str, lowercase: bool = True) -> str:
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+class EmbeddingCache:
+    def __init__(self, max_size: int = 2048, disk_path: Optional[str] = None,
+                 namespace: str = "default", lowercase: bool = False,
+                 flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.namespace = namespace
+        self.lowercase = lowercase
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.disk_path = disk_path
+        self._db = None
+        # Vectors not yet written to the SQLite tier, by key
+        self._pending: Dict[str, bytes] = {}
+        self._flushed_at = time.monotonic()
+        self._open()
+
+    def _open(self) -> None:
+        if self.disk_path:
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def reopen(self) -> None:
+        """Opens a fresh SQLite connection and lock (a connection must not cross a fork)."""
+        self._lock = threading.Lock()
+        self._pending = {}  # the parent process writes its own
+        self._open()
+
+    def _key(self, text: str) -> str:
+        return f"{self.namespace}\x1f{normalize_query(text, self.lowercase)}"
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self._db is not None:
+                blob = self._pending.get(key)
+                if blob is None:
+                    row = self._db.execute(
+                        "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+                    blob = None if row is None else row[0]
+                if blob is not None:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector) -> np.ndarray:
+        key = self._key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._pending[key] = vector.tobytes()
+                if len(self._pending) >= self.flush_every or \
+                        time.monotonic() - self._flushed_at >= self.flush_interval:
+                    self._flush()
+        return vector
+
+    def _flush(self) -> None:
+        if self._pending:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    list(self._pending.items()),
+                )
+            self._pending.clear()
+        self._flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Writes the pending vectors to the SQLite tier in one transaction."""
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+
+    def get_or_compute(self, text: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        vector = self.get(text)
+        if vector is None:
+            vector = self.put(text, compute(text))
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._lru),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
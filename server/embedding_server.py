@@ -0,0 +1,191 @@
+"""
+Dedicated embedding process shared by all API workers.
+
+One process holds the embedding model (and its torch/ONNX threads); web
+workers send texts over a unix socket instead of each loading the model.
+Small requests from every worker go through one EmbeddingBatcher, so
+concurrent queries from different workers share a forward pass.
+
+Protocol, per request on a persistent connection:
+    request   !I length + JSON list of texts
+    response  !BII (status, rows, dim) + rows*dim float32 values, or
+              status 1 with `rows` bytes of UTF-8 error message
+
+Usage (from server/):
+    python embedding_server.py [--socket /tmp/cropweather-embed.sock] [--threads 2]
+then start the API with EMBEDDING_SERVER=<socket path> (serve.py does this
+with --embedding-server).
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+from typing import List, Sequence, Union
+
+import numpy as np
+
+DEFAULT_SOCKET = os.getenv("EMBEDDING_SOCKET", "/tmp/cropweather-embed.sock")
+REQUEST_HEADER = struct.Struct("!I")
+RESPONSE_HEADER = struct.Struct("!BII")
+STATUS_OK, STATUS_ERROR = 0, 1
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding connection closed")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class EmbeddingClient:
+    """Drop-in for the embedding backends' encode(), answered by the embedding server."""
+
+    name = "remote"
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _call(self, texts: List[str]) -> np.ndarray:
+        payload = json.dumps(texts, ensure_ascii=False).encode("utf-8")
+        if self._sock is None:
+            self._sock = self._connect()
+        self._sock.sendall(REQUEST_HEADER.pack(len(payload)) + payload)
+        status, rows, dim = RESPONSE_HEADER.unpack(_recv_exact(self._sock, RESPONSE_HEADER.size))
+        if status != STATUS_OK:
+            raise RuntimeError(f"Embedding server error: {_recv_exact(self._sock, rows).decode('utf-8')}")
+        data = _recv_exact(self._sock, rows * dim * 4)
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, dim)
+
+    def encode(self, texts: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        with self._lock:
+            try:
+                try:
+                    vectors = self._call(texts)
+                except ConnectionError:
+                    # The server restarted or the idle connection dropped; reconnect once
+                    self.close()
+                    vectors = self._call(texts)
+            except OSError:
+                # Not retried: after a timeout the server may still be encoding the request,
+                # and its late reply must not be read as the answer to the next one
+                self.close()
+                raise
+        return vectors[0] if single else vectors
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                (size,) = REQUEST_HEADER.unpack(_recv_exact(self.request, REQUEST_HEADER.size))
+                payload = _recv_exact(self.request, size)
+            except (ConnectionError, OSError):
+                return
+            try:
+                texts = json.loads(payload.decode("utf-8"))
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError("request must be a JSON list of strings")
+                vectors = server.encode(texts)
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                self.request.sendall(RESPONSE_HEADER.pack(STATUS_ERROR, len(message), 0) + message)
+                continue
+            rows, dim = vectors.shape
+            self.request.sendall(RESPONSE_HEADER.pack(STATUS_OK, rows, dim) + vectors.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Every worker (and each of its threads) may connect at once; the default backlog of 5
+    # makes the rest fail with EAGAIN
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, backend):
+        from embedding_batcher import EmbeddingBatcher
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # left over from a previous run
+        self.backend = backend
+        self.batcher = EmbeddingBatcher(
+            lambda texts: backend.encode(texts, batch_size=len(texts), show_progress_bar=False),
+            max_batch_size=int(os.getenv("EMBED_MAX_BATCH", "32")),
+            max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+        )
+        super().__init__(socket_path, _Handler)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Query-sized requests are batched across workers; bulk requests are encoded directly."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if len(texts) <= self.batcher.max_batch_size:
+            futures = [self.batcher.submit(text) for text in texts]
+            return np.stack([future.result() for future in futures]).astype(np.float32, copy=False)
+        vectors = self.backend.encode(texts, batch_size=self.batcher.max_batch_size, show_progress_bar=False)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def set_threads(threads: int) -> None:
+    """Caps the math libraries of this process at `threads` threads."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "ORT_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--threads", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="torch / ONNX Runtime threads (default: half the cores)")
+    args = parser.parse_args()
+
+    set_threads(args.threads)
+    from embedding_backends import get_backend
+
+    backend = get_backend()
+    backend.encode(["warm-up"], batch_size=1)
+    server = EmbeddingServer(args.socket, backend)
+    # SIGTERM from serve.py stops the loop like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"✅ Embedding server ({backend.name}, {args.threads} threads) listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
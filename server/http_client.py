@@ -0,0 +1,173 @@
+"""
+Shared outbound HTTP layer for OpenRouter and OpenWeatherMap.
+
+One pooled httpx client per process (async for the API server, sync for
+scripts such as build_db.py) with keep-alive, a per-host concurrency limit,
+explicit timeouts and retries with full-jitter exponential backoff on 429,
+5xx gateway errors and transport failures. `Retry-After` is honoured when the
+upstream sends it.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import metrics
+from lazy import Lazy
+
+TIMEOUT = httpx.Timeout(
+    float(os.getenv("HTTP_TIMEOUT", "60")),
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+)
+LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=30.0,
+)
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.TransportError,)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+_async_client = Lazy(lambda: httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS), "async_http_client")
+_sync_client = Lazy(lambda: httpx.Client(timeout=TIMEOUT, limits=LIMITS), "sync_http_client")
+
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+_host_locks: Dict[str, threading.BoundedSemaphore] = {}
+_guard = threading.Lock()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _async_slot(url: str) -> asyncio.Semaphore:
+    host = _host(url)
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(MAX_PER_HOST)
+    return _host_semaphores[host]
+
+
+def _sync_slot(url: str) -> threading.BoundedSemaphore:
+    host = _host(url)
+    with _guard:
+        if host not in _host_locks:
+            _host_locks[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_locks[host]
+
+
+def backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Full-jitter exponential backoff, or the upstream's Retry-After when it gives one."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def request(method: str, url: str, retries: int = 3, **kwargs) -> httpx.Response:
+    """Async request through the shared pool; raises httpx.HTTPStatusError on a final failure."""
+    client = _async_client.get()
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            async with _async_slot(url):
+                response = await client.request(method, url, **kwargs)
+            metrics.record_upstream(_host(url), response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response
+        except RETRY_EXCEPTIONS:
+            metrics.record_upstream(_host(url), "error")
+            if attempt == retries:
+                raise
+        delay = backoff_delay(attempt, response)
+        print(f"⚠️ {method} {_host(url)} failed (attempt {attempt + 1}), retrying in {delay:.1f}s")
+        metrics.record_retry(_host(url))
+        with metrics.span("upstream_retry_sleep"):
+            await asyncio.sleep(delay)
+
+
+def request_sync(method: str, url: str, retries: int = 3, **kwargs) -> httpx.Response:
+    """Blocking counterpart of request() for scripts and worker threads."""
+    client = _sync_client.get()
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            with _sync_slot(url):
+                response = client.request(method, url, **kwargs)
+            metrics.record_upstream(_host(url), response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response
+        except RETRY_EXCEPTIONS:
+            metrics.record_upstream(_host(url), "error")
+            if attempt == retries:
+                raise
+        delay = backoff_delay(attempt, response)
+        print(f"⚠️ {method} {_host(url)} failed (attempt {attempt + 1}), retrying in {delay:.1f}s")
+        metrics.record_retry(_host(url))
+        with metrics.span("upstream_retry_sleep"):
+            time.sleep(delay)
+
+
+async def stream_lines(method: str, url: str, retries: int = 3, **kwargs) -> AsyncIterator[str]:
+    """
+    Streams the response body line by line. Retries (as in request()) only
+    happen before the first line is yielded; once streaming has started an
+    error is raised to the caller. The per-host slot is held only until the
+    response headers arrive, so long LLM streams do not starve other calls
+    to the same host (the pool's max_connections still bounds them).
+    """
+    client = _async_client.get()
+    started = False
+    for attempt in range(retries + 1):
+        slot = _async_slot(url)
+        await slot.acquire()
+        holding = True
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                slot.release()
+                holding = False
+                metrics.record_upstream(_host(url), response.status_code)
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    delay = backoff_delay(attempt, response)
+                else:
+                    if response.is_error:
+                        await response.aread()
+                        response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        started = True
+                        yield line
+                    return
+        except RETRY_EXCEPTIONS:
+            metrics.record_upstream(_host(url), "error")
+            if started or attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+        finally:
+            if holding:
+                slot.release()
+        print(f"⚠️ {method} {_host(url)} stream failed (attempt {attempt + 1}), retrying in {delay:.1f}s")
+        metrics.record_retry(_host(url))
+        with metrics.span("upstream_retry_sleep"):
+            await asyncio.sleep(delay)
+
+
+async def aclose() -> None:
+    """Closes the pooled clients (called from the server's lifespan shutdown)."""
+    if _async_client.loaded:
+        await _async_client.get().aclose()
+        _async_client.reset()
+    if _sync_client.loaded:
+        _sync_client.get().close()
+        _sync_client.reset()
+    _host_semaphores.clear()
@@ -0,0 +1,65 @@
+"""
+Hybrid retrieval for the RAG pipeline: BM25 + vector search, fused with
+reciprocal rank fusion (RRF).
+
+Each retriever returns its top HYBRID_CANDIDATES documents; a document's
+fused score is the sum of 1 / (RRF_K + rank) over the rankings it appears
+in, so documents both retrievers agree on rise to the top while an exact
+keyword hit (e.g. a pathogen name) can still win on its own. Documents with
+identical text (duplicate CSV rows) are returned once.
+
+RETRIEVER=hybrid (default) or vector; hybrid falls back to vector-only
+until build_db.py has created the BM25 index.
+"""
+
+import os
+from typing import Dict, List, Sequence
+
+from bm25_index import get_index as get_bm25_index
+from metrics import span
+from vector_db import retrieve
+
+RETRIEVER = os.getenv("RETRIEVER", "hybrid").lower()
+if RETRIEVER not in ("hybrid", "vector"):
+    raise ValueError(f"Unknown retriever: {RETRIEVER}")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+
+def rrf_fuse(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """Ids ordered by reciprocal-rank-fusion score (ties keep first-seen order)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def retrieve_context(query, location=None, n_results=2, query_embedding=None):
+    """Drop-in for vector_db.retrieve: returns (ids, documents, metadatas), best first."""
+    bm25 = get_bm25_index() if RETRIEVER == "hybrid" else None
+    if bm25 is None:
+        return retrieve(query, location=location, n_results=n_results, query_embedding=query_embedding)
+
+    candidates = max(HYBRID_CANDIDATES, n_results)
+    v_ids, v_docs, v_metas = retrieve(query, location=location, n_results=candidates,
+                                      query_embedding=query_embedding)
+    with span("bm25_search"):
+        b_ids, b_docs, b_metas, _ = bm25.search(query, n_results=candidates, location=location)
+
+    records = dict(zip(b_ids, zip(b_docs, b_metas)))
+    records.update(zip(v_ids, zip(v_docs, v_metas)))
+
+    ids, docs, metas, seen = [], [], [], set()
+    for doc_id in rrf_fuse([v_ids, b_ids]):
+        doc, meta = records[doc_id]
+        text = " ".join(doc.split()).lower()
+        if text in seen:
+            continue
+        seen.add(text)
+        ids.append(doc_id)
+        docs.append(doc)
+        metas.append(meta)
+        if len(ids) == n_results:
+            break
+    return ids, docs, metas
@@ -0,0 +1,146 @@
+"""
+Rule-based crop/weather insights for the weather dashboard.
+
+Each rule in RULES compares one weather metric with a threshold that is
+either a constant or a column of the per-crop table CROP_LIMITS. All rules
+are evaluated for any number of crops in one broadcast comparison:
+
+    fired[crop, rule] = metric[rule] > threshold[crop, rule]   (or <)
+
+and the fired rules are ordered by severity and priority, so a dashboard
+request costs microseconds instead of an LLM round-trip. analysis.py can
+still ask the LLM to reword the result.
+"""
+
+from typing import Dict, List, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from yield_prediction import normalize_key
+
+MAX_INSIGHTS = 3
+
+
+class CropLimits(NamedTuple):
+    temp_min: float          # °C below which growth stalls
+    heat_stress: float       # °C above which yield suffers
+    disease_humidity: float  # % humidity that favors fungal disease
+    dry_week_mm: float       # weekly rain below which irrigation is needed
+    wet_week_mm: float       # weekly rain above which fields risk waterlogging
+
+
+# Approximate agronomic limits; DEFAULT_LIMITS covers crops not listed
+CROP_LIMITS = {
+    "rice": CropLimits(18, 38, 90, 35, 400),
+    "wheat": CropLimits(5, 32, 85, 10, 100),
+    "maize": CropLimits(12, 36, 85, 20, 150),
+    "cotton": CropLimits(16, 40, 85, 15, 150),
+    "sugarcane": CropLimits(15, 40, 90, 30, 250),
+    "soybean": CropLimits(15, 35, 85, 20, 150),
+    "groundnut": CropLimits(18, 38, 85, 15, 120),
+    "chickpea": CropLimits(8, 32, 80, 5, 80),
+    "mustard": CropLimits(6, 30, 80, 5, 80),
+    "millet": CropLimits(15, 42, 85, 8, 120),
+    "potato": CropLimits(7, 30, 85, 15, 100),
+    "tomato": CropLimits(12, 34, 80, 15, 100),
+    "onion": CropLimits(10, 35, 80, 10, 100),
+    "banana": CropLimits(14, 38, 90, 25, 250),
+    "tea": CropLimits(12, 32, 95, 25, 400),
+    "coffee": CropLimits(14, 32, 90, 20, 300),
+}
+DEFAULT_LIMITS = CropLimits(10, 36, 85, 15, 150)
+CROP_ALIASES = {
+    "paddy": "rice", "corn": "maize", "gram": "chickpea", "chana": "chickpea", "soyabean": "soybean",
+    "pulses": "chickpea", "bajra": "millet", "jowar": "millet", "ragi": "millet", "millets": "millet",
+    "rapeseed": "mustard", "rapeseed & mustard": "mustard", "peanut": "groundnut",
+}
+
+
+def crop_limits(crop: str) -> CropLimits:
+    key = normalize_key(crop)
+    return CROP_LIMITS.get(CROP_ALIASES.get(key, key), DEFAULT_LIMITS)
+
+
+# Inputs of the rules, in the order of metric vectors
+METRICS = ("temperature", "humidity", "rain_today", "week_rain_low", "week_rain_high", "wind_speed")
+
+
+class Rule(NamedTuple):
+    metric: str
+    above: bool                        # fires when metric > threshold (else metric < threshold)
+    threshold: Union[float, str]       # constant, or a CropLimits field
+    type: str                          # "warning" or "info"
+    message: str                       # formatted with crop, value, threshold
+    action: str
+
+
+RULES = (
+    Rule("temperature", True, "heat_stress", "warning",
+         "Temperatures around {value:.0f}°C are above the {threshold:.0f}°C {crop} tolerates.",
+         "Irrigate in the early morning or evening and mulch to keep the soil cool."),
+    Rule("temperature", False, "temp_min", "warning",
+         "Temperatures around {value:.0f}°C are below the {threshold:.0f}°C {crop} needs to grow.",
+         "Delay sowing or transplanting and hold back nitrogen until it warms up."),
+    Rule("week_rain_high", True, "wet_week_mm", "warning",
+         "A wet week could bring up to {value:.0f} mm of rain, enough to waterlog {crop} fields.",
+         "Clear field drains and postpone fertilizer until the rain passes."),
+    Rule("humidity", True, "disease_humidity", "warning",
+         "Humidity of {value:.0f}% favors fungal diseases in {crop}.",
+         "Scout for leaf spots and blight and apply a preventive fungicide if symptoms appear."),
+    Rule("wind_speed", True, 40.0, "warning",
+         "Winds of {value:.0f} km/h can flatten {crop} and make spraying ineffective.",
+         "Postpone spraying and support tall plants where possible."),
+    Rule("week_rain_low", False, "dry_week_mm", "info",
+         "In a dry week only about {value:.0f} mm of rain may fall, less than the {threshold:.0f} mm {crop} needs.",
+         "Plan irrigation for the coming days and check soil moisture before watering."),
+    Rule("rain_today", True, 0.5, "info",
+         "It is raining now ({value:.1f} mm in the last hour).",
+         "Hold off on pesticide and fertilizer applications until the rain stops."),
+)
+SEVERITY = {"warning": 0, "info": 1}
+
+_metric_idx = np.array([METRICS.index(r.metric) for r in RULES])
+_above = np.array([r.above for r in RULES])
+# Rules sorted by severity, then by their position in RULES
+_order = np.array(sorted(range(len(RULES)), key=lambda i: (SEVERITY[RULES[i].type], i)))
+_threshold_cache: Dict[CropLimits, np.ndarray] = {}
+
+
+def _thresholds(limits: CropLimits) -> np.ndarray:
+    row = _threshold_cache.get(limits)
+    if row is None:
+        row = np.array([getattr(limits, r.threshold) if isinstance(r.threshold, str) else r.threshold
+                        for r in RULES], dtype=np.float64)
+        _threshold_cache[limits] = row
+    return row
+
+
+def evaluate(metrics: Dict[str, float], crops: Sequence[str], limit: int = MAX_INSIGHTS) -> List[List[Dict]]:
+    """
+    Insights for each crop under the same weather, at most `limit` per crop,
+    warnings first. A crop with no fired rule gets one "success" insight.
+    Rules on a missing (or None) metric never fire.
+    """
+    if not crops:
+        return []
+    values = np.array([np.nan if metrics.get(m) is None else float(metrics[m]) for m in METRICS])
+    values = values[_metric_idx]                                                      # (rules,)
+    thresholds = np.stack([_thresholds(crop_limits(c)) for c in crops])               # (crops, rules)
+    # NaN compares False both ways, so rules on missing metrics stay silent
+    fired = np.where(_above, values > thresholds, values < thresholds)[:, _order]
+
+    results = []
+    for c, crop in enumerate(crops):
+        insights = []
+        for i in _order[fired[c]][:limit]:
+            rule = RULES[i]
+            fmt = {"crop": crop, "value": values[i], "threshold": thresholds[c, i]}
+            insights.append({"type": rule.type, "message": rule.message.format(**fmt), "action": rule.action})
+        if not insights:
+            insights.append({
+                "type": "success",
+                "message": f"This week's weather is within the comfortable range for {crop}.",
+                "action": "Continue with your current farming schedule.",
+            })
+        results.append(insights)
+    return results
@@ -0,0 +1,49 @@
+"""
+Content-hash manifest for the `farming_kb` collection.
+
+Maps every document id to a hash of its text and metadata, so a sync can
+re-embed only documents that were added or changed and delete the ones
+whose source rows disappeared. `version` is bumped on every change and lets
+caches detect that the knowledge base was rebuilt.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_PATH = os.path.join("farming_db", "kb_manifest.json")
+
+
+def document_hash(doc, metadata):
+    payload = json.dumps([doc, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Returns the saved manifest, or None if the knowledge base has never been synced."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(hashes, path=MANIFEST_PATH, previous=None):
+    previous = previous or {}
+    manifest = {
+        "version": previous.get("version", 0) + 1,
+        "updated_at": time.time(),
+        "documents": hashes,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+    return manifest
+
+
+def kb_version(path=MANIFEST_PATH):
+    manifest = load_manifest(path)
+    return manifest["version"] if manifest else 0
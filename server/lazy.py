@@ -0,0 +1,58 @@
+"""
+Thread-safe lazy singletons for expensive resources (models, DB clients,
+HTTP sessions). Nothing is created at import time; the first caller builds the
+object under a lock and every later caller gets the same instance.
+"""
+
+import threading
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Every Lazy registers itself so warm-up and the startup report can find it
+registry: List["Lazy"] = []
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T], name: str):
+        self._factory = factory
+        self.name = name
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        registry.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.load_seconds = time.perf_counter() - start
+                self._loaded = True
+        return self._value
+
+    def reset(self) -> None:
+        """Drops the instance (e.g. after fork) so the next get() recreates it."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self.load_seconds = None
+
+
+def warm_up(names=None) -> dict:
+    """Creates the registered singletons (optionally only those named); returns load times."""
+    timings = {}
+    for lazy in list(registry):
+        if names is not None and lazy.name not in names:
+            continue
+        lazy.get()
+        timings[lazy.name] = lazy.load_seconds
+    return timings
@@ -1,16 +1,29 @@
 import os
+import json
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict, Any
 
+import numpy as np
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from starlette.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, conlist
 
 # Import our logic functions
-from chatbot2 import get_bot_response
+from chatbot2 import answer_cache, get_bot_response, stream_bot_response
 from recommendations import get_crop_recommendations
-from analysis import get_weather_analysis
+from analysis import get_weather_analysis, get_weather_analyses
+from yield_prediction import load_yield_engine, get_yield_engine
+from crop_model import load_crop_model, get_crop_model
+from district_profiles import REFRESH_CHECK_INTERVAL, load_district_profiles
+from lazy import warm_up
+from vector_db import embedding_cache
+from weather import weather_cache
+import http_client
+import metrics
+from metrics import run_in_threadpool
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +35,7 @@ logger = logging.getLogger(__name__)
 class ChatRequest(BaseModel):
     message: str
     location: str
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     reply: str
@@ -40,10 +54,29 @@ class CropRecommendationResponse(BaseModel):
     favorable: List[CropData]
     unfavorable: List[CropData]
 
+# Models for Crop Prediction (trained temperature/humidity model)
+MAX_TOP_K = 20
+
+class CropPredictionRequest(BaseModel):
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    # batch of [temperature, humidity] rows
+    samples: Optional[List[conlist(float, min_length=2, max_length=2)]] = None
+    top_k: int = Field(3, ge=1, le=MAX_TOP_K)
+
+class CropProbability(BaseModel):
+    crop: str
+    probability: float
+
+class CropPredictionResponse(BaseModel):
+    version: str
+    predictions: List[List[CropProbability]]
+
 # Models for Weather Analysis
 class WeatherAnalysisRequest(BaseModel):
     location: str
     crop: str
+    use_llm: Optional[bool] = None  # reword the rule-based insights with the LLM (default: INSIGHTS_LLM)
 
 class CurrentWeather(BaseModel):
     temperature: float
@@ -68,8 +101,113 @@ class WeatherAnalysisResponse(BaseModel):
     forecast: List[ForecastDay]
     insights: List[Insight]
 
+# Models for the batch dashboard (every location x crop pair)
+MAX_BATCH_LOCATIONS = 20
+MAX_BATCH_CROPS = 20
+
+class BatchWeatherAnalysisRequest(BaseModel):
+    locations: List[str] = Field(min_length=1)
+    crops: List[str] = Field(min_length=1)
+    use_llm: Optional[bool] = None
+
+class BatchWeatherAnalysisItem(BaseModel):
+    location: str
+    crop: str
+    analysis: Optional[WeatherAnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchWeatherAnalysisResponse(BaseModel):
+    results: List[BatchWeatherAnalysisItem]
+    failed: int
+
+# Models for Yield Prediction
+class YieldPredictionRequest(BaseModel):
+    state: str
+    district: str
+    crop: str
+    season: Optional[str] = None
+    area: float = Field(gt=0)
+
+class YieldPredictionResponse(BaseModel):
+    predicted_yield: float
+    predicted_production_tonnes: float
+    yield_trend_per_year: float
+    sample_count: int
+    years: List[int]
+    season_matched: bool
+
+# Models for season-aware crop ranking
+MAX_TOP_CROPS = 20
+
+class TopCropsRequest(BaseModel):
+    state: str
+    district: str
+    season: Optional[str] = None  # defaults to the current season
+    top_n: int = Field(3, ge=1, le=MAX_TOP_CROPS)
+
+class RankedCrop(BaseModel):
+    crop: str
+    mean_yield: float
+    yield_trend_per_year: float
+    sample_count: int
+    years: List[int]
+
+class TopCropsResponse(BaseModel):
+    season: str
+    crops: List[RankedCrop]
+
 # --- FastAPI Application ---
-app = FastAPI(title="CropWeather AI API")
+# WARMUP: "background" (default) loads the model/DB while already serving,
+# "blocking" finishes loading before accepting requests, "off" loads on first use.
+WARMUP = os.environ.get("WARMUP", "background").lower()
+
+def _warm_up():
+    timings = warm_up(["embedding_model", "chroma_collection"])
+    logger.info("Warm-up complete: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+
+def _cache_metrics():
+    samples = metrics.cache_samples(
+        "embedding", embedding_cache.hits + embedding_cache.disk_hits, embedding_cache.misses)
+    samples += metrics.cache_samples("weather", weather_cache.hits, weather_cache.misses)
+    if answer_cache.loaded:
+        cache = answer_cache.get()
+        samples += metrics.cache_samples("semantic_answer", cache.hits, cache.misses)
+    return samples
+
+metrics.register_collector(_cache_metrics)
+
+async def _refresh_district_profiles():
+    # Source checks and rebuilds run here, off the request path
+    while True:
+        await asyncio.sleep(REFRESH_CHECK_INTERVAL)
+        try:
+            await run_in_threadpool(load_district_profiles)
+        except Exception as e:
+            logger.error(f"District profile refresh failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    metrics.init_tracing()
+    # Build the yield statistics once so every request is a dictionary lookup
+    await run_in_threadpool(load_yield_engine)
+    await run_in_threadpool(load_crop_model)
+    await run_in_threadpool(load_district_profiles)
+    refresh_task = asyncio.create_task(_refresh_district_profiles())
+    warm_task = None
+    if WARMUP == "blocking":
+        await run_in_threadpool(_warm_up)
+    elif WARMUP == "background":
+        warm_task = asyncio.create_task(run_in_threadpool(_warm_up))
+    yield
+    refresh_task.cancel()
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    await http_client.aclose()
+    # Vectors the embedding cache has not written to its SQLite tier yet
+    await run_in_threadpool(embedding_cache.flush)
+    metrics.shutdown_tracing()
+
+app = FastAPI(title="CropWeather AI API", lifespan=lifespan)
 
 # CORS middleware
 origins = [
@@ -84,6 +222,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request latency by route template and status for /metrics
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 # --- API Endpoints ---
 
@@ -91,22 +231,53 @@ app.add_middleware(
 def home():
     return {"message": "Server is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latencies, request latencies, upstream statuses, thread pool and cache stats (Prometheus format)."""
+    return PlainTextResponse(metrics.render(metrics.threadpool_samples()),
+                             media_type="text/plain; version=0.0.4")
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Endpoint to handle chatbot conversations."""
     try:
-        reply = await run_in_threadpool(
-            get_bot_response, user_query=request.message, location=request.location
+        reply = await get_bot_response(
+            user_query=request.message, location=request.location, session_id=request.session_id
         )
         return ChatResponse(reply=reply)
     except Exception as e:
         logger.error(f"Chat endpoint error: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while processing your chat request.")
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streams the chatbot reply as Server-Sent Events: a `context` event with the
+    retrieved document ids, `token` events as text arrives, then `done` or `error`.
+    """
+    async def events():
+        try:
+            async for event, data in stream_bot_response(
+                user_query=request.message, location=request.location, session_id=request.session_id
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield f"event: error\ndata: {json.dumps({'message': 'An error occurred while processing your chat request.'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens reach slow mobile clients immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/api/crop-recommendations", response_model=CropRecommendationResponse)
 async def crop_recommendations(request: LocationRequest):
     """Endpoint to get crop recommendations for a location."""
     try:
+        # Normally a lookup in the in-memory profile table, but the first call builds the
+        # table if the startup preload failed, so it stays off the event loop
         recommendations = await run_in_threadpool(
             get_crop_recommendations, district=request.district, state=request.state
         )
@@ -115,19 +286,81 @@ async def crop_recommendations(request: LocationRequest):
         logger.error(f"Crop recommendation endpoint error: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching crop recommendations.")
 
+@app.post("/api/crop-prediction", response_model=CropPredictionResponse)
+async def crop_prediction(request: CropPredictionRequest):
+    """
+    Top-k crops with probabilities from the trained model, for one
+    (temperature, humidity) pair or a batch of `samples`, scored in one call.
+    """
+    model = get_crop_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="The crop model is not available on this server.")
+    if request.samples is not None:
+        samples = np.asarray(request.samples, dtype=np.float32)
+    elif request.temperature is not None and request.humidity is not None:
+        samples = np.array([[request.temperature, request.humidity]], dtype=np.float32)
+    else:
+        raise HTTPException(status_code=400, detail="Provide temperature and humidity, or samples.")
+    if samples.ndim != 2 or samples.shape[1] != 2 or not len(samples):
+        raise HTTPException(status_code=400, detail="samples must be a non-empty list of [temperature, humidity] rows.")
+    predictions = await run_in_threadpool(model.recommend, samples, request.top_k)
+    return {"version": model.version, "predictions": predictions}
+
 @app.post("/api/weather-analysis", response_model=WeatherAnalysisResponse)
 async def weather_analysis(request: WeatherAnalysisRequest):
     """Endpoint for the main weather analysis dashboard."""
     try:
-        analysis_data = await run_in_threadpool(
-            get_weather_analysis, location=request.location, crop=request.crop
-        )
+        analysis_data = await get_weather_analysis(location=request.location, crop=request.crop, use_llm=request.use_llm)
         return WeatherAnalysisResponse(**analysis_data)
     except Exception as e:
         logger.error(f"Weather analysis endpoint error: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while generating the weather analysis.")
 
+@app.post("/api/weather-analysis/batch", response_model=BatchWeatherAnalysisResponse)
+async def weather_analysis_batch(request: BatchWeatherAnalysisRequest):
+    """
+    Dashboards for many locations and crops in one call: one weather fetch
+    per distinct location, run concurrently, and one insight pass per
+    location. Pairs whose location failed carry an error instead.
+    """
+    if len(request.locations) > MAX_BATCH_LOCATIONS or len(request.crops) > MAX_BATCH_CROPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_LOCATIONS} locations and {MAX_BATCH_CROPS} crops per request.",
+        )
+    if not any(l.strip() for l in request.locations) or not any(c.strip() for c in request.crops):
+        raise HTTPException(status_code=400, detail="Provide at least one location and one crop.")
+    results = await get_weather_analyses(request.locations, request.crops, use_llm=request.use_llm)
+    return {"results": results, "failed": sum(item["error"] is not None for item in results)}
+
+@app.post("/api/yield-prediction", response_model=YieldPredictionResponse)
+async def yield_prediction(request: YieldPredictionRequest):
+    """Endpoint to predict yield and production from historical APY statistics."""
+    engine = get_yield_engine()
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Yield data is not available on this server.")
+    prediction = engine.predict(
+        state=request.state, district=request.district, crop=request.crop,
+        area=request.area, season=request.season,
+    )
+    if prediction is None:
+        raise HTTPException(status_code=404, detail=f"No yield history for {request.crop} in {request.district}, {request.state}.")
+    return YieldPredictionResponse(**prediction)
+
+@app.post("/api/top-crops", response_model=TopCropsResponse)
+async def top_crops(request: TopCropsRequest):
+    """Highest-yielding crops of a district in a season, from the precomputed APY rankings."""
+    engine = get_yield_engine()
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Yield data is not available on this server.")
+    season, crops = engine.top_crops(request.state, request.district, request.season, request.top_n)
+    if not crops:
+        raise HTTPException(status_code=404, detail=f"No {season} yield history for {request.district}, {request.state}.")
+    return {"season": season, "crops": crops}
+
 
+# Development server (one process, auto-reload). For production run
+# serve.py, which forks preloaded workers that share the models' memory.
 if __name__ == '__main__':
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,300 @@
+"""
+In-process metrics for the API server, exported in the Prometheus text
+format at /metrics and optionally as OpenTelemetry spans.
+
+  - stage latency: `with span("retrieval"):` (or @timed("llm")) records the
+    duration in the cropweather_stage_seconds histogram
+  - thread pool: run_in_threadpool() records how long work queued for a
+    worker thread (stage "threadpool_wait"); the anyio limiter's busy and
+    waiting counts are read at scrape time
+  - upstream calls: http_client counts responses by host and status code,
+    and retry sleeps by host
+  - caches and other components register collectors that report their
+    counters at scrape time (register_collector)
+
+METRICS=off turns span() into a shared no-op (no clock reads, no locks);
+counters and collectors are plain integer updates and stay on.
+OTEL_TRACES=on additionally sends every span to OpenTelemetry through the
+OTLP exporter (configured with the standard OTEL_* environment variables).
+"""
+
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool as _starlette_run_in_threadpool
+
+ENABLED = os.getenv("METRICS", "on").lower() != "off"
+OTEL_TRACES = os.getenv("OTEL_TRACES", "off").lower() == "on"
+PREFIX = "cropweather"
+
+# Seconds; covers in-memory lookups through multi-second LLM round-trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, str, str, Dict[str, str], float]  # name, type, help, labels, value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = f"{PREFIX}_{name}", help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_label_text(dict(zip(self.labels, values)))} {total:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = f"{PREFIX}_{name}", help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(values, list(counts), total) for values, (counts, total) in self._series.items()]
+        for values, counts, total in items:
+            labels = dict(zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_text(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Time spent in each pipeline stage.", ["stage"])
+REQUEST_SECONDS = Histogram("request_seconds", "HTTP request latency by route and status.", ["route", "status"])
+UPSTREAM_RESPONSES = Counter("upstream_responses_total", "Upstream HTTP responses by host and status code.",
+                             ["host", "status"])
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream requests retried after a 429, 5xx or transport error.",
+                           ["host"])
+_instruments = [STAGE_SECONDS, REQUEST_SECONDS, UPSTREAM_RESPONSES, UPSTREAM_RETRIES]
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+
+
+# --- spans ------------------------------------------------------------------
+
+_tracer = None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "start", "otel")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.otel = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.otel = _tracer.start_as_current_span(self.stage)
+            self.otel.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        if self.otel is not None:
+            self.otel.__exit__(*exc)
+        return False
+
+
+def span(stage: str):
+    """Context manager timing one pipeline stage (a no-op when METRICS=off)."""
+    return _Span(stage) if ENABLED else _NOOP
+
+
+def timed(stage: str):
+    """Decorator form of span() for sync and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """starlette's run_in_threadpool, recording the time the call queued for a worker thread."""
+    if not ENABLED:
+        return await _starlette_run_in_threadpool(func, *args, **kwargs)
+    submitted = time.perf_counter()
+
+    def call():
+        STAGE_SECONDS.observe(time.perf_counter() - submitted, "threadpool_wait")
+        return func(*args, **kwargs)
+    return await _starlette_run_in_threadpool(call)
+
+
+def record_upstream(host: str, status) -> None:
+    """Counts one upstream response (status code, or "error" for a transport failure)."""
+    UPSTREAM_RESPONSES.inc(host, str(status))
+
+
+def record_retry(host: str) -> None:
+    UPSTREAM_RETRIES.inc(host)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording each HTTP request's latency by route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The route template (not the raw path) keeps the label set small
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route, str(status[0]))
+
+
+# --- export -----------------------------------------------------------------
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    """Adds a function returning (name, type, help, labels, value) samples, called at every scrape."""
+    _collectors.append(collector)
+
+
+def cache_samples(cache: str, hits: int, misses: int) -> List[Sample]:
+    """Samples for one cache's lookups and hit ratio, for collectors."""
+    lookups = hits + misses
+    labels = {"cache": cache}
+    return [
+        (f"{PREFIX}_cache_hits_total", "counter", "Cache hits.", labels, hits),
+        (f"{PREFIX}_cache_misses_total", "counter", "Cache misses.", labels, misses),
+        (f"{PREFIX}_cache_hit_ratio", "gauge", "Cache hits over lookups since start.", labels,
+         hits / lookups if lookups else 0.0),
+    ]
+
+
+def threadpool_samples() -> List[Sample]:
+    """Busy and waiting workers of anyio's default thread limiter (call from the event loop)."""
+    from anyio import to_thread
+
+    stats = to_thread.current_default_thread_limiter().statistics()
+    return [
+        (f"{PREFIX}_threadpool_busy", "gauge", "Worker threads running blocking calls.", {}, stats.borrowed_tokens),
+        (f"{PREFIX}_threadpool_waiting", "gauge", "Calls queued for a worker thread.", {}, stats.tasks_waiting),
+        (f"{PREFIX}_threadpool_size", "gauge", "Worker thread limit.", {}, stats.total_tokens),
+    ]
+
+
+def render(extra: Iterable[Sample] = ()) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for instrument in _instruments:
+        lines.extend(instrument.render())
+
+    samples = list(extra)
+    for collector in _collectors:
+        try:
+            samples.extend(collector())
+        except Exception as e:
+            print(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+    # Each metric family's samples must be contiguous
+    families: Dict[str, List[str]] = {}
+    for name, kind, help, labels, value in samples:
+        if name not in families:
+            families[name] = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        families[name].append(f"{name}{_label_text(labels)} {float(value):g}")
+    for family in families.values():
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
+
+
+def init_tracing(service_name: str = "cropweather-api") -> bool:
+    """Sends spans to OpenTelemetry when OTEL_TRACES=on; returns whether tracing is active."""
+    global _tracer
+    if not (OTEL_TRACES and ENABLED) or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"⚠️ OpenTelemetry is not installed ({e}); traces disabled.")
+        return False
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    print("✅ OpenTelemetry tracing enabled")
+    return True
+
+
+def shutdown_tracing() -> None:
+    if _tracer is not None:
+        from opentelemetry import trace
+
+        trace.get_tracer_provider().shutdown()
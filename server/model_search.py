@@ -0,0 +1,260 @@
+"""
+Hyperparameter search driver for the crop models.
+
+Replaces RandomizedSearchCV(n_jobs=-1) around estimators that are
+themselves multi-threaded, which oversubscribes the cores and recomputes
+every fit on every run:
+
+  - Parallelism is planned per batch of fits: `outer` fits run at once in
+    joblib worker processes and each gets `inner` = cores // outer threads
+    (the estimator's n_jobs, and the OpenMP/BLAS limit in the worker).
+  - Successive halving: all sampled candidates are scored with a small
+    budget of trees, the best 1/factor survive to the next rung with factor
+    times the budget, until the full budget.
+  - Every (data, estimator params, budget, fold) score is stored in a SQLite
+    file, so reruns and enlarged grids only fit what has not been seen.
+
+Works with any sklearn-style estimator whose size is set by n_estimators:
+the XGBoost temperature/humidity model (crop_recommendation.py) and the
+rainfall RandomForest (train.ipynb).
+
+Usage (from server/):
+    python model_search.py rf [--candidates 16] [--cv 3]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from joblib import Parallel, delayed, parallel_config
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+
+from data_store import CACHE_DIR
+
+SEARCH_CACHE_PATH = os.getenv("MODEL_SEARCH_CACHE", os.path.join(CACHE_DIR, "model_search.sqlite"))
+# Parameters that change speed, not results; left out of cache keys
+RUNTIME_PARAMS = {"n_jobs", "nthread", "verbose", "verbosity"}
+
+
+def data_hash(X, y) -> str:
+    """Content digest of the training data, stable across processes."""
+    digest = hashlib.sha256()
+    for array in (np.asarray(X), np.asarray(y)):
+        if array.dtype == object:
+            # tobytes() of an object array is its pointers; hash the labels as fixed-width text
+            array = array.astype(str)
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def plan_parallelism(tasks: int, cores: Optional[int] = None, max_outer: Optional[int] = None):
+    """(outer, inner): concurrent fits and threads per fit, with outer * inner <= cores."""
+    cores = cores or os.cpu_count() or 1
+    outer = max(1, min(tasks, cores, max_outer or cores))
+    return outer, max(1, cores // outer)
+
+
+class FoldCache:
+    """Scores of finished fold fits in SQLite; only the driver process reads and writes it."""
+
+    def __init__(self, path: Optional[str] = SEARCH_CACHE_PATH):
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fold_scores ("
+                " key TEXT PRIMARY KEY, score REAL NOT NULL, fit_seconds REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(estimator, data_digest: str, cv: int, seed: int, fold: int) -> str:
+        params = {k: v for k, v in estimator.get_params().items() if k not in RUNTIME_PARAMS}
+        payload = json.dumps({
+            "estimator": type(estimator).__name__,
+            "params": params,
+            "data": data_digest,
+            "cv": cv,
+            "seed": seed,
+            "fold": fold,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, float]:
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = list(keys[start:start + 500])
+            rows = self._db.execute(
+                f"SELECT key, score FROM fold_scores WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, rows) -> None:
+        """rows: iterable of (key, score, fit_seconds)."""
+        if self._db is None:
+            return
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO fold_scores (key, score, fit_seconds, created) VALUES (?, ?, ?, ?)",
+                [(k, s, t, now) for k, s, t in rows],
+            )
+
+
+def _fit_fold(estimator, X, y, train_idx, test_idx):
+    start = time.perf_counter()
+    estimator.fit(X[train_idx], y[train_idx])
+    score = float(estimator.score(X[test_idx], y[test_idx]))
+    return score, time.perf_counter() - start
+
+
+class SearchResult(NamedTuple):
+    best_params: dict
+    best_score: float
+    best_estimator: object
+    history: List[dict]   # one row per (rung, candidate): params, n_estimators, mean score
+    fits: int             # fold fits actually run
+    cached: int           # fold scores reused from the cache
+
+
+def successive_halving(estimator, param_distributions, X, y, *, n_candidates=16, min_resource=50,
+                       max_resource=800, factor=3, cv=3, seed=42, cores=None, max_outer=None,
+                       cache: Optional[FoldCache] = None, refit=True, verbose=True) -> SearchResult:
+    """
+    Successive-halving search over n_estimators. `param_distributions` must
+    not contain n_estimators (it is the budget). Fold splits are fixed by
+    (cv, seed), so cached scores stay valid across runs.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    cache = cache if cache is not None else FoldCache()
+    digest = data_hash(X, y)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(X, y))
+    candidates = list(ParameterSampler(param_distributions, n_iter=n_candidates, random_state=seed))
+
+    history, fits, cached = [], 0, 0
+    resource = min(min_resource, max_resource)
+    while True:
+        configured = [clone(estimator).set_params(**params, n_estimators=resource) for params in candidates]
+        keys = [[FoldCache.key(est, digest, cv, seed, f) for f in range(cv)] for est in configured]
+        known = cache.get_many([k for row in keys for k in row])
+        todo = [(c, f) for c in range(len(candidates)) for f in range(cv) if keys[c][f] not in known]
+
+        if todo:
+            outer, inner = plan_parallelism(len(todo), cores, max_outer)
+            start = time.perf_counter()
+            with parallel_config(backend="loky", inner_max_num_threads=inner):
+                results = Parallel(n_jobs=outer)(
+                    delayed(_fit_fold)(
+                        clone(configured[c]).set_params(n_jobs=inner), X, y, folds[f][0], folds[f][1]
+                    )
+                    for c, f in todo
+                )
+            cache.put_many((keys[c][f], score, seconds) for (c, f), (score, seconds) in zip(todo, results))
+            known.update((keys[c][f], score) for (c, f), (score, _) in zip(todo, results))
+            if verbose:
+                print(f"  rung n_estimators={resource}: {len(todo)} fits ({outer} x {inner} threads) "
+                      f"in {time.perf_counter() - start:.1f}s, {len(keys) * cv - len(todo)} cached")
+        elif verbose:
+            print(f"  rung n_estimators={resource}: all {len(keys) * cv} fold scores cached")
+        fits += len(todo)
+        cached += len(keys) * cv - len(todo)
+
+        means = np.array([np.mean([known[k] for k in row]) for row in keys])
+        for params, score in zip(candidates, means):
+            history.append({"params": params, "n_estimators": resource, "score": float(score)})
+
+        order = np.argsort(-means, kind="stable")
+        if resource >= max_resource or len(candidates) == 1:
+            best = int(order[0])
+            break
+        keep = max(1, math.ceil(len(candidates) / factor))
+        candidates = [candidates[i] for i in order[:keep]]
+        resource = min(resource * factor, max_resource)
+
+    best_params = dict(candidates[best], n_estimators=resource)
+    best_estimator = None
+    if refit:
+        best_estimator = clone(estimator).set_params(**best_params, n_jobs=cores or os.cpu_count() or 1)
+        best_estimator.fit(X, y)
+    return SearchResult(best_params, float(means[best]), best_estimator, history, fits, cached)
+
+
+# --- search spaces ----------------------------------------------------------
+
+XGB_SPACE = {
+    "max_depth": [3, 4, 5, 6],
+    "learning_rate": [0.01, 0.05, 0.1],
+    "subsample": [0.8, 1.0],
+    "colsample_bytree": [0.8, 1.0],
+    "gamma": [0, 1],
+    "reg_alpha": [0, 0.1],
+    "reg_lambda": [1, 2],
+    "min_child_weight": [1, 3],
+}
+
+RF_SPACE = {
+    "max_depth": [None, 10, 20, 30],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features": ["sqrt", 0.5, None],
+    "class_weight": [None, "balanced"],
+}
+
+
+def xgb_estimator(num_class: int):
+    from xgboost import XGBClassifier
+
+    return XGBClassifier(
+        objective="multi:softprob",  # probabilities for top-k recommendations
+        num_class=num_class,
+        random_state=42,
+        eval_metric="mlogloss",
+        tree_method="hist",
+    )
+
+
+def rf_estimator():
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(random_state=42)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached successive-halving search for the rainfall RandomForest.")
+    parser.add_argument("model", choices=["rf"], help="rf: train.ipynb rainfall model (xgb: run crop_recommendation.py)")
+    parser.add_argument("--candidates", type=int, default=16)
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--min-trees", type=int, default=25)
+    parser.add_argument("--max-trees", type=int, default=200)
+    parser.add_argument("--jobs", type=int, help="Max concurrent fits (default: all cores)")
+    args = parser.parse_args()
+
+    from rainfall_features import FEATURE_COLUMNS, load_features
+
+    features = load_features(columns=FEATURE_COLUMNS + ["CROP"])
+    X = features[FEATURE_COLUMNS].to_numpy(np.float32)
+    y = np.asarray(features["CROP"].astype(str))
+    start = time.perf_counter()
+    result = successive_halving(
+        rf_estimator(), RF_SPACE, X, y, n_candidates=args.candidates, cv=args.cv,
+        min_resource=args.min_trees, max_resource=args.max_trees, max_outer=args.jobs, refit=False,
+    )
+    print(f"✅ Best CV accuracy {result.best_score:.4f} with {result.best_params} "
+          f"({result.fits} fits, {result.cached} cached, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
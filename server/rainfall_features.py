@@ -0,0 +1,148 @@
+"""
+Per-year, per-district rainfall features for the rainfall crop model.
+
+District_Rainfall_Normal_0.csv only has long-term monthly normals per
+district, while Sub_Division_IMD_2017.csv has actual monthly rainfall per
+IMD subdivision for 1901-2017. Every district is joined to its subdivision
+(district_profiles.district_subdivisions) and each year is estimated by
+scaling the district's normal with its subdivision's anomaly for that month:
+
+    district[year, month] = district_normal[month] * subdivision[year, month] / subdivision_mean[month]
+
+Seasonal totals are recomputed from the scaled months and each row gets a
+CROP label from the same rules train.ipynb used, via np.select. The whole
+district x year x month grid is computed with array broadcasting and written
+in the columnar cache format (data_store).
+
+Usage (from server/):
+    python rainfall_features.py [--out DIR] [--csv merged_rainfall.csv]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import CACHE_DIR, load_table, read_table, source_stamps, table_source, write_table
+from district_profiles import (
+    DISTRICT_SUBDIVISION_PATH,
+    MONTHS,
+    RAINFALL_NORMALS_PATH,
+    SUBDIVISION_HISTORY_PATH,
+    canonical_state,
+    canonical_subdivision,
+    district_subdivisions,
+)
+from yield_prediction import normalize_key
+
+FEATURES_DIR = os.path.join(CACHE_DIR, "rainfall_features")
+SOURCES = (RAINFALL_NORMALS_PATH, SUBDIVISION_HISTORY_PATH, DISTRICT_SUBDIVISION_PATH)
+FEATURES_VERSION = 1
+
+SEASONS = {"JF": [0, 1], "MAM": [2, 3, 4], "JJAS": [5, 6, 7, 8], "OND": [9, 10, 11]}
+# Model inputs used by train.ipynb
+FEATURE_COLUMNS = ["JAN_DISTRICT", "FEB_DISTRICT", "MAR_DISTRICT",
+                   "MAM_DISTRICT", "JJAS_DISTRICT", "OND_DISTRICT", "ANNUAL_DISTRICT"]
+
+
+def label_crops(jjas: np.ndarray, ond: np.ndarray, annual: np.ndarray) -> np.ndarray:
+    """The notebook's recommend_crop rules, evaluated for all rows at once."""
+    return np.select(
+        [jjas > 800, (ond > 300) & (annual > 600), annual < 500],
+        ["Rice", "Wheat", "Pulses"],
+        default="Maize",
+    )
+
+
+def build_features() -> pd.DataFrame:
+    """The full district x year feature table (rows whose subdivision has no history are skipped)."""
+    normals = load_table(RAINFALL_NORMALS_PATH)
+    districts = pd.DataFrame({
+        "state": normals["STATE/UT"].astype(str).map(canonical_state),
+        "district": normals["DISTRICT"].astype(str).map(normalize_key),
+    })
+    districts["subdivision"] = district_subdivisions(districts)
+    district_normals = np.column_stack([normals[m].astype(np.float64) for m in MONTHS])  # (d, 12)
+
+    history = load_table(SUBDIVISION_HISTORY_PATH, columns=["SUBDIVISION", "YEAR"] + MONTHS)
+    sub_codes, subdivisions = pd.factorize(history["SUBDIVISION"].astype(str).str.strip())
+    years = history["YEAR"].to_numpy(np.int64)
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+
+    # (subdivision, year, month) grid; years a subdivision did not report stay NaN
+    grid = np.full((len(subdivisions), n_years, 12), np.nan)
+    grid[sub_codes, years - first_year] = np.column_stack([history[m].astype(np.float64) for m in MONTHS])
+    monthly_mean = np.nanmean(grid, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anomaly = np.where(monthly_mean > 0, grid / monthly_mean, 1.0)
+    # A missing month counts as normal; a whole missing year is dropped below
+    reported = ~np.isnan(grid).all(axis=2)
+    anomaly = np.nan_to_num(anomaly, nan=1.0)
+
+    district_sub = pd.Index(subdivisions.map(canonical_subdivision)).get_indexer(districts["subdivision"])
+    has_history = district_sub >= 0
+    d_idx = np.flatnonzero(has_history)
+    s_idx = district_sub[d_idx]
+
+    scaled = district_normals[d_idx, None, :] * anomaly[s_idx]            # (d, y, 12)
+    keep = reported[s_idx].ravel()                                         # (d * y,)
+    monthly = scaled.reshape(-1, 12)[keep]
+
+    row_district = np.repeat(d_idx, n_years)[keep]
+    row_year = np.tile(np.arange(first_year, first_year + n_years), len(d_idx))[keep]
+
+    columns = {
+        "STATE/UT": normals["STATE/UT"].astype(str).to_numpy()[row_district],
+        "DISTRICT": normals["DISTRICT"].astype(str).to_numpy()[row_district],
+        "SUBDIVISION": np.asarray(subdivisions)[district_sub[row_district]],
+        "YEAR": row_year.astype(np.int32),
+    }
+    for j, month in enumerate(MONTHS):
+        columns[f"{month}_DISTRICT"] = monthly[:, j]
+    for season, months in SEASONS.items():
+        columns[f"{season}_DISTRICT"] = monthly[:, months].sum(axis=1)
+    columns["ANNUAL_DISTRICT"] = monthly.sum(axis=1)
+    columns["JJAS_ANOMALY"] = anomaly[s_idx][..., 5:9].mean(axis=2).reshape(-1)[keep]
+    columns["CROP"] = label_crops(columns["JJAS_DISTRICT"], columns["OND_DISTRICT"], columns["ANNUAL_DISTRICT"])
+
+    skipped = int((~has_history).sum())
+    if skipped:
+        print(f"⚠️ {skipped} districts have no subdivision history and were skipped")
+    return pd.DataFrame(columns)
+
+
+def write_features(out_dir: str = FEATURES_DIR) -> pd.DataFrame:
+    features = build_features()
+    write_table(features, out_dir, source=source_stamps(SOURCES, FEATURES_VERSION))
+    return features
+
+
+def load_features(columns=None, out_dir: str = FEATURES_DIR) -> pd.DataFrame:
+    """Reads the feature table (memory-mapped), rebuilding it first if a source changed."""
+    if table_source(out_dir) != source_stamps(SOURCES, FEATURES_VERSION):
+        write_features(out_dir)
+    return read_table(out_dir, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-year district rainfall features.")
+    parser.add_argument("--out", default=FEATURES_DIR, help="Columnar output directory")
+    parser.add_argument("--csv", help="Also export the table as CSV to this path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features = write_features(args.out)
+    print(f"✅ {len(features)} rows ({features['DISTRICT'].nunique()} districts, "
+          f"{features['YEAR'].min()}-{features['YEAR'].max()}) written to {args.out} "
+          f"in {time.perf_counter() - start:.2f}s")
+    print(features["CROP"].value_counts().to_string())
+    if args.csv:
+        features.to_csv(args.csv, index=False)
+        print(f"✅ CSV exported to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
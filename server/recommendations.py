@@ -1,40 +1,21 @@
 from typing import Optional, Dict, List, Any
-from vector_db import query_db
+from district_profiles import get_district_profiles
 
 def get_crop_recommendations(district: str, state: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Queries the vector database to get crop recommendations for a given location.
-    
-    NOTE: This is a simplified implementation. A more advanced version would involve
-    more sophisticated querying and processing of the results from the vector DB.
+    Gets crop recommendations for a location from the precomputed district
+    climate profiles (see district_profiles.py): a table lookup, no vector search.
+    Unknown districts fall back to the state's average profile.
     """
-    location_query = state or district
-    
-    # Formulate a query to find relevant documents about farming conditions
-    query_text = f"Farming conditions, soil, and suitable crops for {location_query}"
-    
     try:
-        # Query the database for multiple relevant documents
-        documents, metadatas = query_db(query_text, location=location_query, n_results=5)
-        
-        # --- Placeholder Logic ---
-        # TODO: In the future, we will write code here to parse the 'documents' and 'metadatas'
-        # to dynamically generate the recommendations based on the database content.
-        # For now, we return a structured, hardcoded response to get the API working.
-
-        favorable_crops = [
-            {"name": "Rice", "reason": "Ideal monsoon conditions", "favorability": "Excellent"},
-            {"name": "Wheat", "reason": "Suitable winter temperature", "favorability": "Excellent"},
-            {"name": "Cotton", "reason": "Good soil drainage", "favorability": "Excellent"},
-        ]
-        unfavorable_crops = [
-            {"name": "Apple", "reason": "Insufficient chilling hours", "favorability": "Challenging"},
-            {"name": "Saffron", "reason": "Requires specific cold, dry climate", "favorability": "Challenging"},
-        ]
-
-        return {"favorable": favorable_crops, "unfavorable": unfavorable_crops}
+        profiles = get_district_profiles()
+        recommendations = profiles.recommend(district, state) if profiles is not None else None
+        if recommendations is None:
+            print(f"No climate profile for {district}, {state}")
+            return {"favorable": [], "unfavorable": []}
+        return recommendations
 
     except Exception as e:
         print(f"Error getting crop recommendations: {e}")
         # Return empty lists in case of an error
-        return {"favorable": [], "unfavorable": []}
\ No newline at end of file
+        return {"favorable": [], "unfavorable": []}
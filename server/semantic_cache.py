@@ -0,0 +1,140 @@
+"""
+Semantic answer cache for the chatbot.
+
+Stores (query embedding, location, reply) for answered questions. A new
+question from the same location whose embedding has cosine similarity of at
+least `threshold` with a cached one is answered from the cache, skipping
+retrieval and the LLM round-trip. The embedding is the one query_db already
+computes, so a lookup costs one matrix-vector product.
+
+Entries expire after `ttl` seconds, the oldest are evicted beyond
+`max_entries`, and the whole cache is dropped when the knowledge-base
+manifest version changes (i.e. after build_db.py rebuilds or syncs it).
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_location(location: Optional[str]) -> str:
+    return " ".join((location or "").split()).lower()
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, ttl: float = 86400, max_entries: int = 5000,
+                 version_fn: Optional[Callable[[], int]] = None, version_check_interval: float = 30.0):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version_fn = version_fn
+        self._version_check_interval = version_check_interval
+        self._version = version_fn() if version_fn else None
+        self._version_checked = time.monotonic()
+        self._lock = threading.Lock()
+        self._reset()
+        self.hits = 0
+        self.misses = 0
+
+    def _reset(self) -> None:
+        # Per-location matrices keep lookups to one matrix-vector product
+        self._vectors = {}     # location -> (n, d) float32, L2-normalized rows
+        self._replies = {}     # location -> list of replies
+        self._stored_at = {}   # location -> list of timestamps
+        self._size = 0
+
+    def _check_version(self) -> None:
+        if self._version_fn is None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked < self._version_check_interval:
+            return
+        self._version_checked = now
+        version = self._version_fn()
+        if version != self._version:
+            self._version = version
+            self._reset()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, location: str, now: float) -> None:
+        stored = self._stored_at.get(location)
+        if not stored or now - stored[0] <= self.ttl:
+            return
+        keep = [i for i, t in enumerate(stored) if now - t <= self.ttl]
+        self._size -= len(stored) - len(keep)
+        self._vectors[location] = self._vectors[location][keep]
+        self._replies[location] = [self._replies[location][i] for i in keep]
+        self._stored_at[location] = [stored[i] for i in keep]
+
+    def get(self, embedding, location: Optional[str]) -> Optional[str]:
+        location = normalize_location(location)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            self._expire(location, now)
+            vectors = self._vectors.get(location)
+            if vectors is None or not len(vectors):
+                self.misses += 1
+                return None
+            scores = vectors @ self._unit(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._replies[location][best]
+
+    def put(self, embedding, location: Optional[str], reply: str) -> None:
+        location = normalize_location(location)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            self._expire(location, now)
+            vector = self._unit(embedding)[None, :]
+            if location in self._vectors:
+                self._vectors[location] = np.vstack([self._vectors[location], vector])
+            else:
+                self._vectors[location] = vector
+            self._replies.setdefault(location, []).append(reply)
+            self._stored_at.setdefault(location, []).append(now)
+            self._size += 1
+            if self._size > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        location = min(self._stored_at, key=lambda loc: self._stored_at[loc][0] if self._stored_at[loc] else float("inf"))
+        self._vectors[location] = self._vectors[location][1:]
+        self._replies[location].pop(0)
+        self._stored_at[location].pop(0)
+        self._size -= 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "kb_version": self._version,
+        }
+
+
+def create_cache(version_fn=None) -> SemanticCache:
+    return SemanticCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+        ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "5000")),
+        version_fn=version_fn,
+    )
@@ -0,0 +1,202 @@
+"""
+Production launcher: N uvicorn workers forked from one preloaded parent.
+
+The parent binds the listening socket and loads the read-only state once
+(yield engine, crop model, district profiles, the embedding model and the
+numpy/HNSW and BM25 indexes), then forks the workers. Copy-on-write lets all
+workers share those pages instead of each loading its own copy; gc.freeze()
+keeps the garbage collector from touching (and so copying) them.
+
+Per-process resources are never inherited: Chroma, the httpx clients and the
+other lazy singletons are reset in each worker, as are the embedding batcher
+thread and the embedding cache's SQLite connection. No encode runs in the
+parent, so torch's thread pool is first started inside the workers.
+
+Threads: each worker gets cores / workers torch (and ONNX Runtime) threads.
+With --embedding-server the model lives in one embedding_server.py process
+instead, the workers do not load it at all, and that process gets
+--embed-threads threads.
+
+Metrics are per process; each worker's /metrics describes only itself.
+
+Usage (from server/):
+    python serve.py [--workers 4] [--port 8000] [--embedding-server]
+WEB_CONCURRENCY, PORT and EMBEDDING_SERVER_MODE=on set the same options.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from typing import Dict
+
+from embedding_server import DEFAULT_SOCKET, set_threads
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def start_embedding_server(socket_path: str, threads: int, timeout: float = 300.0) -> subprocess.Popen:
+    """Starts embedding_server.py and waits until its socket accepts connections."""
+    proc = subprocess.Popen([sys.executable, "embedding_server.py", "--socket", socket_path,
+                             "--threads", str(threads)])
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"embedding server exited with code {proc.returncode}")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"embedding server not ready after {timeout:.0f}s")
+
+
+def preload(local_embeddings: bool) -> set:
+    """Loads the shared read-only state; returns the names of the lazy singletons it created."""
+    from bm25_index import get_index as get_bm25_index
+    from crop_model import load_crop_model
+    from district_profiles import load_district_profiles
+    from lazy import warm_up
+    from yield_prediction import load_yield_engine
+    import vector_db
+
+    start = time.perf_counter()
+    load_yield_engine()
+    load_crop_model()
+    load_district_profiles()
+    preloaded = set()
+    if local_embeddings:
+        try:
+            preloaded |= set(warm_up(["embedding_model"]))
+        except Exception as e:
+            print(f"⚠️ Embedding model not preloaded ({e}); each worker will load it on first use.")
+    vector_db.get_vector_index()
+    get_bm25_index()
+    print(f"📦 Preloaded shared state in {time.perf_counter() - start:.2f}s")
+    return preloaded
+
+
+def after_fork(preloaded: set, threads: int) -> None:
+    """Runs in each worker: drops inherited per-process resources and sets its thread budget."""
+    import lazy
+    import vector_db
+
+    for singleton in lazy.registry:
+        if singleton.name not in preloaded:
+            singleton.reset()
+    vector_db.reset_after_fork()
+    set_threads(threads)
+
+
+def run_worker(config, sock: socket.socket, preloaded: set, threads: int) -> None:
+    import uvicorn
+
+    after_fork(preloaded, threads)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cores = available_cores()
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(cores))))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--embedding-server", action="store_true",
+                        default=os.getenv("EMBEDDING_SERVER_MODE", "off").lower() == "on",
+                        help="Encode in one embedding_server.py process instead of in every worker")
+    parser.add_argument("--embedding-socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--embed-threads", type=int, default=max(1, cores // 2),
+                        help="Threads of the embedding server (default: half the cores)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads = max(1, cores // workers)
+    # Must be set before torch / ONNX Runtime are imported by the preload
+    set_threads(threads)
+    # The tokenizer's own thread pool does not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    embedder = None
+    if args.embedding_server:
+        embedder = start_embedding_server(args.embedding_socket, args.embed_threads)
+        os.environ["EMBEDDING_SERVER"] = args.embedding_socket
+
+    import uvicorn
+    from main import app
+
+    preloaded = preload(local_embeddings=embedder is None)
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    sock = config.bind_socket()
+    # Objects allocated so far are never collected, so the collector never writes to the shared pages
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Starting {workers} workers x {threads} threads on {args.host}:{args.port} ({cores} cores)")
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(config, sock, preloaded, threads)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if embedder is not None and pid == embedder.pid:
+            print("⚠️ Embedding server exited; stopping workers.")
+            embedder = None
+            stop(None, None)
+            continue
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting it.")
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # a worker that dies at startup is not restarted in a tight loop
+        spawn()
+
+    sock.close()
+    if embedder is not None:
+        embedder.terminate()
+        embedder.wait()
+
+
+if __name__ == "__main__":
+    main()
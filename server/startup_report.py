@@ -0,0 +1,73 @@
+"""
+Startup-time report for the API server.
+
+Shows where cold-start time goes:
+  1. Import cost of `main` broken down by top-level package (python -X importtime,
+     run in a fresh interpreter so nothing is cached).
+  2. Load time of every lazy singleton (embedding model, Chroma collection,
+     HTTP sessions) when it is first created.
+
+Usage (from server/):
+    python startup_report.py [--top 15] [--skip-warmup]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module="main"):
+    """Returns (total seconds, {root package: exclusive import seconds})."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    packages = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, _, _, name = match.groups()
+        # Self times are exclusive, so summing them per root package attributes every microsecond once
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+    total = sum(packages.values())
+    return total, dict(packages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where server start-up time goes.")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--skip-warmup", action="store_true", help="Only profile imports")
+    args = parser.parse_args()
+
+    total, packages = import_profile("main")
+    print(f"Import of main: {total:.2f}s")
+    for name, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<28} {seconds:7.3f}s  {seconds / total:6.1%}")
+
+    if args.skip_warmup:
+        return
+
+    start = time.perf_counter()
+    import main  # noqa: F401  (registers every lazy singleton)
+    import lazy
+    print(f"\nIn-process import of main: {time.perf_counter() - start:.2f}s")
+    print("Lazy singletons (first use):")
+    for item in lazy.registry:
+        try:
+            item.get()
+            print(f"  {item.name:<28} {item.load_seconds:7.3f}s")
+        except Exception as e:
+            print(f"  {item.name:<28}  failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import the server modules the way the server does (run from server/)
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+# Keep columnar caches and search caches out of the working tree
+os.environ.setdefault("DATA_CACHE_DIR", tempfile.mkdtemp(prefix="cropweather-test-cache-"))
+# The API modules refuse to import without keys; tests never call the real upstreams
+os.environ.setdefault("WEATHER_API_KEY", "test")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("WARMUP", "off")
+# Relative data paths (CSV sources, farming_db) resolve from server/, as when the server runs
+os.chdir(SERVER_DIR)
+
+
+@pytest.fixture(scope="session")
+def api():
+    """TestClient for the FastAPI app, with its lifespan (data loading) run once."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
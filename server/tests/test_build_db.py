@@ -0,0 +1,103 @@
+import functools
+
+import pandas as pd
+
+import build_db
+from build_db import build_documents, diff_hashes, prune_stale
+from kb_manifest import document_hash, kb_version, load_manifest, save_manifest
+
+
+def test_build_documents_namespaces_ids_by_source_file():
+    df = pd.DataFrame({"id": [1, 2], "state": ["Punjab", None], "crop": ["Wheat", "Rice"],
+                       "disease": ["Rust", "Blast"], "causal_agent": ["Puccinia", "Magnaporthe"]})
+    docs, ids, metadatas = build_documents(df, "data/using1.csv")
+    assert ids == ["using1_1_1", "using1_2_1", "using1_1_2", "using1_2_2"]
+    assert docs[0].startswith("Crop: Wheat | Disease: Rust | Causal Agent: Puccinia")
+    assert metadatas[3]["state"] == "NA"
+
+
+def test_diff_hashes():
+    old = {"a": "1", "b": "2", "c": "3"}
+    new = {"a": "1", "b": "changed", "d": "4"}
+    assert diff_hashes(old, new) == (["d"], ["b"], ["c"])
+
+
+def test_document_hash_ignores_metadata_key_order():
+    assert document_hash("doc", {"a": 1, "b": 2}) == document_hash("doc", {"b": 2, "a": 1})
+    assert document_hash("doc", {"a": 1}) != document_hash("doc", {"a": 2})
+
+
+def test_manifest_version_increments(tmp_path):
+    path = str(tmp_path / "kb_manifest.json")
+    assert kb_version(path) == 0
+    first = save_manifest({"a": "1"}, path=path)
+    save_manifest({"a": "2"}, path=path, previous=first)
+    assert kb_version(path) == 2
+    assert load_manifest(path)["documents"] == {"a": "2"}
+
+
+def _stored(monkeypatch, ids):
+    deleted = []
+    monkeypatch.setattr(build_db, "get_all_documents",
+                        lambda: (ids, [f"doc {i}" for i in ids], [{"id": i} for i in ids]))
+    monkeypatch.setattr(build_db, "delete_from_db", deleted.extend)
+    return deleted
+
+
+def test_full_build_deletes_ids_from_the_old_scheme(monkeypatch):
+    deleted = _stored(monkeypatch, ["880_1", "using1_880_1", "weather_Punjab"])
+    hashes = {"using1_880_1": "h"}
+    assert prune_stale(hashes) == ["880_1", "weather_Punjab"]
+    assert deleted == ["880_1", "weather_Punjab"]
+    assert hashes == {"using1_880_1": "h"}
+
+
+def test_full_build_without_weather_keeps_weather_documents(monkeypatch):
+    deleted = _stored(monkeypatch, ["880_1", "weather_Punjab"])
+    hashes = {}
+    assert prune_stale(hashes, with_weather=False) == ["880_1"]
+    assert deleted == ["880_1"]
+    assert hashes == {"weather_Punjab": document_hash("doc weather_Punjab", {"id": "weather_Punjab"})}
+
+
+def test_read_kb_csv_normalizes_columns_and_numbers_rows(tmp_path):
+    path = tmp_path / "kb.csv"
+    path.write_text(" State ,CROP\nPunjab,Wheat\nKerala,Rice\nBihar,Maize\n", encoding="utf-8")
+    chunks = list(build_db.read_kb_csv(str(path), chunk_size=2))
+    assert [list(c.columns) for c in chunks] == [["state", "crop"], ["state", "crop"]]
+    assert [list(c.index) for c in chunks] == [[0, 1], [2]]
+    resumed = list(build_db.read_kb_csv(str(path), chunk_size=2, rows_done=2))
+    assert list(resumed[0].index) == [2] and resumed[0]["state"].tolist() == ["Bihar"]
+    _, ids, metadatas = build_documents(chunks[0], str(path))
+    assert ids == ["kb_row0_2", "kb_row1_2"]
+    assert metadatas[0] == {"state": "Punjab", "crop": "Wheat"}
+
+
+def test_ingest_resumes_after_the_last_checkpointed_chunk(tmp_path, monkeypatch):
+    csv = tmp_path / "kb.csv"
+    csv.write_text("id,state,crop\n1,Punjab,Wheat\n2,Kerala,Rice\n3,Bihar,Maize\n", encoding="utf-8")
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    monkeypatch.setattr(build_db, "save_checkpoint", functools.partial(build_db.save_checkpoint, path=checkpoint_path))
+
+    upserted = []
+
+    def flaky_upsert(docs, ids, metadatas, batch_size):
+        if any(i.startswith("kb_3") for i in ids):
+            raise RuntimeError("interrupted")
+        upserted.extend(ids)
+    monkeypatch.setattr(build_db, "upsert_to_db", flaky_upsert)
+
+    checkpoint = {"files": {}, "weather_done": []}
+    try:
+        build_db.ingest_file(str(csv), checkpoint, chunk_size=2, with_weather=False)
+    except RuntimeError:
+        pass
+    saved = build_db.load_checkpoint(checkpoint_path)
+    assert saved["files"][str(csv)]["rows_done"] == 2
+    assert upserted == ["kb_1_2", "kb_2_2"]
+
+    monkeypatch.setattr(build_db, "upsert_to_db", lambda docs, ids, metadatas, batch_size: upserted.extend(ids))
+    build_db.ingest_file(str(csv), saved, chunk_size=2, with_weather=False)
+    assert upserted == ["kb_1_2", "kb_2_2", "kb_3_2"]
+    assert saved["files"][str(csv)]["complete"] is True
+    assert sorted(saved["hashes"]) == ["kb_1_2", "kb_2_2", "kb_3_2"]
@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+
+import climatology
+from analysis import weather_metrics
+from climatology import FORECAST_DAYS, condition_slug, forecast
+from insights import evaluate
+
+CURRENT = {"temperature": 28.0, "humidity": 50.0, "rainfall": 0.0, "windSpeed": 5, "condition": "clear sky"}
+
+
+def test_forecast_from_district_normals():
+    days, summary = forecast("Ludhiana, Punjab", 30.0, 50.0, 2.0, "light-rain", today=date(2024, 7, 1))
+    assert len(days) == FORECAST_DAYS
+    assert days[0] == {"day": "Today", "temp": 30.0, "rain": 2.0, "condition": "light-rain"}
+    assert summary["source"] == "district"
+    assert summary["week_rain_low"] <= summary["week_rain"] <= summary["week_rain_high"]
+
+
+def test_without_profiles_there_is_no_rain_outlook(monkeypatch):
+    monkeypatch.setattr(climatology, "get_district_profiles", lambda: None)
+    days, summary = forecast("Ludhiana, Punjab", 30.0, 50.0, 0.0, "sunny", today=date(2024, 7, 1))
+    assert len(days) == FORECAST_DAYS
+    assert summary == {"week_rain": None, "week_rain_low": None, "week_rain_high": None, "source": "none"}
+
+    # No made-up "dry week" advice: the climatology rules are skipped
+    (insights,) = evaluate(weather_metrics(CURRENT, summary), ["Rice"])
+    assert [i["type"] for i in insights] == ["success"]
+
+
+@pytest.mark.parametrize("main, description, slug", [
+    ("Clear", "clear sky", "sunny"),
+    ("Clouds", "few clouds", "partly-cloudy"),
+    ("Clouds", "overcast clouds", "cloudy"),
+    ("Rain", "light rain", "light-rain"),
+    ("Thunderstorm", "thunderstorm with rain", "rain"),
+    ("Haze", "haze", "cloudy"),
+])
+def test_condition_slug(main, description, slug):
+    assert condition_slug(main, description) == slug
@@ -0,0 +1,89 @@
+import pytest
+
+from conversation_store import InMemoryConversationStore, SQLiteConversationStore, estimate_tokens, trim_to_budget
+
+
+def _turns(n, size=40):
+    messages = []
+    for i in range(n):
+        messages += [{"role": "user", "content": f"q{i}".ljust(size)},
+                     {"role": "assistant", "content": f"a{i}".ljust(size)}]
+    return messages
+
+
+def test_trim_drops_oldest_pairs_first():
+    messages = _turns(3)
+    per_turn = 2 * estimate_tokens(messages[0]["content"])
+    trimmed = trim_to_budget(messages, budget=2 * per_turn)
+    assert [m["content"].strip() for m in trimmed] == ["q1", "a1", "q2", "a2"]
+    assert trim_to_budget(messages, budget=10 * per_turn) == messages
+
+
+def test_trim_can_drop_everything_when_one_turn_exceeds_the_budget():
+    assert trim_to_budget(_turns(1, size=400), budget=10) == []
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return InMemoryConversationStore(**kwargs)
+        return SQLiteConversationStore(str(tmp_path / "conversations.db"), **kwargs)
+    return make
+
+
+def test_store_keeps_sessions_separate_and_within_budget(make_store):
+    store = make_store(token_budget=30, max_sessions=10, ttl=60)
+    for i in range(5):
+        store.append("a", f"question {i}".ljust(40), f"reply {i}".ljust(40))
+    store.append("b", "other", "session")
+    history = store.get("a")
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert history[0]["content"].startswith("question 4")
+    assert store.get("b") == [{"role": "user", "content": "other"}, {"role": "assistant", "content": "session"}]
+    store.clear("a")
+    assert store.get("a") == []
+
+
+def test_store_evicts_least_recently_used_sessions(make_store, monkeypatch):
+    import conversation_store
+
+    store = make_store(max_sessions=2, ttl=60)
+    clock = iter(range(1000, 1010))
+    monkeypatch.setattr(conversation_store.time, "time", lambda: float(next(clock)))
+    store.append("a", "q", "r")
+    store.append("b", "q", "r")
+    store.append("c", "q", "r")
+    assert store.get("a") == [] and len(store) == 2
+
+
+def test_store_expires_idle_sessions(make_store, monkeypatch):
+    import conversation_store
+
+    store = make_store(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr(conversation_store.time, "time", lambda: now[0])
+    store.append("a", "q", "r")
+    now[0] += 11
+    assert store.get("a") == []
+
+
+def test_reading_a_session_refreshes_it(make_store, monkeypatch):
+    import conversation_store
+
+    store = make_store(max_sessions=2, ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr(conversation_store.time, "time", lambda: now[0])
+    store.append("a", "q", "r")
+    now[0] += 1
+    store.append("b", "q", "r")
+    now[0] += 1
+    assert store.get("a")            # "a" is now the most recently used session
+    now[0] += 1
+    store.append("c", "q", "r")
+    assert store.get("b") == [] and store.get("a") and len(store) == 2
+
+    now[0] += 8                      # 9s after the last read of "a", 12s after its write
+    assert store.get("a")
+    now[0] += 11
+    assert store.get("a") == [] and len(store) == 1
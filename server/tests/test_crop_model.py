@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import main
+from crop_model import CropModel
+
+
+class FixedProba:
+    """Classifier stand-in returning one probability row per sample."""
+
+    def __init__(self, rows):
+        self.rows = np.asarray(rows, dtype=np.float64)
+
+    def predict_proba(self, X):
+        return self.rows[: len(X)]
+
+
+@pytest.fixture
+def model():
+    return CropModel(FixedProba([[0.1, 0.6, 0.3], [0.5, 0.2, 0.3]]), ["maize", "rice", "wheat"],
+                     {"version": "test"})
+
+
+def test_top_k_sorts_each_row_by_probability(model):
+    labels, proba = model.top_k([[30, 60], [20, 40]], k=2)
+    assert labels.tolist() == [["rice", "wheat"], ["maize", "wheat"]]
+    np.testing.assert_allclose(proba, [[0.6, 0.3], [0.5, 0.3]])
+
+
+def test_top_k_is_clipped_to_the_number_of_classes(model):
+    labels, _ = model.top_k([[30, 60]], k=10)
+    assert labels.shape == (1, 3)
+
+
+def test_recommend_rows_are_json_ready(model):
+    assert model.recommend([[30, 60]], k=1) == [[{"crop": "rice", "probability": 0.6}]]
+
+
+@pytest.fixture
+def served_model(monkeypatch, model):
+    monkeypatch.setattr(main, "get_crop_model", lambda: model)
+    return model
+
+
+def test_prediction_endpoint_scores_a_batch(api, served_model):
+    response = api.post("/api/crop-prediction", json={"samples": [[30, 60], [20, 40]], "top_k": 1})
+    assert response.status_code == 200
+    assert response.json() == {"version": "test", "predictions": [
+        [{"crop": "rice", "probability": 0.6}], [{"crop": "maize", "probability": 0.5}]]}
+
+
+@pytest.mark.parametrize("payload", [
+    {"samples": [[30, 60], [25]]},
+    {"samples": [[30, 60, 1]]},
+    {"temperature": 30, "humidity": 60, "top_k": 0},
+    {"temperature": 30, "humidity": 60, "top_k": -1},
+])
+def test_prediction_endpoint_rejects_malformed_requests(api, served_model, payload):
+    assert api.post("/api/crop-prediction", json=payload).status_code == 422
+
+
+def test_prediction_endpoint_needs_inputs(api, served_model):
+    assert api.post("/api/crop-prediction", json={"samples": []}).status_code == 400
+    assert api.post("/api/crop-prediction", json={"temperature": 30}).status_code == 400
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from data_store import load_table, read_table, source_stamps, table_source, write_table
+
+
+def test_round_trip_keeps_values_in_compact_types(tmp_path):
+    df = pd.DataFrame({
+        "State": [" Punjab ", "Kerala", None],
+        "Year": [1997, 1998, 1999],
+        "Big": [1, 2, 2**40],
+        "Area": [1.5, 2.25, np.nan],
+        "Irrigated": [True, False, True],
+    })
+    write_table(df, str(tmp_path / "table"), source={"version": 1})
+    out = read_table(str(tmp_path / "table"))
+    assert out["State"].tolist()[:2] == ["Punjab", "Kerala"] and pd.isna(out["State"][2])
+    assert out["Year"].dtype == np.int32 and out["Big"].dtype == np.int64
+    assert out["Area"].dtype == np.float32
+    np.testing.assert_allclose(out["Area"][:2], [1.5, 2.25])
+    assert out["Irrigated"].tolist() == [True, False, True]
+    assert table_source(str(tmp_path / "table")) == {"version": 1}
+    assert list(read_table(str(tmp_path / "table"), columns=["Year"]).columns) == ["Year"]
+
+
+def _write_csv(path, rows):
+    pd.DataFrame(rows, columns=[" Crop ", "Area"]).to_csv(path, index=False)
+
+
+def test_load_table_reuses_the_cache_until_the_content_changes(tmp_path, monkeypatch):
+    csv = tmp_path / "apy.csv"
+    _write_csv(csv, [("Rice", 1.0), ("Wheat", 2.0)])
+    cache = str(tmp_path / "cache")
+    first = load_table(str(csv), cache_dir=cache)
+    assert list(first.columns) == ["Crop", "Area"]
+
+    parses = []
+    real_read_csv = pd.read_csv
+    monkeypatch.setattr(data_store.pd, "read_csv", lambda *a, **k: parses.append(a) or real_read_csv(*a, **k))
+
+    # Touched but identical: the stamp is refreshed without reparsing
+    os.utime(csv, ns=(1, 1))
+    assert load_table(str(csv), cache_dir=cache)["Crop"].tolist() == ["Rice", "Wheat"]
+    assert parses == []
+
+    _write_csv(csv, [("Rice", 1.0), ("Maize", 3.0)])
+    assert load_table(str(csv), cache_dir=cache)["Crop"].tolist() == ["Rice", "Maize"]
+    assert len(parses) == 1
+
+
+def test_source_stamps_change_with_the_file_or_version(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_text("a\n1\n")
+    before = source_stamps([str(path)], version=1)
+    assert source_stamps([str(path)], version=2) != before
+    path.write_text("a\n1\n2\n")
+    assert source_stamps([str(path)], version=1) != before
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import district_profiles
+from district_profiles import CROP_NAMES, MONTHS, SEASON_RAIN, DistrictProfiles, canonical_state
+
+
+def _table(rows):
+    """Profiles table with the given (state, district, {crop: score}) rows; other crops score 0.6."""
+    data = {"state": [], "district": [], "soil": [], "drought_share": []}
+    for state, district, scores in rows:
+        data["state"].append(state)
+        data["district"].append(district)
+        data["soil"].append("Loam")
+        data["drought_share"].append(0.1)
+        for name in CROP_NAMES:
+            data.setdefault(f"score:{name}", []).append(scores.get(name, 0.6))
+            data.setdefault(f"reason:{name}", []).append(district_profiles.REASON_FITS)
+    for column in set(SEASON_RAIN.values()):
+        data[column] = [500.0] * len(rows)
+    for month in MONTHS:
+        for kind in ("rain", "low", "high"):
+            data[f"{kind}:{month.lower()}"] = [10.0] * len(rows)
+    return pd.DataFrame(data)
+
+
+@pytest.fixture
+def profiles():
+    return DistrictProfiles(_table([
+        ("maharashtra", "pune", {"Wheat": 0.9, "Cotton": 0.8, "Rice": 0.2}),
+        ("maharashtra", "", {"Soybean": 0.95}),
+        ("punjab", "ludhiana", {"Rice": 0.9}),
+    ]))
+
+
+def test_recommend_orders_favorable_crops_by_score(profiles):
+    result = profiles.recommend("Pune", "Maharashtra")
+    assert [c["name"] for c in result["favorable"]] == ["Wheat", "Cotton"]
+    assert result["favorable"][0]["favorability"] == "Excellent"
+    assert [c["name"] for c in result["unfavorable"]] == ["Rice"]
+    assert "500 mm" in result["favorable"][0]["reason"]
+
+
+def test_find_falls_back_to_district_then_state_average(profiles):
+    assert profiles.find(" PUNE ", None) == 0
+    assert profiles.find("Pune", "Unknown state") == 0
+    assert profiles.find("Nashik", "Maharashtra") == 1
+    assert profiles.find("Nowhere", "Kerala") is None
+    assert profiles.recommend("Nowhere", "Kerala") is None
+
+
+def test_monthly_rain_has_one_column_per_month(profiles):
+    assert profiles.monthly_rain.shape == (3, 12)
+    assert profiles.monthly_low.dtype == np.float32
+
+
+def test_canonical_state_is_case_and_space_insensitive():
+    assert canonical_state("  Tamil   Nadu ") == canonical_state("tamil nadu")
+
+
+def test_built_table_recommends_for_a_real_district(tmp_path):
+    profiles = district_profiles.load_district_profiles(str(tmp_path / "profiles"))
+    assert len(profiles) > 0
+    result = profiles.recommend("Pune", "Maharashtra")
+    assert result["favorable"] or result["unfavorable"]
+
+
+def test_get_does_not_recheck_sources_after_the_first_load(monkeypatch, profiles):
+    monkeypatch.setattr(district_profiles, "_profiles", profiles)
+    monkeypatch.setattr(district_profiles, "_checked_at", 1.0)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("request path must not stat the sources")
+    monkeypatch.setattr(district_profiles, "source_stamps", fail)
+    assert district_profiles.get_district_profiles() is profiles
+
+
+def test_recommendations_endpoint_looks_up_profiles_off_the_event_loop(api, monkeypatch):
+    import asyncio
+
+    import main
+
+    def lookup(district, state=None):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()  # a worker thread, not the event loop
+        return {"favorable": [], "unfavorable": []}
+
+    monkeypatch.setattr(main, "get_crop_recommendations", lookup)
+    response = api.post("/api/crop-recommendations", json={"district": "Ludhiana", "state": "Punjab"})
+    assert response.status_code == 200
@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    """Encodes a text as [length]; records every batch it was called with."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, texts):
+        self.entered.set()
+        self.gate.wait()
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if "boom" in texts:
+            raise ValueError("cannot encode boom")
+        return [[float(len(t))] for t in texts]
+
+
+def submit_all(batcher, encoder, texts):
+    """Queues every text while the worker is busy with a first batch, so none is collected early."""
+    encoder.gate.clear()
+    busy = batcher.submit("busy")
+    assert encoder.entered.wait(5)
+    futures = [batcher.submit(text) for text in texts]
+    encoder.gate.set()
+    busy.result(timeout=5)
+    encoder.batches.remove(["busy"])
+    return futures
+
+
+def test_concurrent_texts_share_one_forward_pass():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=50)
+    futures = submit_all(batcher, encoder, ["rice", "wheat", "maize"])
+    assert [f.result(timeout=5).tolist() for f in futures] == [[4.0], [5.0], [5.0]]
+    assert encoder.batches == [["rice", "wheat", "maize"]]
+    assert all(f.result().dtype == np.float32 for f in futures)
+
+
+def test_batches_are_capped_at_max_batch_size():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=50)
+    texts = [f"text {i}" for i in range(10)]
+    futures = submit_all(batcher, encoder, texts)
+    for future, text in zip(futures, texts):
+        assert future.result(timeout=5).tolist() == [float(len(text))]
+    assert [len(b) for b in encoder.batches] == [4, 4, 2]
+    assert batcher.stats()["items"] == 11  # with the "busy" text
+
+
+def test_a_lone_text_is_flushed_after_max_wait():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=100)
+    start = time.monotonic()
+    assert batcher.encode("rice").tolist() == [4.0]
+    elapsed = time.monotonic() - start
+    assert 0.09 <= elapsed < 1.0
+    assert encoder.batches == [["rice"]]
+
+    # With no wait every text goes out on its own
+    eager = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=0)
+    start = time.monotonic()
+    eager.encode("wheat")
+    assert time.monotonic() - start < 0.09
+
+
+def test_identical_texts_are_encoded_once():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=50)
+    futures = submit_all(batcher, encoder, ["rice", "rice", "wheat", "rice"])
+    assert [f.result(timeout=5).tolist() for f in futures] == [[4.0], [4.0], [5.0], [4.0]]
+    assert encoder.batches == [["rice", "wheat"]]
+    assert batcher.stats()["items"] == 5
+
+
+def test_an_encoder_error_reaches_every_waiting_caller():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=50)
+    futures = submit_all(batcher, encoder, ["rice", "boom", "wheat"])
+    for future in futures:
+        with pytest.raises(ValueError, match="cannot encode boom"):
+            future.result(timeout=5)
+    # The worker thread survives and keeps serving
+    assert batcher.encode("maize").tolist() == [5.0]
+
+
+def test_blocking_callers_from_many_threads_get_their_own_vectors():
+    encoder = RecordingEncoder(delay=0.01)
+    batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=5)
+    texts = [f"query {'x' * i}" for i in range(20)]
+    with ThreadPoolExecutor(8) as pool:
+        vectors = list(pool.map(batcher.encode, texts))
+    assert [v.tolist() for v in vectors] == [[float(len(t))] for t in texts]
+    assert max(len(b) for b in encoder.batches) <= 4
+    assert len(encoder.batches) < len(texts)
@@ -0,0 +1,89 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import embedding_cache
+from embedding_backends import HF_MODEL_ID, MODEL_UNCASED
+from embedding_cache import EmbeddingCache, normalize_query
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_lru_evicts_the_least_recently_used_query():
+    cache = EmbeddingCache(max_size=2)
+    cache.put("rice", [1.0])
+    cache.put("wheat", [2.0])
+    assert cache.get("rice") is not None  # "wheat" is now the oldest
+    cache.put("maize", [3.0])
+    assert cache.get("wheat") is None
+    assert cache.get("rice").tolist() == [1.0] and cache.get("maize").tolist() == [3.0]
+    assert cache.stats()["size"] == 2
+
+
+def test_cached_vectors_are_read_only_float32():
+    cache = EmbeddingCache()
+    vector = cache.get_or_compute("rice", lambda text: [0.5, 0.25])
+    assert vector.dtype == np.float32 and not vector.flags.writeable
+    assert cache.get_or_compute("rice", lambda text: pytest.fail("recomputed")) is vector
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(disk_path=path, namespace="model-a")
+    cache.put("rice blast", [0.1, 0.2, 0.3])
+    cache.flush()
+
+    restarted = EmbeddingCache(disk_path=path, namespace="model-a")
+    vector = restarted.get("rice blast")
+    np.testing.assert_array_equal(vector, np.array([0.1, 0.2, 0.3], dtype=np.float32))
+    assert restarted.stats()["disk_hits"] == 1
+    # Another model's vectors are never served
+    assert EmbeddingCache(disk_path=path, namespace="model-b").get("rice blast") is None
+
+
+def test_sqlite_writes_are_batched(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now[0])
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(max_size=1, disk_path=path, flush_every=3, flush_interval=60)
+
+    cache.put("q1", [1.0])
+    cache.put("q2", [2.0])
+    assert disk_rows(path) == 0
+    assert cache.get("q1").tolist() == [1.0]  # evicted from the LRU, served from the pending batch
+    cache.put("q3", [3.0])
+    assert disk_rows(path) == 3
+
+    cache.put("q4", [4.0])
+    assert disk_rows(path) == 3
+    now[0] += 61
+    cache.put("q5", [5.0])
+    assert disk_rows(path) == 5
+
+
+def test_keys_collapse_whitespace_and_fold_case_only_for_uncased_models():
+    assert normalize_query("  Rice\tBLAST \n") == "rice blast"
+    assert normalize_query("  Rice\tBLAST \n", lowercase=False) == "Rice BLAST"
+
+    uncased = EmbeddingCache(lowercase=True)
+    uncased.put("Rice blast", [1.0])
+    assert uncased.get("  rice   BLAST ") is not None
+
+    cased = EmbeddingCache(lowercase=False)
+    cased.put("Rice blast", [1.0])
+    assert cased.get("Rice  blast") is not None
+    assert cased.get("rice blast") is None
+
+
+def test_case_folding_matches_the_model_tokenizer():
+    transformers = pytest.importorskip("transformers")
+    try:
+        tokenizer = transformers.AutoTokenizer.from_pretrained(HF_MODEL_ID, local_files_only=True)
+    except OSError:
+        pytest.skip(f"{HF_MODEL_ID} is not downloaded")
+    text = "Late Blight on Potato in PUNJAB"
+    assert (tokenizer(text)["input_ids"] == tokenizer(text.lower())["input_ids"]) == MODEL_UNCASED
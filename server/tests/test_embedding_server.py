@@ -0,0 +1,145 @@
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from embedding_server import REQUEST_HEADER, RESPONSE_HEADER, STATUS_ERROR, EmbeddingClient, EmbeddingServer
+
+
+class FakeBackend:
+    """Encodes a text as [length, first code point]; fails on "boom"."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.calls = 0
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.calls += 1
+        if "slow" in texts:
+            time.sleep(0.5)
+        if "boom" in texts:
+            raise ValueError("cannot encode boom")
+        self.batch_sizes.append(batch_size)
+        return np.array([[len(t), ord(t[0]) if t else 0] for t in texts], dtype=np.float64)
+
+
+def expected(texts):
+    return np.array([[len(t), ord(t[0])] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    monkeypatch.setenv("EMBED_MAX_BATCH", "4")
+    # Unix socket paths are limited to ~100 bytes, so not under pytest's tmp_path
+    with tempfile.TemporaryDirectory() as tmp:
+        yield f"{tmp}/embed.sock"
+
+
+@pytest.fixture
+def server(backend, socket_path):
+    server = EmbeddingServer(socket_path, backend)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def client(server):
+    client = EmbeddingClient(server.server_address, timeout=5)
+    yield client
+    client.close()
+
+
+def test_single_text_round_trip(client):
+    vector = client.encode("wheat rust")
+    assert vector.dtype == np.float32
+    np.testing.assert_array_equal(vector, expected(["wheat rust"])[0])
+
+
+def test_small_batches_go_through_the_batcher(client, server):
+    texts = ["rice", "blight", "rice"]
+    np.testing.assert_array_equal(client.encode(texts), expected(texts))
+    assert server.batcher.items == 3
+
+
+def test_bulk_requests_are_encoded_directly_in_order(client, server, backend):
+    texts = [f"document {i} " * (i + 1) for i in range(10)]
+    vectors = client.encode(texts)
+    assert vectors.shape == (10, 2)
+    np.testing.assert_array_equal(vectors, expected(texts))
+    assert server.batcher.items == 0
+    assert backend.batch_sizes == [4]
+
+
+def test_unicode_and_empty_requests(client):
+    np.testing.assert_array_equal(client.encode(["धान", "ਕਣਕ"]), expected(["धान", "ਕਣਕ"]))
+    assert client.encode([]).shape == (0, 0)
+
+
+def test_errors_are_reported_and_the_connection_stays_usable(client):
+    with pytest.raises(RuntimeError, match="cannot encode boom"):
+        client.encode(["boom"])
+    np.testing.assert_array_equal(client.encode("maize"), expected(["maize"])[0])
+
+
+def test_malformed_requests_get_an_error_reply(server):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(server.server_address)
+        for payload in (b"not json", b'{"text": "rice"}'):
+            sock.sendall(REQUEST_HEADER.pack(len(payload)) + payload)
+            status, size, _ = RESPONSE_HEADER.unpack(sock.recv(RESPONSE_HEADER.size))
+            assert status == STATUS_ERROR
+            assert sock.recv(size)
+
+
+def test_timeouts_are_not_retried(server, backend):
+    client = EmbeddingClient(server.server_address, timeout=0.2)
+    try:
+        with pytest.raises(TimeoutError):
+            client.encode(["slow"])
+        time.sleep(0.5)
+        assert backend.calls == 1
+        # The late reply is dropped with the connection, not read as the next answer
+        np.testing.assert_array_equal(client.encode("maize"), expected(["maize"])[0])
+    finally:
+        client.close()
+
+
+def test_client_reconnects_after_a_dropped_connection(client):
+    client.encode("first")
+    client._sock.shutdown(socket.SHUT_RDWR)
+    np.testing.assert_array_equal(client.encode("second"), expected(["second"])[0])
+
+
+def test_concurrent_clients_get_their_own_vectors(server):
+    results = {}
+
+    def run(i):
+        remote = EmbeddingClient(server.server_address, timeout=5)
+        try:
+            results[i] = remote.encode(f"query {i}" + "!" * i)
+        finally:
+            remote.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i, vector in results.items():
+        np.testing.assert_array_equal(vector, expected([f"query {i}" + "!" * i])[0])
+    assert len(results) == 8
@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import http_client
+from http_client import BACKOFF_MAX, backoff_delay
+
+URL = "https://upstream.test/v1/chat"
+
+
+class Upstream:
+    """MockTransport handler answering with the given responses (or exceptions) in order."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff sleeps instead of sleeping."""
+    delays = []
+
+    async def fake_async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_async_sleep)
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+def use_upstream(monkeypatch, upstream):
+    async_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    sync_client = httpx.Client(transport=httpx.MockTransport(upstream))
+    monkeypatch.setattr(http_client, "_async_client", SimpleNamespace(get=lambda: async_client))
+    monkeypatch.setattr(http_client, "_sync_client", SimpleNamespace(get=lambda: sync_client))
+    monkeypatch.setattr(http_client, "_host_semaphores", {})
+    monkeypatch.setattr(http_client, "_host_locks", {})
+
+
+def test_backoff_is_full_jitter_or_retry_after():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt) <= min(BACKOFF_MAX, http_client.BACKOFF_BASE * 2 ** attempt)
+    assert backoff_delay(0, httpx.Response(429, headers={"Retry-After": "3"})) == 3.0
+    assert backoff_delay(0, httpx.Response(429, headers={"Retry-After": "120"})) == BACKOFF_MAX
+    # An HTTP-date Retry-After falls back to jitter
+    date = "Wed, 21 Oct 2026 07:28:00 GMT"
+    assert backoff_delay(0, httpx.Response(429, headers={"Retry-After": date})) <= http_client.BACKOFF_BASE
+
+
+def test_gateway_errors_and_transport_failures_are_retried(monkeypatch, sleeps):
+    upstream = Upstream(httpx.Response(503), httpx.ConnectError("reset"),
+                        httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200, json={"ok": True}))
+    use_upstream(monkeypatch, upstream)
+    response = asyncio.run(http_client.request("POST", URL, retries=3))
+    assert response.json() == {"ok": True}
+    assert upstream.calls == 4
+    assert len(sleeps) == 3 and sleeps[2] == 2.0
+
+
+def test_the_last_failure_is_raised_after_the_retries(monkeypatch, sleeps):
+    upstream = Upstream(*[httpx.Response(429) for _ in range(3)])
+    use_upstream(monkeypatch, upstream)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(http_client.request("POST", URL, retries=2))
+    assert upstream.calls == 3 and len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(monkeypatch, sleeps):
+    upstream = Upstream(httpx.Response(404), httpx.Response(400))
+    use_upstream(monkeypatch, upstream)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(http_client.request("GET", URL))
+    with pytest.raises(httpx.HTTPStatusError):
+        http_client.request_sync("GET", URL)
+    assert upstream.calls == 2 and sleeps == []
+
+
+def test_sync_requests_retry_like_async_ones(monkeypatch, sleeps):
+    upstream = Upstream(httpx.ReadTimeout("slow"), httpx.Response(502), httpx.Response(200, text="ok"))
+    use_upstream(monkeypatch, upstream)
+    assert http_client.request_sync("GET", URL).text == "ok"
+    assert upstream.calls == 3 and len(sleeps) == 2
+
+
+async def collect(lines):
+    return [line async for line in lines]
+
+
+def test_streams_retry_before_the_first_line(monkeypatch, sleeps):
+    upstream = Upstream(httpx.Response(503), httpx.Response(200, text="data: a\n\ndata: [DONE]\n"))
+    use_upstream(monkeypatch, upstream)
+    lines = asyncio.run(collect(http_client.stream_lines("POST", URL)))
+    assert [line for line in lines if line] == ["data: a", "data: [DONE]"]
+    assert upstream.calls == 2 and len(sleeps) == 1
+
+
+def test_an_open_stream_does_not_hold_the_host_slot(monkeypatch):
+    monkeypatch.setattr(http_client, "MAX_PER_HOST", 1)
+
+    async def main():
+        finish = asyncio.Event()
+
+        async def slow_body():
+            yield b"data: first\n"
+            await finish.wait()
+            yield b"data: [DONE]\n"
+
+        def handler(request):
+            if request.url.path.endswith("stream"):
+                return httpx.Response(200, content=slow_body())
+            return httpx.Response(200, json={"ok": True})
+
+        use_upstream(monkeypatch, handler)
+        stream = http_client.stream_lines("POST", URL + "/stream")
+        assert await stream.__anext__() == "data: first"
+        # The only slot for the host is free again while the stream is still open
+        response = await asyncio.wait_for(http_client.request("POST", URL), timeout=2)
+        assert response.json() == {"ok": True}
+        finish.set()
+        assert [line async for line in stream] == ["data: [DONE]"]
+
+    asyncio.run(main())
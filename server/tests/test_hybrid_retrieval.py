@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import hybrid_retrieval
+from bm25_index import BM25Index, tokenize
+from hybrid_retrieval import retrieve_context, rrf_fuse
+
+IDS = ["blight", "rust", "punjab_soil", "kerala_soil"]
+DOCUMENTS = [
+    "Crop: Potato | Disease: Late Blight | Causal Agent: Phytophthora infestans",
+    "Crop: Wheat | Disease: Stem Rust | Causal Agent: Puccinia graminis",
+    "State: Punjab | Soil_type: Loam | Crop: Wheat",
+    "State: Kerala | Soil_type: Clay loam | Crop: Rice",
+]
+METADATAS = [{"crop": "Potato"}, {"crop": "Wheat"}, {"state": "Punjab"}, {"state": "Kerala"}]
+
+
+@pytest.fixture
+def bm25():
+    return BM25Index.build(IDS, DOCUMENTS, METADATAS)
+
+
+def test_rrf_rewards_documents_both_rankings_agree_on():
+    assert rrf_fuse([["a", "b"], ["b", "c"]]) == ["b", "a", "c"]
+    # Two mid-table appearances beat a single first place
+    assert rrf_fuse([["a", "b", "c"], ["d", "b", "c"]], k=60)[0] == "b"
+
+
+def test_rrf_breaks_ties_by_first_appearance():
+    assert rrf_fuse([["x", "y"], ["y", "x"]]) == ["x", "y"]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I treat Late-Blight in my potato?") == ["treat", "late", "blight", "potato"]
+
+
+def test_bm25_matches_exact_terms(bm25):
+    ids, documents, metadatas, scores = bm25.search("phytophthora infestans treatment")
+    assert ids == ["blight"]
+    assert scores[0] > 0
+
+
+def test_bm25_location_keeps_the_state_and_stateless_documents(bm25):
+    ids, *_ = bm25.search("wheat", location="Ludhiana, Punjab")
+    assert set(ids) == {"rust", "punjab_soil"}
+    ids, *_ = bm25.search("loam", location="Kerala")
+    assert ids == ["kerala_soil"]
+
+
+def test_bm25_update_matches_a_rebuild(bm25):
+    upserts = {"rust": ("Crop: Wheat | Disease: Leaf Rust", {"crop": "Wheat"}),
+               "mildew": ("Crop: Pea | Disease: Powdery Mildew", {"crop": "Pea"})}
+    updated = bm25.updated(upserts, removed=["kerala_soil"])
+    rebuilt = BM25Index.build(
+        ["blight", "punjab_soil", "rust", "mildew"],
+        [DOCUMENTS[0], DOCUMENTS[2], upserts["rust"][0], upserts["mildew"][0]],
+        [METADATAS[0], METADATAS[2], upserts["rust"][1], upserts["mildew"][1]],
+    )
+    for query in ["rust wheat", "powdery mildew", "kerala clay", "blight"]:
+        assert updated.search(query)[0] == rebuilt.search(query)[0]
+        np.testing.assert_allclose(updated.search(query)[3], rebuilt.search(query)[3], rtol=1e-6)
+
+
+def test_bm25_round_trips_through_disk(bm25, tmp_path):
+    bm25.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    assert loaded.search("puccinia")[0] == bm25.search("puccinia")[0]
+
+
+def test_hybrid_fuses_both_retrievers_and_drops_duplicate_text(bm25, monkeypatch):
+    vector_hits = (["dup_of_punjab_soil", "rust", "punjab_soil"],
+                   ["  " + DOCUMENTS[2].upper(), DOCUMENTS[1], DOCUMENTS[2]],
+                   [METADATAS[2], METADATAS[1], METADATAS[2]])
+    monkeypatch.setattr(hybrid_retrieval, "retrieve", lambda *a, **k: vector_hits)
+    monkeypatch.setattr(hybrid_retrieval, "get_bm25_index", lambda: bm25)
+    monkeypatch.setattr(hybrid_retrieval, "RETRIEVER", "hybrid")
+    ids, documents, metadatas = retrieve_context("puccinia wheat", n_results=3)
+    # Both retrievers rank rust and punjab_soil; the vector-only duplicate loses to punjab_soil's text
+    assert ids == ["rust", "punjab_soil"]
+    assert documents == [DOCUMENTS[1], DOCUMENTS[2]]
+    assert metadatas == [METADATAS[1], METADATAS[2]]
+
+
+def test_vector_only_when_there_is_no_bm25_index(monkeypatch):
+    vector_hits = (["rust"], [DOCUMENTS[1]], [METADATAS[1]])
+    monkeypatch.setattr(hybrid_retrieval, "retrieve", lambda *a, **k: vector_hits)
+    monkeypatch.setattr(hybrid_retrieval, "get_bm25_index", lambda: None)
+    monkeypatch.setattr(hybrid_retrieval, "RETRIEVER", "hybrid")
+    assert retrieve_context("wheat rust", n_results=1) == vector_hits
@@ -0,0 +1,69 @@
+import pytest
+
+from insights import CROP_LIMITS, DEFAULT_LIMITS, crop_limits, evaluate
+
+CALM = {"temperature": 25, "humidity": 60, "rain_today": 0, "week_rain_low": 60,
+        "week_rain_high": 80, "wind_speed": 10}
+
+
+def weather(**overrides):
+    return {**CALM, **overrides}
+
+
+def test_calm_weather_gives_one_success_insight_per_crop():
+    results = evaluate(CALM, ["Rice", "Wheat"])
+    assert [[i["type"] for i in r] for r in results] == [["success"], ["success"]]
+    assert "Rice" in results[0][0]["message"]
+
+
+def test_thresholds_come_from_each_crops_row():
+    # 35°C is heat stress for wheat (32) but not for rice (38)
+    rice, wheat = evaluate(weather(temperature=35), ["Rice", "Wheat"])
+    assert rice[0]["type"] == "success"
+    assert wheat[0]["type"] == "warning"
+    assert "above the 32°C Wheat tolerates" in wheat[0]["message"]
+
+
+def test_below_rules_fire_under_the_threshold():
+    (insights,) = evaluate(weather(temperature=3, week_rain_low=2), ["Wheat"])
+    assert [i["type"] for i in insights] == ["warning", "info"]
+    assert "below the 5°C" in insights[0]["message"]
+    assert "less than the 10 mm" in insights[1]["message"]
+
+
+def test_warnings_come_first_and_the_list_is_capped():
+    storm = weather(temperature=45, humidity=95, rain_today=3, week_rain_low=0,
+                    week_rain_high=500, wind_speed=60)
+    (insights,) = evaluate(storm, ["Rice"], limit=10)
+    types = [i["type"] for i in insights]
+    assert types == ["warning"] * 4 + ["info"] * 2
+    assert "°C" in insights[0]["message"]  # heat is the first rule
+
+    (capped,) = evaluate(storm, ["Rice"])
+    assert capped == insights[:3]
+    (one,) = evaluate(storm, ["Rice"], limit=1)
+    assert one == insights[:1]
+
+
+def test_missing_metrics_skip_their_rules():
+    (insights,) = evaluate({"temperature": 25, "humidity": 60}, ["Maize"])
+    assert [i["type"] for i in insights] == ["success"]
+    (insights,) = evaluate(weather(week_rain_low=None, week_rain_high=None), ["Maize"])
+    assert [i["type"] for i in insights] == ["success"]
+
+
+@pytest.mark.parametrize("crop, expected", [
+    ("Paddy", "rice"), ("  CORN ", "maize"), ("Bajra", "millet"), ("Rapeseed & Mustard", "mustard"),
+])
+def test_aliases_use_the_canonical_limits(crop, expected):
+    assert crop_limits(crop) == CROP_LIMITS[expected]
+
+
+def test_unknown_crops_use_the_default_limits():
+    assert crop_limits("Dragon fruit") == DEFAULT_LIMITS
+    (insights,) = evaluate(weather(temperature=DEFAULT_LIMITS.heat_stress + 1), ["Dragon fruit"])
+    assert insights[0]["type"] == "warning"
+
+
+def test_no_crops_no_insights():
+    assert evaluate(CALM, []) == []
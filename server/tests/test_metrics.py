@@ -0,0 +1,94 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import REQUEST_SECONDS, STAGE_SECONDS, Counter, Histogram, RequestMetricsMiddleware
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test latency.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, "llm")
+    assert histogram.render() == [
+        "# HELP cropweather_test_seconds Test latency.",
+        "# TYPE cropweather_test_seconds histogram",
+        'cropweather_test_seconds_bucket{stage="llm",le="0.1"} 2',
+        'cropweather_test_seconds_bucket{stage="llm",le="1"} 3',
+        'cropweather_test_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'cropweather_test_seconds_sum{stage="llm"} 5.650000',
+        'cropweather_test_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_total", "Test counter.", ["host"])
+    counter.inc('a"b\\c\nd')
+    counter.inc('a"b\\c\nd', amount=2)
+    assert counter.render()[-1] == 'cropweather_test_total{host="a\\"b\\\\c\\nd"} 3'
+
+
+def test_collector_families_stay_contiguous(monkeypatch):
+    monkeypatch.setattr(metrics, "_collectors", [])
+
+    def caches():
+        return metrics.cache_samples("weather", 3, 1) + metrics.cache_samples("embedding", 0, 0)
+
+    def broken():
+        raise RuntimeError("collector bug")
+
+    metrics.register_collector(caches)
+    metrics.register_collector(broken)
+    lines = metrics.render().splitlines()
+    hits = [i for i, line in enumerate(lines) if line.startswith("cropweather_cache_hits_total")]
+    ratios = [i for i, line in enumerate(lines) if line.startswith("cropweather_cache_hit_ratio")]
+    assert hits == [hits[0], hits[0] + 1] and ratios == [ratios[0], ratios[0] + 1]
+    assert lines.count("# TYPE cropweather_cache_hits_total counter") == 1
+    assert 'cropweather_cache_hit_ratio{cache="weather"} 0.75' in lines
+    assert 'cropweather_cache_hit_ratio{cache="embedding"} 0' in lines
+
+
+def _request_count(route, status):
+    series = REQUEST_SECONDS._series.get((route, status))
+    return 0 if series is None else sum(series[0])
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(RequestMetricsMiddleware)
+    client = TestClient(app)
+    before = _request_count("/items/{item_id}", "200"), _request_count("unmatched", "404")
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+    assert _request_count("/items/{item_id}", "200") == before[0] + 2
+    assert _request_count("unmatched", "404") == before[1] + 1
+    assert not any(route == "/items/1" for route, _ in REQUEST_SECONDS._series)
+
+
+def test_metrics_endpoint(api):
+    api.get("/")
+    response = api.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE cropweather_request_seconds histogram" in response.text
+    assert 'cropweather_request_seconds_count{route="/",status="200"}' in response.text
+
+
+def test_span_records_the_stage_and_is_a_noop_when_disabled(monkeypatch):
+    def count(stage):
+        series = STAGE_SECONDS._series.get((stage,))
+        return 0 if series is None else sum(series[0])
+
+    with metrics.span("test_stage"):
+        pass
+    assert count("test_stage") == 1
+
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    assert metrics.span("test_stage") is metrics.span("other_stage")  # one shared no-op
+    with metrics.span("test_stage"):
+        pass
+    assert count("test_stage") == 1
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from model_search import FoldCache, data_hash, plan_parallelism
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEARCH_SCRIPT = """
+import json, sys
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from model_search import FoldCache, successive_halving
+
+rng = np.random.default_rng(0)
+X = rng.normal(size=(90, 3)).astype(np.float32)
+y = np.asarray(np.array(["rice", "wheat", "maize"], dtype=object)[np.arange(90) % 3], dtype=object)
+result = successive_halving(RandomForestClassifier(random_state=0), {"max_depth": [2, 4]}, X, y,
+                            n_candidates=2, min_resource=5, max_resource=15, cv=3, cores=1,
+                            cache=FoldCache(sys.argv[1]), refit=False, verbose=False)
+print(json.dumps({"fits": result.fits, "cached": result.cached}))
+"""
+
+
+def _run(script, *args):
+    out = subprocess.run([sys.executable, "-c", script, *args], cwd=SERVER_DIR, check=True,
+                         capture_output=True, text=True).stdout
+    return out.strip().splitlines()[-1]
+
+
+def test_data_hash_of_string_labels_is_stable_across_processes():
+    script = ("import numpy as np; from model_search import data_hash; "
+              "print(data_hash(np.zeros((3, 2)), np.array(['rice', 'wheat', 'rice'], dtype=object)))")
+    assert _run(script) == _run(script)
+    labels = np.array(["rice", "wheat", "rice"], dtype=object)
+    assert _run(script) == data_hash(np.zeros((3, 2)), labels)
+
+
+def test_data_hash_changes_with_labels():
+    X = np.zeros((2, 2))
+    assert data_hash(X, np.array(["rice", "wheat"], dtype=object)) != data_hash(X, np.array(["wheat", "rice"], dtype=object))
+
+
+def test_search_in_a_new_process_reuses_cached_fold_scores(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    first = json.loads(_run(SEARCH_SCRIPT, path))
+    second = json.loads(_run(SEARCH_SCRIPT, path))
+    assert first["fits"] > 0
+    assert second == {"fits": 0, "cached": first["fits"] + first["cached"]}
+
+
+def test_fold_cache_round_trip(tmp_path):
+    cache = FoldCache(str(tmp_path / "folds.sqlite"))
+    cache.put_many([("a", 0.5, 1.0), ("b", 0.75, 2.0)])
+    assert cache.get_many(["a", "b", "c"]) == {"a": 0.5, "b": 0.75}
+
+
+def test_plan_parallelism_never_oversubscribes():
+    assert plan_parallelism(tasks=3, cores=8) == (3, 2)
+    assert plan_parallelism(tasks=100, cores=8, max_outer=2) == (2, 4)
+    assert plan_parallelism(tasks=1, cores=1) == (1, 1)
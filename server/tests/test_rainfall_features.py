@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import rainfall_features
+from data_store import load_table
+from district_profiles import MONTHS, RAINFALL_NORMALS_PATH, SUBDIVISION_HISTORY_PATH
+from rainfall_features import FEATURE_COLUMNS, SEASONS, build_features, label_crops, load_features
+
+
+@pytest.fixture(scope="module")
+def features():
+    return build_features()
+
+
+def test_one_row_per_district_year_with_every_feature(features):
+    assert set(FEATURE_COLUMNS) <= set(features.columns)
+    assert {f"{month}_DISTRICT" for month in MONTHS} <= set(features.columns)
+    assert not features.duplicated(["STATE/UT", "DISTRICT", "YEAR"]).any()
+    assert features["YEAR"].dtype == np.int32
+    assert not features[FEATURE_COLUMNS].isna().any().any()
+    assert (features[FEATURE_COLUMNS] >= 0).all().all()
+
+
+def test_seasonal_and_annual_totals_add_up(features):
+    monthly = features[[f"{month}_DISTRICT" for month in MONTHS]].to_numpy()
+    for season, months in SEASONS.items():
+        np.testing.assert_allclose(features[f"{season}_DISTRICT"], monthly[:, months].sum(axis=1))
+    np.testing.assert_allclose(features["ANNUAL_DISTRICT"], monthly.sum(axis=1))
+
+
+def test_months_are_the_normal_scaled_by_the_subdivision_anomaly(features):
+    row = features.iloc[len(features) // 2]
+    normals = load_table(RAINFALL_NORMALS_PATH)
+    normal = normals[(normals["STATE/UT"].astype(str) == row["STATE/UT"])
+                     & (normals["DISTRICT"].astype(str) == row["DISTRICT"])].iloc[0]
+    history = load_table(SUBDIVISION_HISTORY_PATH)
+    history = history[history["SUBDIVISION"].astype(str).str.strip() == row["SUBDIVISION"]]
+    actual = history[history["YEAR"] == row["YEAR"]].iloc[0]
+    for month in MONTHS:
+        mean = history[month].astype(float).mean()
+        if mean > 0 and not pd.isna(actual[month]):
+            expected = float(normal[month]) * float(actual[month]) / mean
+            assert row[f"{month}_DISTRICT"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_labels_follow_the_notebook_rules():
+    jjas = np.array([900.0, 700.0, 100.0, 600.0])
+    ond = np.array([0.0, 350.0, 0.0, 100.0])
+    annual = np.array([1000.0, 1200.0, 400.0, 800.0])
+    assert label_crops(jjas, ond, annual).tolist() == ["Rice", "Wheat", "Pulses", "Maize"]
+
+
+def test_features_are_cached_until_a_source_changes(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "features")
+    first = load_features(columns=FEATURE_COLUMNS + ["CROP"], out_dir=out_dir)
+    assert list(first.columns) == FEATURE_COLUMNS + ["CROP"]
+
+    calls = []
+    original = rainfall_features.write_features
+    monkeypatch.setattr(rainfall_features, "write_features", lambda out: calls.append(out) or original(out))
+    load_features(out_dir=out_dir)
+    assert calls == []
+    monkeypatch.setattr(rainfall_features, "FEATURES_VERSION", rainfall_features.FEATURES_VERSION + 1)
+    assert len(load_features(out_dir=out_dir)) == len(first)
+    assert calls == [out_dir]
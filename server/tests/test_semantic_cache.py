@@ -0,0 +1,50 @@
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+
+def _vector(angle):
+    """Unit vector at `angle` radians from the first axis (cosine similarity = cos(angle difference))."""
+    return np.array([np.cos(angle), np.sin(angle), 0.0], dtype=np.float32)
+
+
+def test_hits_only_above_the_similarity_threshold():
+    cache = SemanticCache(threshold=0.95)
+    cache.put(_vector(0.0) * 3, "Pune, Maharashtra", "reply")
+    assert cache.get(_vector(0.2), "  pune,   MAHARASHTRA ") == "reply"   # cos 0.2 = 0.980
+    assert cache.get(_vector(0.4), "Pune, Maharashtra") is None          # cos 0.4 = 0.921
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_are_scoped_by_location():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(_vector(0.0), "Pune", "pune reply")
+    assert cache.get(_vector(0.0), "Nagpur") is None
+    cache.put(_vector(1.0), "Pune", "other reply")
+    assert cache.get(_vector(0.95), "Pune") == "other reply"
+
+
+def test_knowledge_base_version_change_drops_the_cache():
+    version = [1]
+    cache = SemanticCache(threshold=0.9, version_fn=lambda: version[0], version_check_interval=0.0)
+    cache.put(_vector(0.0), "Pune", "stale reply")
+    assert cache.get(_vector(0.0), "Pune") == "stale reply"
+    version[0] = 2
+    assert cache.get(_vector(0.0), "Pune") is None
+    assert cache.stats()["kb_version"] == 2
+
+
+def test_expired_and_evicted_entries_are_not_served(monkeypatch):
+    import semantic_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    cache = SemanticCache(threshold=0.9, ttl=10, max_entries=2)
+    cache.put(_vector(0.0), "Pune", "first")
+    now[0] += 5
+    cache.put(_vector(1.0), "Pune", "second")
+    cache.put(_vector(2.0), "Pune", "third")      # evicts "first"
+    assert cache.get(_vector(0.0), "Pune") is None
+    now[0] += 11
+    assert cache.get(_vector(1.0), "Pune") is None  # expired
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ttl_cache
+from ttl_cache import SingleFlightCache
+
+
+class CountingLoader:
+    """Returns "value-<n>" on the n-th call, after `delay` seconds; raises while `error` is set."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.error = None
+
+    def _result(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return f"value-{self.calls}"
+
+    def __call__(self):
+        time.sleep(self.delay)
+        return self._result()
+
+    async def load_async(self):
+        await asyncio.sleep(self.delay)
+        return self._result()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_concurrent_threads_share_one_load():
+    cache, loader = SingleFlightCache(ttl=60), CountingLoader()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load("pune", loader), range(8)))
+    assert results == ["value-1"] * 8
+    assert loader.calls == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 7
+
+
+def test_concurrent_tasks_share_one_load():
+    cache, loader = SingleFlightCache(ttl=60), CountingLoader()
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("pune", loader.load_async) for _ in range(8)))
+
+    assert asyncio.run(main()) == ["value-1"] * 8
+    assert loader.calls == 1
+
+
+def test_threads_and_tasks_share_one_load():
+    cache, loader = SingleFlightCache(ttl=60), CountingLoader()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        leader = asyncio.ensure_future(cache.aget_or_load("pune", loader.load_async))
+        await asyncio.sleep(0.05)
+        follower = loop.run_in_executor(None, cache.get_or_load, "pune", loader)
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(main()) == ["value-1", "value-1"]
+    assert loader.calls == 1
+
+    cache.clear()
+
+    async def thread_leads():
+        loop = asyncio.get_running_loop()
+        leader = loop.run_in_executor(None, cache.get_or_load, "pune", loader)
+        await asyncio.sleep(0.05)
+        return await asyncio.gather(leader, cache.aget_or_load("pune", loader.load_async))
+
+    assert asyncio.run(thread_leads()) == ["value-2", "value-2"]
+    assert loader.calls == 2
+
+
+def test_sync_call_on_the_loading_event_loop_does_not_deadlock():
+    cache, loader = SingleFlightCache(ttl=60), CountingLoader(delay=0.05)
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_load("pune", loader.load_async))
+        await asyncio.sleep(0.01)
+        direct = cache.get_or_load("pune", loader)
+        return direct, await leader
+
+    assert sorted(asyncio.run(main())) == ["value-1", "value-2"]
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache, loader = SingleFlightCache(ttl=10), CountingLoader(delay=0)
+    assert cache.get_or_load("pune", loader) == "value-1"
+    clock[0] += 9
+    assert cache.get_or_load("pune", loader) == "value-1"
+    clock[0] += 2
+    assert cache.get_or_load("pune", loader) == "value-2"
+    assert loader.calls == 2
+
+
+def test_failing_load_serves_the_stale_entry_until_stale_ttl(clock):
+    cache, loader = SingleFlightCache(ttl=10, stale_ttl=100), CountingLoader(delay=0)
+    cache.get_or_load("pune", loader)
+    loader.error = ConnectionError("upstream down")
+    clock[0] += 50
+    assert cache.get_or_load("pune", loader) == "value-1"
+    assert asyncio.run(cache.aget_or_load("pune", loader.load_async)) == "value-1"
+    assert cache.stats()["stale_served"] == 2
+    clock[0] += 51
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("pune", loader)
+
+
+def test_failing_load_without_an_entry_fails_every_waiter():
+    cache, loader = SingleFlightCache(ttl=10, stale_ttl=100), CountingLoader()
+    loader.error = ConnectionError("upstream down")
+
+    def call(_):
+        try:
+            return cache.get_or_load("pune", loader)
+        except ConnectionError as e:
+            return e
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(call, range(4)))
+    assert loader.calls == 1
+    assert all(isinstance(r, ConnectionError) for r in results)
+    with pytest.raises(ConnectionError):
+        asyncio.run(cache.aget_or_load("pune", loader.load_async))
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_interrupted_leader_does_not_leave_waiters_hanging():
+    cache = SingleFlightCache(ttl=10)
+    started = threading.Event()
+
+    def interrupted():
+        started.set()
+        time.sleep(0.1)
+        raise Interrupted()
+
+    def lead():
+        with pytest.raises(Interrupted):
+            cache.get_or_load("pune", interrupted)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait()
+    with ThreadPoolExecutor(1) as pool:
+        waiter = pool.submit(cache.get_or_load, "pune", lambda: "unused")
+        with pytest.raises(RuntimeError, match="interrupted"):
+            waiter.result(timeout=5)
+    leader.join()
+    # The next caller starts a fresh load
+    assert cache.get_or_load("pune", lambda: "fresh") == "fresh"
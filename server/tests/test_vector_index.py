@@ -0,0 +1,84 @@
+import sys
+
+import numpy as np
+import pytest
+
+import vector_db
+from vector_index import VectorIndex, export_index
+
+IDS = ["punjab_wheat", "punjab_rice", "kerala_rice", "blight", "kerala_tea"]
+METADATAS = [
+    {"state": "Punjab", "crop": "Wheat"},
+    {"state": "Punjab", "crop": "Rice"},
+    {"state": " KERALA ", "crop": "Rice"},
+    {"crop": "Potato", "disease": "Late Blight"},     # no state: applies everywhere
+    {"location": "Kerala", "crop": "Tea"},            # weather-style documents carry `location`
+]
+EMBEDDINGS = np.array([
+    [1.0, 0.0, 0.0],
+    [0.9, 0.1, 0.0],
+    [0.8, 0.2, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.0, 0.0, 1.0],
+], dtype=np.float32) * 5  # export normalizes the rows
+
+
+@pytest.fixture
+def index(tmp_path):
+    export_index(IDS, [f"doc {i}" for i in IDS], METADATAS, EMBEDDINGS, str(tmp_path / "index"))
+    return VectorIndex(str(tmp_path / "index"))
+
+
+def test_search_returns_top_k_best_first(index):
+    ids, documents, metadatas, scores = index.search([1.0, 0.0, 0.0], n_results=3)
+    assert ids == ["punjab_wheat", "punjab_rice", "kerala_rice"]
+    assert documents[0] == "doc punjab_wheat" and metadatas[0]["crop"] == "Wheat"
+    assert scores[0] == pytest.approx(1.0) and scores == sorted(scores, reverse=True)
+
+
+def test_where_filters_match_exact_normalized_values(index):
+    ids, *_ = index.search([1.0, 0.0, 0.0], n_results=5, where={"crop": "rice"})
+    assert ids == ["punjab_rice", "kerala_rice"]
+    ids, *_ = index.search([1.0, 0.0, 0.0], n_results=5, where={"crop": ["Wheat", "Tea"], "state": "punjab"})
+    assert ids == ["punjab_wheat"]
+    assert index.search([1.0, 0.0, 0.0], where={"crop": "Mango"}) == ([], [], [], [])
+
+
+def test_location_keeps_the_state_and_stateless_documents(index):
+    ids, *_ = index.search([1.0, 0.0, 0.0], n_results=5, location="Kochi, Kerala")
+    assert ids[0] == "kerala_rice"
+    assert set(ids[1:]) == {"blight", "kerala_tea"}  # both score 0 against this query
+    # An unknown location does not filter
+    assert len(index.search([1.0, 0.0, 0.0], n_results=5, location="Atlantis")[0]) == 5
+
+
+def test_hnsw_search_agrees_with_the_exact_scan(tmp_path):
+    pytest.importorskip("hnswlib")
+    export_index(IDS, IDS, METADATAS, EMBEDDINGS, str(tmp_path / "index"))
+    exact = VectorIndex(str(tmp_path / "index"))
+    graph = VectorIndex(str(tmp_path / "index"), use_hnsw=True)
+    query = [0.7, 0.3, 0.1]
+    assert graph.search(query, n_results=3)[0] == exact.search(query, n_results=3)[0]
+
+
+def test_hnsw_without_hnswlib_keeps_the_exact_scan(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "hnswlib", None)  # import raises ImportError
+    export_index(IDS, IDS, METADATAS, EMBEDDINGS, str(tmp_path / "index"))
+    graph = VectorIndex(str(tmp_path / "index"), use_hnsw=True)
+    assert graph.hnsw is None
+    assert graph.search([1.0, 0.0, 0.0], n_results=2)[0] == ["punjab_wheat", "punjab_rice"]
+
+
+class FakeCollection:
+    def query(self, query_embeddings, n_results, where=None):
+        return {"ids": [["chroma"]], "documents": [["from chroma"]], "metadatas": [[{}]]}
+
+
+def test_retrieve_falls_back_to_chroma_until_the_index_is_exported(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_db, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(vector_db, "get_collection", lambda: FakeCollection())
+    monkeypatch.setattr(vector_db, "get_index", lambda use_hnsw: VectorIndex(str(tmp_path / "index")))
+    assert vector_db.retrieve("wheat", query_embedding=[1.0, 0.0, 0.0]) == (["chroma"], ["from chroma"], [{}])
+
+    export_index(IDS, IDS, METADATAS, EMBEDDINGS, str(tmp_path / "index"))
+    assert vector_db.retrieve("wheat", query_embedding=[1.0, 0.0, 0.0])[0] == ["punjab_wheat"]
@@ -0,0 +1,45 @@
+import pytest
+
+import analysis
+
+
+@pytest.mark.parametrize("payload", [
+    {"locations": [], "crops": ["Rice"]},
+    {"locations": ["Pune"], "crops": []},
+])
+def test_batch_requires_locations_and_crops(api, payload):
+    assert api.post("/api/weather-analysis/batch", json=payload).status_code == 422
+
+
+def test_batch_rejects_blank_entries(api):
+    payload = {"locations": ["  "], "crops": ["Rice"]}
+    assert api.post("/api/weather-analysis/batch", json=payload).status_code == 400
+
+
+def test_batch_caps_the_number_of_pairs(api):
+    payload = {"locations": [f"City {i}" for i in range(21)], "crops": ["Rice"]}
+    assert api.post("/api/weather-analysis/batch", json=payload).status_code == 400
+
+
+async def _fake_fetch(location):
+    if location == "Nowhere":
+        raise ValueError("city not found")
+    return "doc", {"temperature": "30", "humidity": "60", "rainfall": "0", "wind_speed": "5",
+                   "condition": "clear sky", "condition_main": "Clear"}
+
+
+def test_batch_fetches_each_location_once_and_reports_failures(api, monkeypatch):
+    calls = []
+
+    async def fetch(location):
+        calls.append(location)
+        return await _fake_fetch(location)
+    monkeypatch.setattr(analysis, "fetch_weather_async", fetch)
+    payload = {"locations": ["Pune", " pune ", "Nowhere"], "crops": ["Rice", "Wheat"], "use_llm": False}
+    response = api.post("/api/weather-analysis/batch", json=payload)
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(calls) == ["Nowhere", "Pune"]
+    assert body["failed"] == 2
+    assert [(r["location"], r["crop"], r["error"] is None) for r in body["results"]] == [
+        ("Pune", "Rice", True), ("Pune", "Wheat", True), ("Nowhere", "Rice", False), ("Nowhere", "Wheat", False)]
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from yield_prediction import YieldEngine, current_season, season_key
+
+
+@pytest.fixture(scope="module")
+def engine():
+    rows = []
+    for year, (rice, wheat, moong) in zip(range(2010, 2014), [(2.0, 3.0, 0.5), (2.2, 3.0, 0.7),
+                                                              (2.4, 3.0, 0.5), (2.6, 3.0, 0.7)]):
+        rows += [
+            ("Punjab", "Ludhiana", "Rice", f"{year}-{str(year + 1)[2:]}", "Kharif     ", 100.0, 100.0 * rice),
+            ("Punjab", "Ludhiana", "Wheat", year, "Rabi", 100.0, 100.0 * wheat),
+            ("Punjab", "Ludhiana", "Moong", year, "Summer", 10.0, 10.0 * moong),
+        ]
+    rows.append(("Punjab", "Ludhiana", "Wheat", 2014, "Rabi", 0.0, 5.0))  # zero area is dropped
+    df = pd.DataFrame(rows, columns=["State", "District", "Crop", "Crop_Year", "Season", "Area", "Production"])
+    return YieldEngine(df)
+
+
+def test_predict_uses_mean_yield_and_linear_trend(engine):
+    prediction = engine.predict("punjab", " LUDHIANA ", "rice", area=10, season="Kharif")
+    assert prediction["predicted_yield"] == pytest.approx(2.3)
+    assert prediction["predicted_production_tonnes"] == pytest.approx(23.0)
+    assert prediction["yield_trend_per_year"] == pytest.approx(0.2)
+    assert prediction["years"] == [2010, 2013]
+    assert prediction["season_matched"] is True
+
+
+def test_season_names_are_normalized_like_top_crops(engine):
+    assert season_key(" Zaid ") == "summer"
+    assert engine.predict("Punjab", "Ludhiana", "Moong", area=1, season="zaid")["season_matched"] is True
+    season, crops = engine.top_crops("Punjab", "Ludhiana", "Zaid")
+    assert [c["crop"] for c in crops] == ["Moong"]
+
+
+def test_unknown_season_falls_back_to_all_seasons(engine):
+    prediction = engine.predict("Punjab", "Ludhiana", "Wheat", area=1, season="Winter")
+    assert prediction["season_matched"] is False
+    assert prediction["sample_count"] == 4
+
+
+def test_top_crops_ranks_by_mean_yield(engine):
+    season, crops = engine.top_crops("Punjab", "Ludhiana", "kharif", limit=5)
+    assert season == "kharif"
+    assert [c["crop"] for c in crops] == ["Rice"]
+    assert engine.top_crops("Punjab", "Nowhere", "Rabi") == ("Rabi", [])
+
+
+def test_current_season_follows_the_calendar():
+    assert current_season(date(2024, 7, 1)) == "Kharif"
+    assert current_season(date(2024, 12, 1)) == "Rabi"
+
+
+@pytest.mark.parametrize("area", [0, -5])
+def test_yield_endpoint_rejects_non_positive_area(api, area):
+    payload = {"state": "Punjab", "district": "Ludhiana", "crop": "Rice", "area": area}
+    assert api.post("/api/yield-prediction", json=payload).status_code == 422
+
+
+@pytest.mark.parametrize("top_n", [0, -1, 21])
+def test_top_crops_endpoint_bounds_top_n(api, top_n):
+    payload = {"state": "Punjab", "district": "Ludhiana", "season": "Kharif", "top_n": top_n}
+    assert api.post("/api/top-crops", json=payload).status_code == 422
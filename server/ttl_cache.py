@@ -0,0 +1,173 @@
+"""
+TTL cache with single-flight loading and stale-on-error fallback.
+
+- Fresh entries (younger than `ttl`) are returned without calling the loader.
+- Concurrent misses for the same key share one in-flight load, whether they
+  come from threads or coroutines: the first caller loads, every other caller
+  waits on the same concurrent Future (coroutines through asyncio.wrap_future).
+- If the loader fails and an entry younger than `stale_ttl` exists, the stale
+  value is served instead of the error.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class SingleFlightCache:
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> (future, loop) of the load in flight; `loop` runs an async leader (None for a thread)
+        self._inflight: Dict[Hashable, Tuple[Future, Optional[asyncio.AbstractEventLoop]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+
+    def _lookup(self, key) -> Tuple[Optional[Any], Optional[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        self._entries.move_to_end(key)
+        return entry[0], time.monotonic() - entry[1]
+
+    def _store(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _fallback(self, key, error: BaseException):
+        with self._lock:
+            value, age = self._lookup(key)
+        if value is not None and age <= self.stale_ttl:
+            self.stale_served += 1
+            print(f"⚠️ Upstream failed for {key!r} ({error}); serving data {age:.0f}s old")
+            return value
+        raise error
+
+    def _claim(self, key, loop=None):
+        """
+        (value, None, None) on a fresh hit; otherwise (None, future, owner)
+        where owner is None if the caller leads the load, else the
+        in-flight (future, loop) it should wait on.
+        """
+        with self._lock:
+            value, age = self._lookup(key)
+            if value is not None and age <= self.ttl:
+                self.hits += 1
+                return value, None, None
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.coalesced += 1
+                return None, inflight[0], inflight
+            self.misses += 1
+            future: Future = Future()
+            future.set_running_or_notify_cancel()  # a waiter's cancel() must not cancel the shared load
+            self._inflight[key] = (future, loop)
+            return None, future, None
+
+    def _finish(self, key, future: Future, value=None, error: Optional[BaseException] = None) -> None:
+        """Resolves the shared Future; waiters never hang, whatever the leader raised."""
+        with self._lock:
+            if self._inflight.get(key, (None, None))[0] is future:
+                del self._inflight[key]
+        if error is None:
+            future.set_result(value)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # KeyboardInterrupt, cancellation... stop the leader, not the callers waiting on it
+            future.set_exception(RuntimeError(f"Load of {key!r} was interrupted ({error!r})"))
+
+    def get_or_load(self, key, loader: Callable[[], Any]):
+        """Blocking lookup; concurrent callers missing the same key share one loader call."""
+        value, future, owner = self._claim(key)
+        if future is None:
+            return value
+
+        if owner is not None:
+            if owner[1] is not None and owner[1] is _running_loop():
+                # Called on the event loop that runs the load: waiting for it would deadlock
+                try:
+                    value = loader()
+                except Exception as e:
+                    return self._fallback(key, e)
+                self._store(key, value)
+                return value
+            try:
+                return future.result()
+            except Exception as e:
+                return self._fallback(key, e)
+
+        try:
+            value = loader()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            if isinstance(e, Exception):
+                return self._fallback(key, e)
+            raise
+        self._store(key, value)
+        self._finish(key, future, value)
+        return value
+
+    async def aget_or_load(self, key, loader: Callable[[], Awaitable[Any]]):
+        """Async lookup; concurrent callers missing the same key await one shared load."""
+        loop = asyncio.get_running_loop()
+        value, future, owner = self._claim(key, loop)
+        if future is None:
+            return value
+
+        if owner is None:
+            async def load():
+                try:
+                    result = await loader()
+                except BaseException as e:
+                    self._finish(key, future, error=e)
+                    if not isinstance(e, Exception):
+                        raise
+                    return
+                self._store(key, result)
+                self._finish(key, future, result)
+
+            # The load runs as its own task, so a cancelled caller does not cancel it for the others
+            task = loop.create_task(load())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return self._fallback(key, e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
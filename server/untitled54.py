@@ -5,53 +5,31 @@ Automatically generated by Colab.
 
 Original file is located at
     https://colab.research.google.com/drive/1OQ30iijOVTczXVM4vVJe9MJJpH4cFSbM
+
+Top crops of a district for the current (or a given) season. The ranking
+comes from the yield engine the API uses (POST /api/top-crops).
 """
 
-import pandas as pd
-from datetime import datetime
-
-# Load CSV
-df = pd.read_csv("APY.csv")
-df.columns = df.columns.str.strip()  # Clean column names
-
-# Determine current season based on today's date (approximate)
-today_month = datetime.today().month
-if today_month in [6,7,8,9,10]:
-    current_season = 'Kharif'
-elif today_month in [11,12,1,2,3]:
-    current_season = 'Rabi'
-elif today_month in [3,4,5]:
-    current_season = 'Zaid/Summer'
-else:
-    current_season = 'Unknown'
+import sys
+
+from yield_prediction import current_season, load_yield_engine
 
-print(f"Current season based on today: {current_season}")
+engine = load_yield_engine()
+if engine is None:
+    sys.exit(1)
+
+season = current_season()
+print(f"Current season based on today: {season}")
 
 # Take user input
 state_input = input("Enter the State: ").strip()
 district_input = input("Enter the District: ").strip()
+season_input = input(f"Season [{season}]: ").strip() or season
 
-# Filter by State, District, and current season
-filtered_df = df[
-    (df['State'].str.strip().str.lower() == state_input.lower()) &
-    (df['District'].str.strip().str.lower() == district_input.lower()) &
-    (df['Season'].str.strip().str.lower() == current_season.lower())
-]
-
-if filtered_df.empty:
-    print(f"No data found for {district_input}, {state_input} in {current_season} season.")
+season, crops = engine.top_crops(state_input, district_input, season_input, limit=3)
+if not crops:
+    print(f"No data found for {district_input}, {state_input} in {season} season.")
 else:
-    # Avoid zero or missing Area
-    filtered_df = filtered_df[filtered_df['Area'] > 0]
-
-    # Calculate Yield
-    filtered_df['Yield'] = filtered_df['Production'] / filtered_df['Area']
-
-    # Aggregate average yield per crop
-    crop_yield = filtered_df.groupby('Crop')['Yield'].mean().reset_index()
-
-    # Top 3 crops
-    top3_crops = crop_yield.sort_values(by='Yield', ascending=False).head(3)
-
-    print(f"\nTop 3 crops in {district_input}, {state_input} for {current_season} season:")
-    print(top3_crops)
\ No newline at end of file
+    print(f"\nTop 3 crops in {district_input}, {state_input} for {season} season:")
+    for rank, crop in enumerate(crops, 1):
+        print(f"{rank}. {crop['crop']}: {crop['mean_yield']:.3f} ({crop['sample_count']} records)")
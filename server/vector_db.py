@@ -1,25 +1,174 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import os
 
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
 
-chroma_client = chromadb.PersistentClient(path="./farming_db")
-collection = chroma_client.get_or_create_collection(name="farming_kb")
+from embedding_backends import MODEL_NAME, MODEL_UNCASED, backend_name, get_backend
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from lazy import Lazy
+from metrics import span
+from vector_index import INDEX_DIR, export_from_chroma, get_index
+
+
+def _open_collection():
+    import chromadb
+
+    chroma_client = chromadb.PersistentClient(path="./farming_db")
+    return chroma_client.get_or_create_collection(name="farming_kb")
+
+
+def _load_embedding_model():
+    # EMBEDDING_SERVER (a unix socket path) sends encodes to embedding_server.py
+    # instead of loading the model in this process
+    socket_path = os.getenv("EMBEDDING_SERVER")
+    if socket_path:
+        from embedding_server import EmbeddingClient
+
+        return EmbeddingClient(socket_path)
+    return get_backend()
+
+
+# Created on first use (or by the server's warm-up), not at import time.
+# EMBEDDING_BACKEND selects torch (default), onnx or onnx-int8
+_embedding_model = Lazy(_load_embedding_model, "embedding_model")
+_collection = Lazy(_open_collection, "chroma_collection")
+
+def get_embedding_model():
+    return _embedding_model.get()
+
+def get_collection():
+    return _collection.get()
+
+# Retrieval backend: chroma (default), numpy (exact scan of the exported index,
+# metadata pre-filtered) or hnsw (the same index answered from an HNSW graph)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+if VECTOR_BACKEND not in ("chroma", "numpy", "hnsw"):
+    raise ValueError(f"Unknown vector backend: {VECTOR_BACKEND}")
+
+# Repeated queries (e.g. the templated recommendation query) skip the model entirely
+embedding_cache = EmbeddingCache(
+    max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+    namespace=f"{MODEL_NAME}:{backend_name()}",
+    lowercase=MODEL_UNCASED,
+)
+
+# Concurrent request threads share batched forward passes instead of encoding one sentence each
+embedding_batcher = EmbeddingBatcher(
+    lambda texts: get_embedding_model().encode(texts, batch_size=len(texts), show_progress_bar=False),
+    max_batch_size=int(os.getenv("EMBED_MAX_BATCH", "32")),
+    max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+)
+
+def reset_after_fork():
+    """Per-process state a forked worker must not inherit: the batcher thread and the SQLite cache connection."""
+    embedding_batcher.reset()
+    embedding_cache.reopen()
 
 def add_to_db(docs, ids, metadatas):
-    embeddings = embedding_model.encode(docs).tolist()
-    collection.add(
+    embeddings = get_embedding_model().encode(docs).tolist()
+    get_collection().add(
         documents=docs,
         embeddings=embeddings,
         ids=ids,
         metadatas=metadatas
     )
 
-def query_db(query, location=None, n_results=1):
+# Chroma rejects very large single writes; stay well below its batch limit
+MAX_UPSERT_BATCH = 4000
+
+def upsert_to_db(docs, ids, metadatas, batch_size=64):
+    """Encodes documents in large batches and upserts them in bulk (idempotent on ids)."""
+    if not docs:
+        return
+    embeddings = get_embedding_model().encode(docs, batch_size=batch_size, show_progress_bar=False)
+    collection = get_collection()
+    for start in range(0, len(docs), MAX_UPSERT_BATCH):
+        end = start + MAX_UPSERT_BATCH
+        collection.upsert(
+            documents=docs[start:end],
+            embeddings=embeddings[start:end].tolist(),
+            ids=ids[start:end],
+            metadatas=metadatas[start:end]
+        )
+
+def delete_from_db(ids):
+    collection = get_collection()
+    for start in range(0, len(ids), MAX_UPSERT_BATCH):
+        collection.delete(ids=ids[start:start + MAX_UPSERT_BATCH])
+
+def get_all_documents():
+    """Returns (ids, documents, metadatas) for everything in the collection."""
+    results = get_collection().get(include=["documents", "metadatas"])
+    return results["ids"], results["documents"], results["metadatas"]
+
+def embed_query(text):
+    """Embeds a single query through the LRU/disk embedding cache and the micro-batcher."""
+    with span("embedding"):
+        return embedding_cache.get_or_compute(text, embedding_batcher.encode)
+
+def location_query(query, location=None):
+    """The text that is embedded for a query; location is folded into it."""
     if location:
-        full_query = f"{query} (Location: {location})"
-    else:
-        full_query = query
-    query_embedding = embedding_model.encode(full_query).tolist()
-    results = collection.query(query_embeddings=[query_embedding], n_results=n_results)
-    return results["documents"][0], results["metadatas"][0]
+        return f"{query} (Location: {location})"
+    return query
+
+def refresh_vector_index():
+    """Re-exports the in-process index after build_db.py changed the collection (if it is in use)."""
+    if VECTOR_BACKEND == "chroma" and not os.path.exists(INDEX_DIR):
+        return
+    count = export_from_chroma(get_collection())
+    print(f"✅ Vector index refreshed ({count} vectors in {INDEX_DIR})")
+
+_index_missing_warned = False
+
+def get_vector_index():
+    """
+    The exported index of the numpy/hnsw backends, or None when retrieval
+    should use Chroma: with VECTOR_BACKEND=chroma, or until
+    `python vector_index.py export` has written INDEX_DIR.
+    """
+    global _index_missing_warned
+    if VECTOR_BACKEND == "chroma":
+        return None
+    try:
+        return get_index(use_hnsw=VECTOR_BACKEND == "hnsw")
+    except FileNotFoundError:
+        if not _index_missing_warned:
+            _index_missing_warned = True
+            print(f"⚠️ No vector index in {INDEX_DIR} (run `python vector_index.py export`); "
+                  f"retrieving from Chroma instead")
+        return None
+
+def _chroma_where(where):
+    """Translates {field: value or [values]} into a Chroma `where` clause (exact, case-sensitive)."""
+    if not where:
+        return None
+    clauses = [
+        {field: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for field, value in where.items()
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def retrieve(query, location=None, n_results=1, query_embedding=None, where=None):
+    """
+    Like query_db, but also returns the ids of the retrieved documents.
+    With the numpy/hnsw backends the location also pre-filters candidates to
+    the matching state (plus documents that have no state).
+    """
+    if query_embedding is None:
+        query_embedding = embed_query(location_query(query, location))
+    with span("vector_search"):
+        index = get_vector_index()
+        if index is not None:
+            ids, documents, metadatas, _ = index.search(query_embedding, n_results=n_results,
+                                                        where=where, location=location)
+            return ids, documents, metadatas
+        results = get_collection().query(query_embeddings=[np.asarray(query_embedding).tolist()],
+                                         n_results=n_results, where=_chroma_where(where))
+    return results["ids"][0], results["documents"][0], results["metadatas"][0]
+
+def query_db(query, location=None, n_results=1, query_embedding=None, where=None):
+    _, documents, metadatas = retrieve(query, location=location, n_results=n_results,
+                                       query_embedding=query_embedding, where=where)
+    return documents, metadatas
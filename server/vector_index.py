@@ -0,0 +1,231 @@
+"""
+In-process vector index: an alternative retrieval backend to Chroma.
+
+The collection is exported once into INDEX_DIR:
+    embeddings.npy   float32 matrix (n, d), L2-normalized, memory-mapped on load
+    records.json     ids, documents and metadatas in row order
+
+At load an inverted index over the `state`, `crop` and `disease` metadata
+maps each normalized value to its row numbers. A query first narrows the
+candidate rows with that index, then scores only those rows with one
+vectorized dot product and takes the top k with argpartition. For larger
+corpora, `use_hnsw=True` answers unfiltered (or broadly filtered) queries
+from an hnswlib graph instead of the exact scan (or keeps the exact scan,
+with a warning, when hnswlib is not installed).
+
+Usage (from server/):
+    python vector_index.py export      # (re)build INDEX_DIR from farming_db
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "farming_index")
+FILTER_FIELDS = ("state", "crop", "disease")
+# Below this many candidate rows an exact scan beats walking the HNSW graph
+HNSW_MIN_CANDIDATES = 2000
+# Filters keeping more than 1/DENSE_FILTER_RATIO of the rows score the full matrix and select
+DENSE_FILTER_RATIO = 4
+MISSING = {"", "na", "nan", "none"}
+
+
+def normalize_value(value) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def filter_value(metadata: dict, field: str) -> Optional[str]:
+    value = metadata.get(field)
+    if value is None and field == "state":
+        value = metadata.get("location")  # weather documents carry the state as `location`
+    if value is None:
+        return None
+    value = normalize_value(value)
+    return None if value in MISSING else value
+
+
+def replace_directory(tmp_dir: str, target: str) -> None:
+    """Swaps a fully written directory into place of `target` (flat directories only)."""
+    old_dir = target.rstrip("/") + ".old"
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    if os.path.exists(old_dir):
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+
+
+def export_index(ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict],
+                 embeddings, index_dir: str = INDEX_DIR) -> None:
+    """Writes an index directory atomically (readers never see a half-written index)."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.clip(norms, 1e-12, None)
+
+    tmp_dir = index_dir.rstrip("/") + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, "embeddings.npy"), matrix)
+    with open(os.path.join(tmp_dir, "records.json"), "w", encoding="utf-8") as f:
+        json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}, f)
+
+    replace_directory(tmp_dir, index_dir)
+
+
+def export_from_chroma(collection, index_dir: str = INDEX_DIR) -> int:
+    got = collection.get(include=["documents", "metadatas", "embeddings"])
+    export_index(got["ids"], got["documents"], got["metadatas"], got["embeddings"], index_dir)
+    return len(got["ids"])
+
+
+class VectorIndex:
+    def __init__(self, index_dir: str = INDEX_DIR, use_hnsw: bool = False):
+        self.index_dir = index_dir
+        self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "records.json"), encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids: List[str] = records["ids"]
+        self.documents: List[str] = records["documents"]
+        self.metadatas: List[dict] = records["metadatas"]
+        self.mtime = os.path.getmtime(os.path.join(index_dir, "embeddings.npy"))
+
+        # field -> normalized value -> row numbers; plus rows with no value for the field
+        self.inverted: Dict[str, Dict[str, np.ndarray]] = {}
+        self.unlabelled: Dict[str, np.ndarray] = {}
+        for field in FILTER_FIELDS:
+            postings: Dict[str, list] = {}
+            missing = []
+            for row, meta in enumerate(self.metadatas):
+                value = filter_value(meta, field)
+                if value is None:
+                    missing.append(row)
+                else:
+                    postings.setdefault(value, []).append(row)
+            self.inverted[field] = {v: np.asarray(r, dtype=np.int64) for v, r in postings.items()}
+            self.unlabelled[field] = np.asarray(missing, dtype=np.int64)
+        # Rows a location filter keeps: the state's own rows plus the state-less ones
+        self.state_rows = {
+            state: np.union1d(rows, self.unlabelled["state"]) for state, rows in self.inverted["state"].items()
+        }
+
+        self.hnsw = self._build_hnsw() if use_hnsw else None
+
+    def _build_hnsw(self):
+        try:
+            import hnswlib
+        except ImportError:
+            print("⚠️ hnswlib is not installed; the vector index uses the exact scan instead of HNSW")
+            return None
+
+        n, dim = self.embeddings.shape
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=max(n, 1), ef_construction=200, M=16)
+        if n:
+            index.add_items(np.asarray(self.embeddings), np.arange(n))
+        index.set_ef(64)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def states_in(self, location: Optional[str]) -> List[str]:
+        """Known state values mentioned in a free-text location such as 'Ludhiana, Punjab'."""
+        if not location:
+            return []
+        known = self.inverted["state"]
+        parts = [normalize_value(p) for p in location.split(",")] + [normalize_value(location)]
+        return [p for p in dict.fromkeys(parts) if p in known]
+
+    def candidates(self, where: Optional[dict] = None, location: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Row numbers allowed by the filters, or None for "all rows".
+        `where` values must match exactly (after normalization); a location
+        keeps rows of the matched state(s) plus rows without any state
+        (disease documents apply everywhere).
+        """
+        rows = None
+        for field, value in (where or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            hits = [self.inverted.get(field, {}).get(normalize_value(v)) for v in values]
+            hits = [h for h in hits if h is not None]
+            selected = np.unique(np.concatenate(hits)) if hits else np.empty(0, dtype=np.int64)
+            rows = selected if rows is None else np.intersect1d(rows, selected, assume_unique=True)
+
+        states = self.states_in(location)
+        if states:
+            allowed = self.state_rows[states[0]] if len(states) == 1 else \
+                np.unique(np.concatenate([self.state_rows[s] for s in states]))
+            rows = allowed if rows is None else np.intersect1d(rows, allowed, assume_unique=True)
+        return rows
+
+    def search(self, embedding, n_results: int = 1, where: Optional[dict] = None,
+               location: Optional[str] = None):
+        """Returns (ids, documents, metadatas, scores) of the top matches, best first."""
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        rows = self.candidates(where, location)
+
+        if self.hnsw is not None and (rows is None or len(rows) >= HNSW_MIN_CANDIDATES):
+            allowed = None
+            if rows is not None:
+                mask = np.zeros(len(self), dtype=bool)
+                mask[rows] = True
+                allowed = lambda label: bool(mask[label])  # noqa: E731
+            k = min(n_results, len(self) if rows is None else len(rows))
+            if k == 0:
+                return [], [], [], []
+            labels, distances = self.hnsw.knn_query(query, k=k, filter=allowed)
+            top = labels[0].astype(np.int64)
+            scores = 1.0 - distances[0]
+        else:
+            if rows is None:
+                scores_all = self.embeddings @ query
+            elif len(rows) * DENSE_FILTER_RATIO < len(self):
+                scores_all = self.embeddings[rows] @ query
+            else:
+                # Gathering most of the rows costs more than scoring all of them
+                scores_all = (self.embeddings @ query)[rows]
+            if not len(scores_all):
+                return [], [], [], []
+            k = min(n_results, len(scores_all))
+            best = np.argpartition(-scores_all, k - 1)[:k]
+            best = best[np.argsort(-scores_all[best])]
+            top = best if rows is None else rows[best]
+            scores = scores_all[best]
+
+        return ([self.ids[i] for i in top], [self.documents[i] for i in top],
+                [self.metadatas[i] for i in top], [float(s) for s in scores])
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index(index_dir: str = INDEX_DIR, use_hnsw: bool = False) -> VectorIndex:
+    """Shared index, reloaded automatically after `export` replaces the files."""
+    global _index
+    path = os.path.join(index_dir, "embeddings.npy")
+    current = _index
+    if current is not None and current.mtime == os.path.getmtime(path):
+        return current
+    with _index_lock:
+        if _index is None or _index.mtime != os.path.getmtime(path):
+            _index = VectorIndex(index_dir, use_hnsw=use_hnsw)
+        return _index
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["export"]:
+        print(__doc__)
+        sys.exit(1)
+    from vector_db import get_collection
+
+    count = export_from_chroma(get_collection())
+    print(f"✅ Exported {count} vectors to {INDEX_DIR}")
@@ -1,6 +1,9 @@
 import os
 from dotenv import load_dotenv
-import requests
+
+import http_client
+from metrics import span
+from ttl_cache import SingleFlightCache
 
 # Load environment variables from .env file for local development
 load_dotenv() 
@@ -10,28 +13,68 @@ API_KEY = os.getenv("WEATHER_API_KEY")
 if not API_KEY:
     raise ValueError("OpenWeatherMap API key not found. Make sure it's set as an environment variable named WEATHER_API_KEY.")
 
+# Overridable so benchmarks can point at a local stand-in (bench/upstream_stubs.py)
+API_URL = os.getenv("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+def _params(location: str):
+    return {"q": location, "appid": API_KEY, "units": "metric"}
+
+# Weather is cached per normalized location; concurrent misses share one upstream call
+# and the last good reading is served for up to WEATHER_STALE_TTL if the upstream fails.
+weather_cache = SingleFlightCache(
+    ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+    stale_ttl=float(os.getenv("WEATHER_STALE_TTL", "21600")),
+    max_size=int(os.getenv("WEATHER_CACHE_SIZE", "4096")),
+)
+
+def _cache_key(location: str) -> str:
+    return " ".join(location.split()).lower()
+
+def _copy(result):
+    weather_doc, weather_meta = result
+    return weather_doc, dict(weather_meta)
+
 def fetch_weather(location: str):
     """Fetch weather info from OpenWeatherMap"""
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={API_KEY}&units=metric"
-    response = requests.get(url)
-    # This will raise an exception if the request fails (e.g., bad API key, bad location)
-    response.raise_for_status() 
-    data = response.json()
+    def load():
+        # This will raise an exception if the request fails (e.g., bad API key, bad location)
+        with span("weather_fetch"):
+            response = http_client.request_sync("GET", API_URL, params=_params(location))
+        return parse_weather(location, response.json())
+    return _copy(weather_cache.get_or_load(_cache_key(location), load))
+
+async def fetch_weather_async(location: str):
+    """Async fetch_weather over the shared connection pool."""
+    async def load():
+        with span("weather_fetch"):
+            response = await http_client.request("GET", API_URL, params=_params(location))
+        return parse_weather(location, response.json())
+    return _copy(await weather_cache.aget_or_load(_cache_key(location), load))
 
+def parse_weather(location: str, data: dict):
+    """Turns an OpenWeatherMap response into the (document, metadata) pair."""
     temperature = data['main']['temp']
     humidity = data['main']['humidity']
     # Use .get() for safer access in case 'rain' key doesn't exist
     rainfall = data.get('rain', {}).get('1h', 0)  
+    # Wind comes in m/s with units=metric; the dashboard shows km/h
+    wind_speed = round(data.get('wind', {}).get('speed', 0) * 3.6)
+    sky = (data.get('weather') or [{}])[0]
+    condition = sky.get('description', '').title() or "Unknown"
 
     weather_doc = (
         f"Weather update for {location}: "
-        f"Temperature {temperature}°C | Humidity {humidity}% | Rainfall {rainfall} mm"
+        f"Temperature {temperature}°C | Humidity {humidity}% | Rainfall {rainfall} mm | "
+        f"Wind {wind_speed} km/h | {condition}"
     )
     weather_meta = {
         "location": location,
         "temperature": str(temperature),
         "humidity": str(humidity),
-        "rainfall": str(rainfall)
+        "rainfall": str(rainfall),
+        "wind_speed": str(wind_speed),
+        "condition": condition,
+        "condition_main": sky.get('main', ''),
     }
     
     return weather_doc, weather_meta
\ No newline at end of file
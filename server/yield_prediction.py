@@ -0,0 +1,204 @@
+import os
+import threading
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_table
+
+APY_PATH = os.getenv("APY_PATH", "APY.csv")
+
+
+class YieldStats(NamedTuple):
+    """Aggregated yield history for one (state, district, crop, season) key."""
+    mean: float          # mean yield (Production / Area)
+    count: int           # number of yearly observations
+    trend: float         # least-squares slope of yield per year
+    first_year: int
+    last_year: int
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Normalizes a user- or dataset-supplied key for dictionary lookups."""
+    return " ".join(str(value or "").split()).lower()
+
+
+# APY season names by calendar month (approximate sowing windows)
+SEASON_BY_MONTH = {
+    1: "Rabi", 2: "Rabi", 3: "Rabi", 4: "Summer", 5: "Summer",
+    6: "Kharif", 7: "Kharif", 8: "Kharif", 9: "Kharif", 10: "Kharif",
+    11: "Rabi", 12: "Rabi",
+}
+
+# Other names for APY seasons accepted from users
+SEASON_ALIASES = {"zaid": "summer", "zaid/summer": "summer"}
+
+
+def season_key(season: Optional[str]) -> str:
+    """Lookup key of a season name: normalized, with aliases resolved."""
+    key = normalize_key(season)
+    return SEASON_ALIASES.get(key, key)
+
+
+def current_season(today: Optional[date] = None) -> str:
+    return SEASON_BY_MONTH[(today or date.today()).month]
+
+
+def _crop_year_start(values: pd.Series) -> pd.Series:
+    """APY stores years either as 1997 or as '1997-98'; keep the starting year."""
+    years = values.astype(str).str.slice(0, 4)
+    return pd.to_numeric(years, errors="coerce")
+
+
+def _aggregate(df: pd.DataFrame, keys) -> Dict[Tuple[str, ...], YieldStats]:
+    """Vectorized per-group mean, count and linear trend of yield over years."""
+    grouped = df.groupby(keys, sort=False, observed=True)
+    agg = grouped.agg(
+        n=("Yield", "size"),
+        sy=("Yield", "sum"),
+        sx=("Year", "sum"),
+        sxx=("YearSq", "sum"),
+        sxy=("YearYield", "sum"),
+        first_year=("Year", "min"),
+        last_year=("Year", "max"),
+    )
+
+    n = agg["n"].to_numpy(dtype=np.float64)
+    sx, sy = agg["sx"].to_numpy(), agg["sy"].to_numpy()
+    var_x = agg["sxx"].to_numpy() - sx * sx / n
+    cov_xy = agg["sxy"].to_numpy() - sx * sy / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = np.where(var_x > 0, cov_xy / var_x, 0.0)
+    mean = sy / n
+
+    stats = {}
+    for key, m, c, t, fy, ly in zip(agg.index, mean, agg["n"], trend,
+                                    agg["first_year"], agg["last_year"]):
+        key = key if isinstance(key, tuple) else (key,)
+        stats[key] = YieldStats(float(m), int(c), float(t), int(fy), int(ly))
+    return stats
+
+
+class YieldEngine:
+    """
+    Precomputed yield statistics over the APY dataset.
+
+    The CSV is read and normalized once; every lookup afterwards is a plain
+    dictionary access instead of a pandas scan over the whole table.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = self._prepare(df)
+        key_cols = ["state_key", "district_key", "crop_key", "season_key"]
+        self.by_season = _aggregate(df, key_cols)
+        # Fallback when the requested season has no history for the crop
+        self.all_seasons = _aggregate(df, key_cols[:3])
+        self.rows = len(df)
+        # Display name per crop key (as spelled in the data)
+        self.crop_names = dict(zip(df["crop_key"].astype(str), df["Crop"].astype(str).str.strip()))
+        self.season_rankings = self._rank_by_season()
+
+    @classmethod
+    def from_csv(cls, path: str = APY_PATH) -> "YieldEngine":
+        # Memory-mapped columnar cache; the CSV is only parsed when it changes
+        df = load_table(path, columns=["State", "District", "Crop", "Crop_Year",
+                                       "Season", "Area", "Production"])
+        return cls(df)
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+        df.columns = df.columns.str.strip()
+        df = df.dropna(subset=["State", "District", "Crop", "Season"])
+        df = df[df["Area"] > 0].copy()
+        # float64 here: the trend sums of squared years cancel badly in float32
+        df["Yield"] = df["Production"].astype(np.float64) / df["Area"].astype(np.float64)
+        df["Year"] = _crop_year_start(df["Crop_Year"]).astype(np.float64)
+        df = df.dropna(subset=["Yield", "Year"])
+        df["YearSq"] = df["Year"] ** 2
+        df["YearYield"] = df["Year"] * df["Yield"]
+
+        # Normalize each distinct key once instead of every row on every request
+        for col in ["State", "District", "Crop", "Season"]:
+            codes, uniques = pd.factorize(df[col], sort=False)
+            normalized = np.array([normalize_key(u) for u in uniques], dtype=object)
+            df[f"{col.lower()}_key"] = pd.Categorical(normalized[codes])
+        return df
+
+    def _rank_by_season(self) -> Dict[Tuple[str, str, str], List[Tuple[str, YieldStats]]]:
+        """(state, district, season) -> [(crop key, stats)] sorted by mean yield, best first."""
+        rankings: Dict[Tuple[str, str, str], List[Tuple[str, YieldStats]]] = {}
+        for (state, district, crop, season), stats in self.by_season.items():
+            rankings.setdefault((state, district, season), []).append((crop, stats))
+        for crops in rankings.values():
+            crops.sort(key=lambda item: item[1].mean, reverse=True)
+        return rankings
+
+    def top_crops(self, state: str, district: str, season: Optional[str] = None,
+                  limit: int = 3) -> Tuple[str, List[Dict]]:
+        """
+        Returns (season, ranked crops) for a district, by mean historical yield.
+        The season defaults to the current one (current_season()).
+        """
+        season = season or current_season()
+        key = (normalize_key(state), normalize_key(district), season_key(season))
+        ranked = self.season_rankings.get(key, [])[:max(limit, 0)]
+        return season, [
+            {
+                "crop": self.crop_names.get(crop, crop),
+                "mean_yield": round(stats.mean, 4),
+                "yield_trend_per_year": round(stats.trend, 4),
+                "sample_count": stats.count,
+                "years": [stats.first_year, stats.last_year],
+            }
+            for crop, stats in ranked
+        ]
+
+    def lookup(self, state: str, district: str, crop: str,
+               season: Optional[str] = None) -> Tuple[Optional[YieldStats], bool]:
+        """
+        Returns (stats, season_matched). Falls back to all seasons when the
+        season is missing or has no history for this crop.
+        """
+        base = (normalize_key(state), normalize_key(district), normalize_key(crop))
+        if season:
+            stats = self.by_season.get(base + (season_key(season),))
+            if stats is not None:
+                return stats, True
+        return self.all_seasons.get(base), False
+
+    def predict(self, state: str, district: str, crop: str, area: float,
+                season: Optional[str] = None) -> Optional[Dict]:
+        stats, season_matched = self.lookup(state, district, crop, season)
+        if stats is None:
+            return None
+        return {
+            "predicted_yield": round(stats.mean, 4),
+            "predicted_production_tonnes": round(stats.mean * area, 2),
+            "yield_trend_per_year": round(stats.trend, 4),
+            "sample_count": stats.count,
+            "years": [stats.first_year, stats.last_year],
+            "season_matched": season_matched,
+        }
+
+
+_engine: Optional[YieldEngine] = None
+_engine_lock = threading.Lock()
+
+
+def load_yield_engine(path: str = APY_PATH) -> Optional[YieldEngine]:
+    """Loads the engine once; returns None if the APY dataset is not available."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if not os.path.exists(path):
+                print(f"⚠️ APY dataset not found at {path}; yield prediction disabled.")
+                return None
+            _engine = YieldEngine.from_csv(path)
+            print(f"✅ Yield engine ready: {len(_engine.by_season)} keys from {_engine.rows} rows")
+    return _engine
+
+
+def get_yield_engine() -> Optional[YieldEngine]:
+    return _engine